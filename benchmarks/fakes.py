@@ -0,0 +1,384 @@
+"""
+Local stand-ins for the Discord objects the cogs and services use, plus fake yt-dlp and
+FFmpeg layers, so benchmarks can drive real cog code without a gateway or network.
+
+Every outgoing call (message send, member move, voice connect) goes through FakeREST,
+which adds a configurable round-trip latency and counts calls per route.
+"""
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import discord
+from discord.ext import commands
+
+_ids = itertools.count(10_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeREST:
+    """Simulated Discord REST layer: latency per call and per-route call counts."""
+
+    def __init__(self, latency: float = 0.03, jitter: float = 0.01, failure_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = Counter()
+        self.failures = Counter()
+
+    async def request(self, route: str):
+        self.calls[route] += 1
+        delay = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.failures[route] += 1
+            raise FakeHTTPException(route)
+
+    def reset(self):
+        self.calls.clear()
+        self.failures.clear()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class _FakeResponse:
+    status = 500
+    reason = 'Fake failure'
+
+
+class FakeHTTPException(discord.HTTPException):
+    def __init__(self, route: str):
+        super().__init__(_FakeResponse(), f"simulated failure on {route}")
+
+
+class FakeRole:
+    def __init__(self, position: int = 0):
+        self.id = next_id()
+        self.position = position
+
+
+class FakeVoiceState:
+    def __init__(self, channel: Optional["FakeVoiceChannel"]):
+        self.channel = channel
+
+
+class FakeMessage:
+    def __init__(self, channel, content, embeds):
+        self.id = next_id()
+        self.channel = channel
+        self.content = content
+        self.embeds = embeds
+
+
+class FakeTextChannel:
+    def __init__(self, guild: "FakeGuild", name: str = 'general'):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.sent: List[FakeMessage] = []
+
+    async def send(self, content=None, *, embed=None, embeds=None, **kwargs):
+        await self.guild.rest.request('POST /channels/{id}/messages')
+        message = FakeMessage(self, content, embeds or ([embed] if embed else []))
+        self.sent.append(message)
+        return message
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class FakeVoiceChannel:
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+
+    @property
+    def members(self) -> List["FakeMember"]:
+        return [m for m in self.guild.members if m.voice and m.voice.channel is self]
+
+    async def connect(self, **kwargs) -> "FakeVoiceClient":
+        if self.guild.voice_client is not None:
+            raise discord.ClientException('Already connected to a voice channel.')
+        await self.guild.rest.request('VOICE connect')
+        client = FakeVoiceClient(self)
+        self.guild.voice_client = client
+        return client
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", name: str, role_position: int = 0, bot: bool = False):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.bot = bot
+        self.top_role = FakeRole(role_position)
+        self.voice: Optional[FakeVoiceState] = None
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    async def move_to(self, channel, *, reason=None):
+        await self.guild.rest.request('PATCH /guilds/{id}/members/{id}')
+        self.voice = FakeVoiceState(channel) if channel else None
+
+    def __str__(self):
+        return self.name
+
+
+class FakeAudioSource(discord.AudioSource):
+    """Audio source that produces nothing; stands in for FFmpeg."""
+
+    def __init__(self, source: str, duration: float):
+        self.source = source
+        self.duration = duration
+        self.cleaned_up = False
+
+    def read(self) -> bytes:
+        return b''
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+class FakeVoiceClient:
+    """
+    Plays FakeAudioSources by waiting out their duration, then calls `after` like
+    discord.py's player does (also when stopped).
+    """
+
+    def __init__(self, channel: FakeVoiceChannel):
+        self.channel = channel
+        self.guild = channel.guild
+        self.source: Optional[FakeAudioSource] = None
+        self._after: Optional[Callable] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._paused = False
+        self.played = 0
+
+    def is_playing(self) -> bool:
+        return self.source is not None and not self._paused
+
+    def is_paused(self) -> bool:
+        return self.source is not None and self._paused
+
+    def play(self, source, *, after=None):
+        if self.source is not None:
+            raise discord.ClientException('Already playing audio.')
+        self.source = source
+        self._after = after
+        self._paused = False
+        self.played += 1
+        # The music cog wraps sources in a TrackedSource
+        duration = getattr(getattr(source, 'original', source), 'duration', None)
+        if duration is not None:
+            self._handle = asyncio.get_running_loop().call_later(duration, self._finish, None)
+
+    def _finish(self, error):
+        if self.source is None:
+            return
+        after, self._after = self._after, None
+        self.source.cleanup()
+        self.source = None
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        if after:
+            after(error)
+
+    def stop(self):
+        if self.source is not None:
+            asyncio.get_running_loop().call_soon(self._finish, None)
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+
+    async def disconnect(self, *, force: bool = False):
+        # Like discord.py, disconnecting stops the player, which still calls `after`
+        self.stop()
+        if self.guild.voice_client is self:
+            self.guild.voice_client = None
+        await self.guild.rest.request('VOICE disconnect')
+
+
+class FakeGuild:
+    def __init__(self, rest: FakeREST, members: int = 10, voice_channels: int = 3):
+        self.id = next_id()
+        self.name = f"guild-{self.id}"
+        self.rest = rest
+        self.text_channel = FakeTextChannel(self)
+        self.voice_channels = [FakeVoiceChannel(self, f"voice-{i}") for i in range(voice_channels)]
+        self.me = FakeMember(self, 'rudebot', role_position=10, bot=True)
+        self.members = [self.me] + [FakeMember(self, f"user-{i}") for i in range(members)]
+        self.voice_client: Optional[FakeVoiceClient] = None
+        self._channels = {self.text_channel.id: self.text_channel}
+        self._channels.update({vc.id: vc for vc in self.voice_channels})
+
+    @property
+    def system_channel(self) -> FakeTextChannel:
+        return self.text_channel
+
+    @property
+    def member_count(self) -> int:
+        return len(self.members)
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+
+class FakeContext:
+    """The parts of commands.Context the cogs use."""
+
+    def __init__(self, bot, guild: FakeGuild, author: FakeMember, channel: Optional[FakeTextChannel] = None):
+        self.bot = bot
+        self.guild = guild
+        self.author = author
+        self.channel = channel or guild.text_channel
+        self.command = None
+
+    @property
+    def voice_client(self) -> Optional[FakeVoiceClient]:
+        return self.guild.voice_client
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+
+async def make_bot() -> commands.Bot:
+    """A real commands.Bot that never connects, so cogs can be added and their commands called."""
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.none())
+    # Normally set during login; cogs use it to schedule callbacks from audio threads
+    bot.loop = asyncio.get_running_loop()
+    return bot
+
+
+async def join_voice(bot, member: FakeMember, channel: FakeVoiceChannel):
+    """Put a member in a voice channel and dispatch on_voice_state_update to every cog listener."""
+    before = member.voice or FakeVoiceState(None)
+    member.voice = FakeVoiceState(channel)
+    await _dispatch_voice_update(bot, member, before, member.voice)
+
+
+async def leave_voice(bot, member: FakeMember):
+    before = member.voice or FakeVoiceState(None)
+    member.voice = None
+    await _dispatch_voice_update(bot, member, before, FakeVoiceState(None))
+
+
+async def _dispatch_voice_update(bot, member, before, after):
+    listeners = []
+    for cog in bot.cogs.values():
+        for name, method in cog.get_listeners():
+            if name == 'on_voice_state_update':
+                listeners.append(method(member, before, after))
+    await asyncio.gather(*listeners)
+
+
+class FakeMedia:
+    """
+    Replaces yt-dlp (search_video / resolve_stream worker functions) and FFmpeg
+    (create_audio_source) with fakes that have configurable latency and failure rates.
+    """
+
+    def __init__(self, search_latency: float = 0.2, resolve_latency: float = 0.1, track_seconds: float = 1.0,
+                 search_failure_rate: float = 0.0, resolve_failure_rate: float = 0.0,
+                 source_failure_rate: float = 0.0):
+        self.search_latency = search_latency
+        self.resolve_latency = resolve_latency
+        self.track_seconds = track_seconds
+        self.search_failure_rate = search_failure_rate
+        self.resolve_failure_rate = resolve_failure_rate
+        self.source_failure_rate = source_failure_rate
+        self.calls = Counter()
+        self.failures = Counter()
+        self.sources: List[FakeAudioSource] = []
+
+    def search_video(self, query: str) -> dict:
+        # Runs on an extraction worker thread, like the real yt-dlp call
+        self.calls['search'] += 1
+        time.sleep(self.search_latency)
+        if self.search_failure_rate and random.random() < self.search_failure_rate:
+            self.failures['search'] += 1
+            raise Exception(f"Fake search failure for {query!r}")
+        video_id = f"{abs(hash(query)) % 10 ** 11:011d}"
+        return {
+            'title': f"Song {query}",
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'video_id': video_id,
+            'stream_url': f"https://media.invalid/{video_id}?expire={int(time.time()) + 21600}",
+            'acodec': 'opus',
+        }
+
+    def resolve_stream(self, url: str) -> dict:
+        self.calls['resolve'] += 1
+        time.sleep(self.resolve_latency)
+        if self.resolve_failure_rate and random.random() < self.resolve_failure_rate:
+            self.failures['resolve'] += 1
+            raise Exception(f"Fake resolve failure for {url}")
+        video_id = url.rsplit('=', 1)[-1]
+        return {
+            'stream_url': f"https://media.invalid/{video_id}?expire={int(time.time()) + 21600}",
+            'video_id': video_id,
+            'acodec': 'opus',
+        }
+
+    async def create_audio_source(self, source: str, codec: Optional[str] = None, local: bool = False,
+                                  mode: Optional[str] = None, start: float = 0.0) -> FakeAudioSource:
+        self.calls['source'] += 1
+        if self.source_failure_rate and random.random() < self.source_failure_rate:
+            self.failures['source'] += 1
+            raise Exception(f"Fake FFmpeg failure for {source}")
+        audio = FakeAudioSource(source, max(0.0, self.track_seconds - start))
+        self.sources.append(audio)
+        return audio
+
+    def install(self):
+        """Patch the extraction workers and the music cog's source factory. Returns an undo function."""
+        import cogs.music
+        import services.extraction_service as extraction
+        originals = (extraction.search_video, extraction.resolve_stream, cogs.music.create_audio_source)
+        extraction.search_video = self.search_video
+        extraction.resolve_stream = self.resolve_stream
+        cogs.music.create_audio_source = self.create_audio_source
+
+        def undo():
+            extraction.search_video, extraction.resolve_stream, cogs.music.create_audio_source = originals
+        return undo
+
+
+def use_temp_database(path: str):
+    """
+    Point the data layer at a fresh SQLite file, migrate it and seed a few responses.
+    Must run before anything opens the default database.
+    """
+    import data.session
+    from data.migrations import migrate
+    data.session.DB_PATH = path
+    migrate(db_path=path)
+    from data.models import Response
+    with data.session.get_session() as session:
+        for i in range(20):
+            session.add(Response(category='command', trigger='hello', text=f"Hello #{i}, go away",
+                                 gif_url=f"https://gifs.invalid/{i}.gif" if i % 2 else None, emote=None, action=None))
+            session.add(Response(category='event', trigger='join', text=f"Oh no, it's you #{i}",
+                                 gif_url=f"https://gifs.invalid/join{i}.gif" if i % 3 else None, emote=None, action=None))
+        session.commit()
@@ -0,0 +1,125 @@
+"""
+Memory and startup cost of the member cache under each cache profile.
+Builds a guild from a synthetic GUILD_CREATE payload the way discord.py does on connect,
+in a fresh interpreter per profile, and reports RSS and construction time per 10k members.
+
+With the full profile Discord delivers (and chunking fills in) every member and presence;
+with the slim profile only members in voice arrive, and only those are cached.
+
+Usage:
+    python -m benchmarks.member_cache_memory [--members 10000] [--voice-fraction 0.01]
+"""
+import argparse
+import gc
+import json
+import resource
+import subprocess
+import sys
+import time
+import discord
+from discord.state import ConnectionState
+from utils.intents_util import CACHE_PROFILES, build_intents, cache_options
+
+GUILD_ID = 1000
+CHANNEL_ID = 2000
+
+
+def _rss_bytes() -> int:
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * resource.getpagesize()
+
+
+def _payload(members: int, voice_fraction: float, profile: str) -> dict:
+    voice_every = max(1, round(1 / voice_fraction)) if voice_fraction > 0 else None
+    member_ids = range(10_000, 10_000 + members)
+    voice_ids = [i for n, i in enumerate(member_ids) if voice_every and n % voice_every == 0]
+    if profile == 'full':
+        sent = member_ids
+    else:
+        # Without the members intent the gateway only sends members that are in voice
+        sent = voice_ids
+    member_data = [{
+        'user': {'id': str(i), 'username': f'user{i}', 'discriminator': '0', 'global_name': f'User {i}', 'avatar': None},
+        'roles': [],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+        'flags': 0,
+    } for i in sent]
+    presences = []
+    if profile == 'full':
+        presences = [{'user': {'id': str(i)}, 'status': 'online', 'activities': [], 'client_status': {'desktop': 'online'}}
+                     for i in sent]
+    return {
+        'id': str(GUILD_ID),
+        'name': 'Benchmark Guild',
+        'owner_id': str(10_000),
+        'member_count': members,
+        'large': members > 250,
+        'roles': [{'id': str(GUILD_ID), 'name': '@everyone', 'permissions': '0', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [{'id': str(CHANNEL_ID), 'type': 2, 'name': 'voice', 'position': 0,
+                      'permission_overwrites': [], 'bitrate': 64000, 'user_limit': 0}],
+        'voice_states': [{'user_id': str(i), 'channel_id': str(CHANNEL_ID), 'session_id': 'x',
+                          'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+                          'self_video': False, 'suppress': False} for i in voice_ids],
+        'members': member_data,
+        'presences': presences,
+        'emojis': [],
+        'stickers': [],
+        'features': [],
+    }
+
+
+def measure(profile: str, members: int, voice_fraction: float) -> dict:
+    """Measure one profile in the current interpreter."""
+    payload = _payload(members, voice_fraction, profile)
+    state = ConnectionState(
+        dispatch=lambda *args: None, handlers={}, hooks={}, http=None,
+        intents=build_intents(profile), **cache_options(profile)
+    )
+    gc.collect()
+    before = _rss_bytes()
+    started = time.perf_counter()
+    guild = discord.Guild(data=payload, state=state)
+    elapsed = time.perf_counter() - started
+    del payload
+    gc.collect()
+    after = _rss_bytes()
+    return {
+        'profile': profile,
+        'cached_members': len(guild.members),
+        'rss_bytes': max(0, after - before),
+        'build_seconds': elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--members', type=int, default=10_000)
+    parser.add_argument('--voice-fraction', type=float, default=0.01, help='Share of members in voice')
+    parser.add_argument('--profile', choices=CACHE_PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        # Child mode: measure a single profile and print JSON
+        print(json.dumps(measure(args.profile, args.members, args.voice_fraction)))
+        return
+
+    per = 10_000 / args.members
+    print(f"{args.members} members, {args.voice_fraction:.1%} in voice")
+    print(f"{'profile':<8} {'cached':>8} {'RSS MB/10k':>11} {'build ms/10k':>13}")
+    for profile in CACHE_PROFILES:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.member_cache_memory', '--profile', profile,
+             '--members', str(args.members), '--voice-fraction', str(args.voice_fraction)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:<8} {result['cached_members']:>8} {result['rss_bytes'] * per / 1024 / 1024:>11.1f} "
+              f"{result['build_seconds'] * per * 1000:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
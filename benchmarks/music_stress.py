@@ -0,0 +1,370 @@
+"""
+Stress harness for the music queue lifecycle.
+Hundreds of fake guilds add, skip and stop concurrently against the real Music cog, with
+yt-dlp and FFmpeg replaced by fakes that have configurable latency and failure rates
+(see benchmarks/fakes.py). Reports per-operation latency, SQL statements per operation and
+_play_next nesting depth, then checks every guild's queue for consistency.
+
+Usage:
+    python -m benchmarks.music_stress [--guilds 300] [--ops 20] [--resolve-failure-rate 0.2]
+
+Exits with status 1 if any consistency check fails.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+OPS = ('add', 'skip', 'stop')
+
+# Short tracks so songs also end on their own during the run; anything already set wins
+os.environ.setdefault('AUDIO_CACHE_ENABLED', 'false')
+os.environ.setdefault('YTDLP_CACHE_PERSIST', 'false')
+os.environ.setdefault('MUSIC_PREFETCH_WARM_FFMPEG', 'false')
+
+# Operation the current task is running; DB calls inherit it on their executor thread
+_current_op = contextvars.ContextVar('stress_op', default='background')
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(len(ordered) * q / 100) - 1))]
+
+
+class StatementCounter:
+    """Counts SQL statements per operation through before_cursor_execute on both engines."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._engines = []
+
+    def attach(self):
+        from sqlalchemy import event
+        from data.session import get_read_engine, get_write_engine
+        for engine in (get_write_engine(), get_read_engine()):
+            event.listen(engine, 'before_cursor_execute', self._on_execute)
+            self._engines.append(engine)
+
+    def detach(self):
+        from sqlalchemy import event
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._on_execute)
+        self._engines.clear()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.counts[_current_op.get()] += 1
+
+
+class PlayTracker:
+    """
+    Wraps Music._play_next to count calls and how deeply they nest within one task.
+    Calls made from a song's `after` callback start a new task, so only direct recursion
+    (retrying after a failed song) adds depth.
+    """
+
+    def __init__(self, music):
+        self.calls = 0
+        self.max_depth = 0
+        self.by_depth = Counter()
+        self._depth: Dict[asyncio.Task, int] = {}
+        original = music._play_next
+
+        async def tracked(ctx, *args, **kwargs):
+            task = asyncio.current_task()
+            depth = self._depth.get(task, 0) + 1
+            self._depth[task] = depth
+            self.calls += 1
+            self.by_depth[depth] += 1
+            self.max_depth = max(self.max_depth, depth)
+            try:
+                return await original(ctx, *args, **kwargs)
+            finally:
+                if depth == 1:
+                    del self._depth[task]
+                else:
+                    self._depth[task] = depth - 1
+
+        music._play_next = tracked
+
+
+class MusicStress:
+    def __init__(self, args):
+        self.args = args
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = Counter()
+        self.violations: List[str] = []
+        self.notes: Dict[str, object] = {}
+
+    async def setup(self):
+        from benchmarks import fakes
+        self.fakes = fakes
+        self.tmpdir = tempfile.TemporaryDirectory(prefix='rudebot-stress-')
+        fakes.use_temp_database(os.path.join(self.tmpdir.name, 'stress.sqlite3'))
+
+        import cogs.music
+        from services.queue_service import queue_store
+        self.queue_store = queue_store
+        self.rest = fakes.FakeREST(latency=self.args.rest_latency, jitter=self.args.rest_latency / 3)
+        self.media = fakes.FakeMedia(search_latency=self.args.search_latency,
+                                     resolve_latency=self.args.resolve_latency,
+                                     track_seconds=self.args.track_seconds,
+                                     search_failure_rate=self.args.search_failure_rate,
+                                     resolve_failure_rate=self.args.resolve_failure_rate,
+                                     source_failure_rate=self.args.source_failure_rate)
+        self.undo_media = self.media.install()
+        self.statements = StatementCounter()
+        self.statements.attach()
+
+        self.bot = await fakes.make_bot()
+        await cogs.music.setup(self.bot)
+        self.music = self.bot.get_cog('Music')
+        self.plays = PlayTracker(self.music)
+        self.guilds = [fakes.FakeGuild(self.rest, members=3) for _ in range(self.args.guilds)]
+        for guild in self.guilds:
+            guild.dj = guild.members[1]
+            guild.dj.voice = fakes.FakeVoiceState(guild.voice_channels[0])
+
+    async def teardown(self):
+        from data.async_session import shutdown_db_executor
+        from services.extraction_service import extraction_service
+        await self.bot.remove_cog('Music')
+        self.statements.detach()
+        self.undo_media()
+        extraction_service.shutdown()
+        shutdown_db_executor()
+        self.tmpdir.cleanup()
+
+    def ctx(self, guild):
+        return self.fakes.FakeContext(self.bot, guild, guild.dj)
+
+    async def timed(self, op: str, coro_factory):
+        token = _current_op.set(op)
+        started = time.perf_counter()
+        try:
+            await coro_factory()
+        except Exception as e:
+            self.errors[op] += 1
+            if self.args.verbose:
+                print(f"  {op} error: {e!r}", file=sys.stderr)
+            return
+        finally:
+            _current_op.reset(token)
+        self.latencies[op].append(time.perf_counter() - started)
+
+    def op(self, name: str, guild):
+        if name == 'add':
+            return lambda: self.music.add_cmd(self.ctx(guild), query=f"{guild.id} song {random.randrange(10 ** 6)}")
+        if name == 'skip':
+            return lambda: self.music.skip(self.ctx(guild))
+        return lambda: self.music.stop(self.ctx(guild))
+
+    async def guild_session(self, guild):
+        weights = (self.args.add_weight, self.args.skip_weight, self.args.stop_weight)
+        for name in random.choices(OPS, weights=weights, k=self.args.ops):
+            await self.timed(name, self.op(name, guild))
+            if self.args.think:
+                await asyncio.sleep(random.uniform(0, self.args.think))
+
+    def _settled(self, guild) -> bool:
+        """No song is between being claimed and playing, and no `after` callback is pending."""
+        current = self.music.current_song.get(guild.id)
+        client = guild.voice_client
+        if current is None:
+            return client is None or not client.is_playing()
+        return client is not None and client.is_playing()
+
+    async def wait_settled(self, timeout: float) -> bool:
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if all(self._settled(guild) for guild in self.guilds):
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    def check_guilds(self, phase: str):
+        """Synchronous snapshot checks; nothing can interleave between them."""
+        from services.extraction_service import video_id_from_url
+        failures_injected = any(self.media.failures.values())
+        stalled = 0
+        for guild in self.guilds:
+            queue = self.queue_store.get(str(guild.id)).snapshot()
+            current = self.music.current_song.get(guild.id)
+            client = guild.voice_client
+            where = f"{phase}: guild {guild.id}"
+            if len(queue) > 10:
+                self.violations.append(f"{where} has {len(queue)} songs queued (limit 10)")
+            if len({song.entry_id for song in queue}) != len(queue):
+                self.violations.append(f"{where} has duplicate entries in its queue")
+            if current is not None:
+                if not queue or queue[0].entry_id != current:
+                    self.violations.append(f"{where} is playing entry {current}, which is not the queue head")
+                elif client is None or not client.is_playing():
+                    self.violations.append(f"{where} claims entry {current} but nothing is playing")
+                elif video_id_from_url(queue[0].url) not in client.source.original.source:
+                    self.violations.append(f"{where} is playing {client.source.original.source}, not {queue[0].url}")
+            elif client is not None and client.is_playing():
+                self.violations.append(f"{where} is playing audio with no current song")
+            elif queue:
+                stalled += 1
+                if not failures_injected:
+                    self.violations.append(f"{where} has {len(queue)} songs queued but nothing playing")
+        self.notes[f"{phase}_stalled_guilds"] = stalled
+
+    async def check_persisted(self, phase: str):
+        """After a flush, the song_queue table must match the in-memory queues exactly."""
+        from services.music_service import load_all_queues_async
+        await self.queue_store.flush()
+        # Songs keep ending while the table is read back; compare against the queues as flushed,
+        # skipping guilds that changed again while the flush was writing
+        memory_by_guild = {str(guild.id): [song.url for song in self.queue_store.get(str(guild.id))]
+                           for guild in self.guilds if str(guild.id) not in self.queue_store._dirty}
+        persisted = await load_all_queues_async()
+        for guild in self.guilds:
+            guild_id = str(guild.id)
+            memory = memory_by_guild.get(guild_id)
+            if memory is None:
+                continue
+            stored = [row.url for row in persisted.get(guild_id, [])]
+            if memory != stored:
+                self.violations.append(f"{phase}: guild {guild.id} persisted {len(stored)} songs, "
+                                       f"memory has {len(memory)}")
+
+    def check_sources(self, phase: str):
+        """Every audio source built is either playing now or has been cleaned up (no leaked FFmpeg)."""
+        playing = {id(guild.voice_client.source.original) for guild in self.guilds
+                   if guild.voice_client and guild.voice_client.source}
+        leaked = [s for s in self.media.sources if not s.cleaned_up and id(s) not in playing]
+        if leaked:
+            self.violations.append(f"{phase}: {len(leaked)} audio sources were created but never played or cleaned up")
+
+    async def run(self):
+        started = time.perf_counter()
+        await asyncio.gather(*(self.guild_session(guild) for guild in self.guilds))
+        self.notes['workload_seconds'] = round(time.perf_counter() - started, 2)
+
+        settle = (self.args.search_latency + self.args.resolve_latency + self.args.rest_latency) * 10 + 5
+        if not await self.wait_settled(settle):
+            self.violations.append(f"workload: guilds still starting playback after {settle:.0f}s")
+        if self.latencies['add'] and not self.media.sources:
+            self.violations.append("workload: songs were added but no audio source was ever created")
+        self.check_guilds('workload')
+        self.check_sources('workload')
+        await self.check_persisted('workload')
+
+        # Stop everything; queues, voice clients and sources must all be gone afterwards
+        await asyncio.gather(*(self.timed('stop', self.op('stop', guild)) for guild in self.guilds))
+        await self.wait_settled(settle)
+        await asyncio.sleep(self.args.rest_latency * 4 + 0.05)
+        for guild in self.guilds:
+            if len(self.queue_store.get(str(guild.id))) or guild.id in self.music.current_song:
+                self.violations.append(f"final: guild {guild.id} still has songs after stop")
+            if guild.voice_client is not None:
+                self.violations.append(f"final: guild {guild.id} is still connected to voice after stop")
+        self.check_sources('final')
+        await self.check_persisted('final')
+
+    def results(self) -> dict:
+        ops = {}
+        for name in OPS:
+            latencies = self.latencies[name]
+            count = len(latencies) + self.errors[name]
+            statements = self.statements.counts[name]
+            ops[name] = {
+                'count': count,
+                'errors': self.errors[name],
+                'p50_ms': _percentile(latencies, 50) * 1000,
+                'p99_ms': _percentile(latencies, 99) * 1000,
+                'max_ms': max(latencies, default=0.0) * 1000,
+                'db_statements': statements,
+                'db_per_op': statements / count if count else 0.0,
+            }
+        return {
+            'ops': ops,
+            'background_db_statements': self.statements.counts['background'],
+            'play_next': {'calls': self.plays.calls, 'max_depth': self.plays.max_depth,
+                          'by_depth': dict(sorted(self.plays.by_depth.items()))},
+            'media_calls': dict(self.media.calls),
+            'media_failures': dict(self.media.failures),
+            'rest_calls': self.rest.total_calls,
+            'notes': self.notes,
+            'violations': self.violations,
+        }
+
+
+def print_results(results: dict):
+    header = f"{'op':<6} {'count':>7} {'err':>5} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'DB stmts':>9} {'DB/op':>6}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results['ops'].items():
+        print(f"{name:<6} {r['count']:>7} {r['errors']:>5} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['max_ms']:>8.1f} {r['db_statements']:>9} {r['db_per_op']:>6.2f}")
+    print(f"background DB statements (queue flushes): {results['background_db_statements']}")
+    play = results['play_next']
+    print(f"_play_next: calls={play['calls']} max_depth={play['max_depth']} by_depth={play['by_depth']}")
+    print(f"media calls: {results['media_calls']} injected failures: {results['media_failures']}")
+    print(f"REST calls: {results['rest_calls']}  " + ", ".join(f"{k}={v}" for k, v in results['notes'].items()))
+    violations = results['violations']
+    if violations:
+        print(f"CONSISTENCY FAILED ({len(violations)} problems):")
+        for violation in violations[:50]:
+            print(f"  {violation}")
+        if len(violations) > 50:
+            print(f"  ... and {len(violations) - 50} more")
+    else:
+        print("Consistency checks passed")
+
+
+async def run(args) -> dict:
+    stress = MusicStress(args)
+    await stress.setup()
+    try:
+        await stress.run()
+    finally:
+        await stress.teardown()
+    return stress.results()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--guilds', type=int, default=300)
+    parser.add_argument('--ops', type=int, default=20, help='Operations per guild')
+    parser.add_argument('--add-weight', type=float, default=0.6)
+    parser.add_argument('--skip-weight', type=float, default=0.3)
+    parser.add_argument('--stop-weight', type=float, default=0.1)
+    parser.add_argument('--think', type=float, default=0.05, help='Max random pause between a guild\'s ops (seconds)')
+    parser.add_argument('--rest-latency', type=float, default=0.01, help='Fake REST round trip (seconds)')
+    parser.add_argument('--search-latency', type=float, default=0.05, help='Fake yt-dlp search time (seconds)')
+    parser.add_argument('--resolve-latency', type=float, default=0.03, help='Fake stream resolve time (seconds)')
+    parser.add_argument('--track-seconds', type=float, default=0.5, help='Fake track length (seconds)')
+    parser.add_argument('--search-failure-rate', type=float, default=0.0)
+    parser.add_argument('--resolve-failure-rate', type=float, default=0.0)
+    parser.add_argument('--source-failure-rate', type=float, default=0.0, help='Fake FFmpeg start failures')
+    parser.add_argument('--seed', type=int, help='Random seed for a repeatable operation mix')
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Print each failed operation')
+    args = parser.parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+    return 1 if results['violations'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
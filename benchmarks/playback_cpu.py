@@ -0,0 +1,82 @@
+"""
+CPU cost per voice stream for each playback mode.
+Reads a local sample file through every audio source type as fast as possible and reports
+CPU seconds (bot process + FFmpeg child) per second of audio. For the PCM path the Opus
+encoding that discord.py would do per 20ms frame is included.
+
+Usage:
+    python -m benchmarks.playback_cpu path/to/sample.webm [--seconds 60]
+"""
+import argparse
+import asyncio
+import resource
+import time
+import discord
+import discord.opus
+from services.playback_service import create_audio_source, is_opus
+
+FRAME_SECONDS = 0.02
+
+
+def _child_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_source(source: discord.AudioSource, max_frames: int) -> dict:
+    """Pull frames from a source like the voice player does, encoding PCM when needed."""
+    encoder = None
+    if not source.is_opus():
+        if not discord.opus.is_loaded():
+            discord.opus._load_default()
+        encoder = discord.opus.Encoder()
+    process_start = time.process_time()
+    child_start = _child_cpu()
+    frames = 0
+    while frames < max_frames:
+        data = source.read()
+        if not data:
+            break
+        if encoder is not None:
+            encoder.encode(data, encoder.SAMPLES_PER_FRAME)
+        frames += 1
+    source.cleanup()  # waits for FFmpeg so its CPU shows up in RUSAGE_CHILDREN
+    process_cpu = time.process_time() - process_start
+    child_cpu = _child_cpu() - child_start
+    audio_seconds = frames * FRAME_SECONDS
+    return {
+        'frames': frames,
+        'audio_seconds': audio_seconds,
+        'bot_cpu': process_cpu,
+        'ffmpeg_cpu': child_cpu,
+        'cpu_per_stream_pct': (process_cpu + child_cpu) / audio_seconds * 100 if audio_seconds else 0.0,
+    }
+
+
+async def benchmark(path: str, seconds: float):
+    max_frames = int(seconds / FRAME_SECONDS)
+    codec, bitrate = await discord.FFmpegOpusAudio.probe(path, method='fallback')
+    print(f"Sample: {path} (codec={codec}, bitrate={bitrate})")
+    print(f"{'mode':<8} {'audio s':>8} {'bot cpu s':>10} {'ffmpeg cpu s':>13} {'cpu/stream':>11}")
+    for mode in ('pcm', 'opus', 'auto'):
+        source = await create_audio_source(path, codec=codec, local=True, mode=mode)
+        result = await asyncio.to_thread(run_source, source, max_frames)
+        label = mode
+        if mode != 'pcm' and is_opus(codec):
+            label += '*'
+        print(f"{label:<8} {result['audio_seconds']:>8.1f} {result['bot_cpu']:>10.3f} "
+              f"{result['ffmpeg_cpu']:>13.3f} {result['cpu_per_stream_pct']:>10.2f}%")
+    if is_opus(codec):
+        print("* Opus passthrough (stream copied without re-encoding)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sample', help='Local audio file to play')
+    parser.add_argument('--seconds', type=float, default=60.0, help='Seconds of audio to read per mode')
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.sample, args.seconds))
+
+
+if __name__ == '__main__':
+    main()
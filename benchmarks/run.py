@@ -0,0 +1,274 @@
+"""
+End-to-end benchmark suite for Rudebot's cogs and services.
+Drives the real Commands, Music and Events cogs with fake guilds, members, voice clients,
+REST layer, yt-dlp and FFmpeg (see benchmarks/fakes.py) against a temporary database, and
+reports throughput, p50/p99 latency, REST calls, DB time and event loop lag per scenario.
+
+Scenarios:
+    hello       every guild sends !hello repeatedly
+    dj_add      every guild queues songs with !dj add
+    skip        every guild skips through its queue; latency is skip -> next song playing
+    voice_join  every guild gets a burst of voice joins (greetings are batched per channel)
+
+Usage:
+    python -m benchmarks.run [--guilds 50] [--ops 5] [--rest-latency 0.03] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Awaitable, Callable, List, Union
+
+SCENARIOS = ('hello', 'dj_add', 'skip', 'voice_join')
+
+Op = Callable[[], Awaitable]
+
+# Benchmark-friendly defaults; anything already set in the environment wins
+os.environ.setdefault('GREETING_WINDOW', '0.25')
+os.environ.setdefault('AUDIO_CACHE_ENABLED', 'false')
+os.environ.setdefault('YTDLP_CACHE_PERSIST', 'false')
+os.environ.setdefault('MUSIC_PREFETCH_WARM_FFMPEG', 'false')
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    ops: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    throughput: float = 0.0
+    p50_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+    rest_calls: int = 0
+    db_calls: int = 0
+    db_ms: float = 0.0
+    loop_lag_p99_ms: float = 0.0
+    loop_lag_max_ms: float = 0.0
+    notes: dict = field(default_factory=dict)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(len(ordered) * q / 100) - 1))]
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.rest = None
+        self.bot = None
+        self.guilds = []
+
+    async def setup(self):
+        from benchmarks import fakes
+        self.fakes = fakes
+        self.tmpdir = tempfile.TemporaryDirectory(prefix='rudebot-bench-')
+        fakes.use_temp_database(os.path.join(self.tmpdir.name, 'bench.sqlite3'))
+
+        from services.response_service import response_catalog
+        from services.watchdog_service import loop_watchdog
+        import cogs.commands
+        import cogs.events
+        import cogs.music
+
+        self.rest = fakes.FakeREST(latency=self.args.rest_latency, jitter=self.args.rest_latency / 3)
+        self.media = fakes.FakeMedia(search_latency=self.args.search_latency,
+                                     resolve_latency=self.args.resolve_latency,
+                                     track_seconds=self.args.track_seconds)
+        self.undo_media = self.media.install()
+        response_catalog.reload()
+
+        self.bot = await fakes.make_bot()
+        for module in (cogs.commands, cogs.events, cogs.music):
+            await module.setup(self.bot)
+        self.commands_cog = self.bot.get_cog('Commands')
+        self.music = self.bot.get_cog('Music')
+        self.events = self.bot.get_cog('Events')
+        self.guilds = [fakes.FakeGuild(self.rest, members=self.args.members) for _ in range(self.args.guilds)]
+        self.watchdog = loop_watchdog
+        self.watchdog.start()
+
+    async def teardown(self):
+        from data.async_session import shutdown_db_executor
+        from services.extraction_service import extraction_service
+        for guild in self.guilds:
+            if guild.voice_client:
+                await guild.voice_client.disconnect()
+        await self.bot.remove_cog('Music')
+        await self.bot.remove_cog('Events')
+        self.watchdog.stop()
+        self.undo_media()
+        extraction_service.shutdown()
+        shutdown_db_executor()
+        self.tmpdir.cleanup()
+
+    def ctx(self, guild, member=None):
+        member = member or random.choice(guild.members[1:])
+        return self.fakes.FakeContext(self.bot, guild, member)
+
+    async def measure(self, name: str, ops: List[Union[Op, List[Op]]], settle: float = 0.0) -> ScenarioResult:
+        """
+        Run every op concurrently, timing each, then collect DB, REST and loop lag figures.
+        An op may be a list of steps, which run one after another and are timed individually.
+        """
+        from data.async_session import db_query_latency
+        from utils.metrics_util import loop_lag
+        db_query_latency.reset()
+        loop_lag.reset()
+        self.rest.reset()
+        latencies = []
+        errors = 0
+
+        async def timed(op):
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                await op()
+            except Exception as e:
+                errors += 1
+                if self.args.verbose:
+                    print(f"  {name} error: {e!r}", file=sys.stderr)
+                return
+            latencies.append(time.perf_counter() - started)
+
+        async def sequence(steps):
+            for step in steps:
+                await timed(step)
+
+        steps = sum(len(op) if isinstance(op, list) else 1 for op in ops)
+        started = time.perf_counter()
+        await asyncio.gather(*(sequence(op) if isinstance(op, list) else timed(op) for op in ops))
+        elapsed = time.perf_counter() - started
+        if settle:
+            await asyncio.sleep(settle)
+        db = db_query_latency.snapshot()
+        lag = loop_lag.snapshot()
+        return ScenarioResult(
+            name=name,
+            ops=steps,
+            errors=errors,
+            elapsed=elapsed,
+            throughput=len(latencies) / elapsed if elapsed else 0.0,
+            p50_ms=_percentile(latencies, 50) * 1000,
+            p99_ms=_percentile(latencies, 99) * 1000,
+            max_ms=max(latencies, default=0.0) * 1000,
+            rest_calls=self.rest.total_calls,
+            db_calls=db['count'],
+            db_ms=db['sum'] * 1000,
+            loop_lag_p99_ms=lag['p99'] * 1000,
+            loop_lag_max_ms=lag['max'] * 1000,
+        )
+
+    async def scenario_hello(self) -> ScenarioResult:
+        ops = [lambda g=guild: self.commands_cog.hello(self.ctx(g))
+               for guild in self.guilds for _ in range(self.args.ops)]
+        return await self.measure('hello', ops)
+
+    async def scenario_dj_add(self) -> ScenarioResult:
+        # One DJ per guild, already in voice; songs are added one after another per guild
+        for guild in self.guilds:
+            guild.dj = guild.members[1]
+            guild.dj.voice = self.fakes.FakeVoiceState(guild.voice_channels[0])
+
+        def add(guild, i):
+            return lambda: self.music.add_cmd(self.ctx(guild, guild.dj), query=f"{guild.id} song {i}")
+
+        result = await self.measure('dj_add', [[add(guild, i) for i in range(self.args.ops)] for guild in self.guilds])
+        result.notes['searches'] = self.media.calls['search']
+        return result
+
+    async def scenario_skip(self) -> ScenarioResult:
+        def skip_to_next(guild):
+            async def run():
+                client = guild.voice_client
+                if client is None:
+                    raise RuntimeError('not playing')
+                played = client.played
+                await self.music.skip(self.ctx(guild, guild.dj))
+                deadline = time.perf_counter() + 10
+                while client.played == played:
+                    if time.perf_counter() > deadline:
+                        raise TimeoutError('next song did not start')
+                    await asyncio.sleep(0.002)
+            return run
+
+        # Skips within a guild are sequential (skip -> next song playing); guilds run concurrently
+        rounds = max(1, self.args.ops - 1)
+        return await self.measure('skip', [[skip_to_next(guild)] * rounds
+                                           for guild in self.guilds if getattr(guild, 'dj', None)])
+
+    async def scenario_voice_join(self) -> ScenarioResult:
+        joins = []
+        for guild in self.guilds:
+            channel = guild.voice_channels[-1]
+            for member in guild.members[1:1 + self.args.joins]:
+                member.voice = None
+                joins.append(lambda m=member, c=channel: self.fakes.join_voice(self.bot, m, c))
+        window = float(os.environ['GREETING_WINDOW'])
+        result = await self.measure('voice_join', joins, settle=window + self.args.rest_latency * 4 + 0.2)
+        result.notes['joins'] = len(joins)
+        result.notes['greeting_messages'] = self.rest.calls['POST /channels/{id}/messages']
+        return result
+
+
+def print_results(results: List[ScenarioResult]):
+    header = (f"{'scenario':<11} {'ops':>6} {'err':>4} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'REST':>6} {'DB n':>6} {'DB ms':>8} {'lag p99':>8} {'lag max':>8}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r.name:<11} {r.ops:>6} {r.errors:>4} {r.throughput:>8.1f} {r.p50_ms:>8.1f} {r.p99_ms:>8.1f} "
+              f"{r.rest_calls:>6} {r.db_calls:>6} {r.db_ms:>8.1f} {r.loop_lag_p99_ms:>8.1f} {r.loop_lag_max_ms:>8.1f}")
+        if r.notes:
+            print(f"{'':<11} " + ", ".join(f"{k}={v}" for k, v in r.notes.items()))
+
+
+async def run(args) -> List[ScenarioResult]:
+    harness = Harness(args)
+    await harness.setup()
+    results = []
+    try:
+        for name in args.scenarios:
+            results.append(await getattr(harness, f"scenario_{name}")())
+    finally:
+        await harness.teardown()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--members', type=int, default=30, help='Members per guild')
+    parser.add_argument('--ops', type=int, default=5, help='Commands per guild per scenario')
+    parser.add_argument('--joins', type=int, default=20, help='Voice joins per guild in the join storm')
+    parser.add_argument('--rest-latency', type=float, default=0.03, help='Fake REST round trip (seconds)')
+    parser.add_argument('--search-latency', type=float, default=0.2, help='Fake yt-dlp search time (seconds)')
+    parser.add_argument('--resolve-latency', type=float, default=0.1, help='Fake stream resolve time (seconds)')
+    parser.add_argument('--track-seconds', type=float, default=30.0, help='Fake track length (seconds)')
+    parser.add_argument('--scenarios', type=lambda s: s.split(','), default=list(SCENARIOS),
+                        help=f"Comma-separated subset of {','.join(SCENARIOS)} (skip needs dj_add first)")
+    parser.add_argument('--json', help='Also write the results to this file')
+    parser.add_argument('--verbose', action='store_true', help='Print each failed operation')
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+    args.members = max(args.members, args.joins + 1)
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'args': vars(args), 'results': [asdict(r) for r in results]}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,17 @@
 """
 Cog for handling Discord events in Rudebot.
 Currently greets users when they join a voice channel using a random event response.
+Joins are batched per text channel by the greeting scheduler so bursts send one message.
 """
 from discord.ext import commands
+import logging
 import os
-import random
-from data.models import Response
-from data.session import get_session
-from services.response_service import BotResponse, send_response
-from utils.logging_util import get_logger
+import time
+from services.response_service import BotResponse, send_response, get_random_response
+from utils.logging_util import get_logger, log_event
 from services.channel_service import resolve_text_channel
+from services.greeting_service import GreetingScheduler
+from services.handoff_service import handoff
 
 class Events(commands.Cog):
     """
@@ -27,20 +29,28 @@ class Events(commands.Cog):
                 self.text_channel_id = None
         # Set up a dedicated logger for this cog
         self.logger = get_logger('events', 'logs/events.log')
+        # Coalesces and rate limits greetings per guild and text channel
+        self.greetings = GreetingScheduler(self._send_greeting)
+
+    def cog_unload(self):
+        self.greetings.close()
 
     @commands.Cog.listener()
     async def on_ready(self):
         """
         Log when the bot is ready.
         """
-        self.logger.info(f"Logged in as {self.bot.user.name} with ID {self.bot.user.id}")
+        self.logger.info("Logged in as %s with ID %s", self.bot.user.name, self.bot.user.id)
         print(f"Logged in as {self.bot.user.name} with ID {self.bot.user.id}")
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """
-        Send a random event response when a non-bot member newly joins any voice channel.
+        Queue a greeting when a non-bot member newly joins any voice channel.
         """
+        if not handoff.accepting:
+            # The other process of a graceful restart greets this join
+            return
         try:
             # Only act when a user joins a voice channel (not moves or leaves)
             if before.channel is None and after.channel is not None:
@@ -49,29 +59,40 @@ class Events(commands.Cog):
                 # Resolve the text channel to send the greeting
                 text_channel = resolve_text_channel(member.guild, self.text_channel_id)
                 if not text_channel:
-                    self.logger.warning(f"No valid text channel found for guild {member.guild.id}")
+                    self.logger.warning("No valid text channel found for guild %s", member.guild.id)
                     return
-                # Fetch a random event response from the database
-                with get_session() as session:
-                    responses = session.query(Response).filter_by(category='event', trigger='join').all()
-                    if not responses:
-                        self.logger.warning(f"No event responses found in database.")
-                        return
-                    response = random.choice(responses)
-                # Build the BotResponse dataclass
-                bot_response = BotResponse(
-                    text=response.text or "",
-                    gif_url=response.gif_url or "",
-                    action=response.action or None
-                )
-                # Send the greeting response
-                await send_response(
-                    text_channel,
-                    bot_response,
-                    logger=self.logger
-                )
+                queued = self.greetings.offer(member.guild.id, text_channel)
+                log_event(self.logger, logging.INFO, 'voice_join', "%s joined %s in guild %s (%s)",
+                          member, after.channel, member.guild.id, 'queued' if queued else 'dropped',
+                          guild_id=member.guild.id, channel_id=after.channel.id, user_id=member.id)
         except Exception as e:
-            self.logger.error(f"Error in on_voice_state_update: {e}", exc_info=True)
+            self.logger.error("Error in on_voice_state_update: %s", e, exc_info=True)
+
+    async def _send_greeting(self, text_channel, joins):
+        """
+        Send one random event response for a batch of joins in a text channel.
+        """
+        started = time.perf_counter()
+        # Pick a random event response from the in-memory catalog
+        response = get_random_response('event', 'join')
+        if not response:
+            self.logger.warning("No event responses found in database.")
+            return
+        # Build the BotResponse dataclass
+        bot_response = BotResponse(
+            text=response.text or "",
+            gif_url=response.gif_url or "",
+            action=response.action or None
+        )
+        # Send the greeting response
+        await send_response(
+            text_channel,
+            bot_response,
+            logger=self.logger
+        )
+        log_event(self.logger, logging.INFO, 'greeting_sent', "Greeted %d joins in channel %s",
+                  joins, text_channel.id, guild_id=getattr(text_channel.guild, 'id', None),
+                  channel_id=text_channel.id, duration_ms=(time.perf_counter() - started) * 1000)
 
 # Required setup function for loading the cog
 async def setup(bot):
@@ -3,11 +3,39 @@ Simple music cog for Rudebot.
 Provides basic streaming music functionality.
 """
 import asyncio
+import logging
+import os
+import time
+from types import SimpleNamespace
 import discord
-import yt_dlp
 from discord.ext import commands
-from services.music_service import add_song, remove_song, get_queue, get_total_song_count
-from utils.logging_util import get_logger
+from services.queue_service import queue_store
+from services.extraction_service import extraction_service, ExtractionCancelled, video_id_from_url
+from services.audio_cache_service import audio_cache
+from services.prefetch_service import prefetcher, track_gap
+from services.playback_service import TrackedSource, create_audio_source
+from utils.logging_util import get_logger, log_event
+
+class _ResumeContext:
+    """
+    Stands in for a command context when playback resumes after a handoff:
+    plays in the saved voice channel and announces in the saved text channel.
+    """
+
+    def __init__(self, bot, guild, voice_channel, text_channel):
+        self.bot = bot
+        self.guild = guild
+        self.channel = text_channel
+        # _start_song connects to the author's voice channel
+        self.author = SimpleNamespace(id=guild.me.id, voice=SimpleNamespace(channel=voice_channel))
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def send(self, *args, **kwargs):
+        return await self.channel.send(*args, **kwargs)
+
 
 class Music(commands.Cog):
     """Simple music cog with streaming playback."""
@@ -15,7 +43,21 @@ class Music(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.logger = get_logger('music', 'logs/music.log')
-        self.current_song = {}  # guild_id: song_id
+        self.current_song = {}  # guild_id: entry_id of the playing QueuedSong
+        self.playback_ctx = {}  # guild_id: context the current song was started from
+        # Set while handing playback over to a replacement process; stopped songs stay queued
+        self.handing_off = False
+        # Songs tried per _play_next call before giving up on a run of failures
+        self.max_play_attempts = max(1, int(os.getenv('MUSIC_MAX_PLAY_ATTEMPTS', 3)))
+
+    async def cog_load(self):
+        """Restore persisted queues, start background persistence and load the audio cache."""
+        await queue_store.start()
+        await audio_cache.start()
+
+    async def cog_unload(self):
+        """Flush pending queue changes before the cog goes away."""
+        await queue_store.stop()
         
     @commands.group(name="dj", invoke_without_command=True)
     async def dj(self, ctx, *, query: str = None):
@@ -37,46 +79,34 @@ class Music(commands.Cog):
             return
             
         # Check queue limit
-        total_songs = get_total_song_count(str(ctx.guild.id))
-        if total_songs >= 10:
+        queue = queue_store.get(str(ctx.guild.id))
+        if len(queue) >= 10:
             await ctx.send("Queue is full (10 songs max).")
             return
             
         try:
-            # Get video info and extract streaming URL
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'default_search': 'ytsearch',
-                'extract_flat': False,
-                'format': 'bestaudio/best',
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(query, download=False)
-                if 'entries' in info:
-                    info = info['entries'][0]
-                    
-                title = info.get('title', 'Unknown')
-                # Store the actual YouTube video ID/URL for later streaming
-                video_id = info.get('id')
-                url = f"https://www.youtube.com/watch?v={video_id}" if video_id else info.get('webpage_url')
+            # Search in the extraction pool; stores the YouTube watch URL for later streaming
+            info = await extraction_service.search(str(ctx.guild.id), query, user_id=str(ctx.author.id))
+            title = info['title']
+            url = info['url']
                 
-                if not url:
-                    raise Exception("Could not get video URL")
-                
-            # Add to database queue
-            add_song(str(ctx.guild.id), str(ctx.author.id), title, url)
+            # Add to the in-memory queue (persisted in the background)
+            queue.push(queue_store.new_song(str(ctx.guild.id), str(ctx.author.id), title, url))
+            audio_cache.request(info.get('video_id'), url)
             await ctx.send(f"Added: {title}")
-            self.logger.info(f"Added '{title}' to queue in guild {ctx.guild.id}")
+            self._log_event(ctx, logging.INFO, 'song_added', "Added '%s' to queue in guild %s", title, ctx.guild.id)
             
-            # Start playing if not already playing
-            if not ctx.voice_client or not ctx.voice_client.is_playing():
+            # Start playing if not already playing (or starting to play)
+            if ctx.guild.id not in self.current_song and (not ctx.voice_client or not ctx.voice_client.is_playing()):
                 await self._play_next(ctx)
+            else:
+                self._schedule_prefetch(ctx.guild.id)
                 
+        except ExtractionCancelled:
+            self._log_event(ctx, logging.INFO, 'search_cancelled', "Search for '%s' cancelled in guild %s", query, ctx.guild.id)
         except Exception as e:
             await ctx.send("Failed to add song.")
-            self.logger.error(f"Failed to add song '{query}': {e}")
+            self._log_event(ctx, logging.ERROR, 'song_add_failed', "Failed to add song '%s': %s", query, e)
             
     @dj.command(name="skip", aliases=["next"])
     async def skip(self, ctx):
@@ -86,14 +116,14 @@ class Music(commands.Cog):
             return
             
         # Check if there are more songs in queue
-        queue = get_queue(str(ctx.guild.id))
+        queue = queue_store.get(str(ctx.guild.id))
         if len(queue) <= 1:  # Only current song or no songs
             await ctx.send("No more songs to skip to.")
             return
             
         ctx.voice_client.stop()
         await ctx.send("Skipped.")
-        self.logger.info(f"Song skipped in guild {ctx.guild.id}")
+        self._log_event(ctx, logging.INFO, 'song_skipped', "Song skipped in guild %s", ctx.guild.id)
         
     @dj.command(name="pause")
     async def pause(self, ctx):
@@ -104,7 +134,7 @@ class Music(commands.Cog):
             
         ctx.voice_client.pause()
         await ctx.send("Paused.")
-        self.logger.info(f"Playback paused in guild {ctx.guild.id}")
+        self._log_event(ctx, logging.INFO, 'playback_paused', "Playback paused in guild %s", ctx.guild.id)
         
     @dj.command(name="resume")
     async def resume(self, ctx):
@@ -115,7 +145,7 @@ class Music(commands.Cog):
             
         ctx.voice_client.resume()
         await ctx.send("Resumed.")
-        self.logger.info(f"Playback resumed in guild {ctx.guild.id}")
+        self._log_event(ctx, logging.INFO, 'playback_resumed', "Playback resumed in guild %s", ctx.guild.id)
         
     @dj.command(name="queue")
     async def queue_cmd(self, ctx):
@@ -124,7 +154,7 @@ class Music(commands.Cog):
         
     async def _show_queue(self, ctx):
         """Show the music queue."""
-        queue = get_queue(str(ctx.guild.id))
+        queue = queue_store.get(str(ctx.guild.id))
         if not queue:
             await ctx.send("Queue is empty.")
             return
@@ -135,12 +165,12 @@ class Music(commands.Cog):
         # Show currently playing song
         if current_song_id:
             for song in queue:
-                if song.id == current_song_id:
+                if song.entry_id == current_song_id:
                     lines.append(f"Now Playing: {song.title}")
                     break
         
         # Show remaining queue
-        remaining_songs = [song for song in queue if song.id != current_song_id]
+        remaining_songs = [song for song in queue if song.entry_id != current_song_id]
         if remaining_songs:
             lines.append("Up Next:")
             for i, song in enumerate(remaining_songs[:10], 1):
@@ -164,54 +194,114 @@ class Music(commands.Cog):
 `!dj pause` - Pause the current song
 `!dj resume` - Resume a paused song
 `!dj remove <number>` - Remove a song from the queue by position
+`!dj move <from> <to>` - Move a song to a different position in the queue
+`!dj shuffle` - Shuffle the upcoming songs
 `!dj stop` - Stop music and clear the entire queue
 `!dj help` - Show this help message
 
 **Notes:**
 - Queue limit: 10 songs maximum
 - You must be in a voice channel to add songs
-- Songs are streamed directly from YouTube
+- Songs are streamed directly from YouTube (or played from the local audio cache when enabled)
         """
         await ctx.send(help_text)
         
     @dj.command(name="remove")
     async def remove(self, ctx, index: int):
         """Remove a song from the queue by number."""
-        queue = get_queue(str(ctx.guild.id))
+        queue = queue_store.get(str(ctx.guild.id))
         if not queue or index < 1 or index > len(queue):
             await ctx.send("Invalid song number.")
             return
             
-        song = queue[index - 1]
-        remove_song(song.id)
+        song = queue.remove_at(index - 1)
+        self._schedule_prefetch(ctx.guild.id)
         await ctx.send(f"Removed: {song.title}")
-        self.logger.info(f"Removed '{song.title}' from queue in guild {ctx.guild.id}")
+        self._log_event(ctx, logging.INFO, 'song_removed', "Removed '%s' from queue in guild %s", song.title, ctx.guild.id)
+
+    @dj.command(name="move")
+    async def move(self, ctx, source: int, destination: int):
+        """Move a song to a different position in the queue."""
+        queue = queue_store.get(str(ctx.guild.id))
+        # The playing song stays at the head of the queue
+        first = 2 if self.current_song.get(ctx.guild.id) else 1
+        if not (first <= source <= len(queue)) or not (first <= destination <= len(queue)):
+            await ctx.send("Invalid song number.")
+            return
+
+        song = queue[source - 1]
+        queue.move(source - 1, destination - 1)
+        self._schedule_prefetch(ctx.guild.id)
+        await ctx.send(f"Moved: {song.title} to position {destination}")
+        self._log_event(ctx, logging.INFO, 'song_moved', "Moved '%s' to position %s in guild %s", song.title, destination, ctx.guild.id)
+
+    @dj.command(name="shuffle")
+    async def shuffle(self, ctx):
+        """Shuffle the upcoming songs."""
+        queue = queue_store.get(str(ctx.guild.id))
+        start = 1 if self.current_song.get(ctx.guild.id) else 0
+        if len(queue) - start < 2:
+            await ctx.send("Not enough songs to shuffle.")
+            return
+
+        queue.shuffle(start=start)
+        self._schedule_prefetch(ctx.guild.id)
+        await ctx.send("Queue shuffled.")
+        self._log_event(ctx, logging.INFO, 'queue_shuffled', "Queue shuffled in guild %s", ctx.guild.id)
         
     @dj.command(name="stop")
     async def stop(self, ctx):
         """Stop music and clear queue."""
+        # Cancel pending extractions, clear current song tracking and queue first, so the
+        # stopped song's after callback finds nothing to play next
+        extraction_service.cancel(str(ctx.guild.id))
+        prefetcher.discard(str(ctx.guild.id))
+        self.current_song.pop(ctx.guild.id, None)
+        self.playback_ctx.pop(ctx.guild.id, None)
+        queue_store.get(str(ctx.guild.id)).clear()
+
         if ctx.voice_client:
             ctx.voice_client.stop()
             await ctx.voice_client.disconnect()
             
-        # Clear current song tracking and queue
-        self.current_song.pop(ctx.guild.id, None)
-        queue = get_queue(str(ctx.guild.id))
-        for song in queue:
-            remove_song(song.id)
-            
         await ctx.send("Music stopped and queue cleared.")
-        self.logger.info(f"Music stopped in guild {ctx.guild.id}")
+        self._log_event(ctx, logging.INFO, 'music_stopped', "Music stopped in guild %s", ctx.guild.id)
         
-    async def _play_next(self, ctx):
-        """Play the next song in queue."""
-        queue = get_queue(str(ctx.guild.id))
-        if not queue:
-            if ctx.voice_client:
-                await ctx.voice_client.disconnect()
-            return
-            
-        song = queue[0]
+    def _schedule_prefetch(self, guild_id):
+        """Resolve (and optionally warm) the upcoming songs in the background."""
+        prefetcher.schedule(str(guild_id), queue_store.get(str(guild_id)), create_audio_source)
+
+    async def _play_next(self, ctx, ended_at: float = None, start_at: float = 0.0):
+        """
+        Play the next song in queue.
+        ended_at is when the previous track finished (perf_counter), used to measure the gap.
+        start_at seeks into the first song (used to resume after a handoff).
+        Songs that fail to start are dropped and the next one is tried, at most
+        max_play_attempts times per call, so a run of bad entries cannot spin.
+        """
+        queue = queue_store.get(str(ctx.guild.id))
+        for _ in range(self.max_play_attempts):
+            song = queue.peek()
+            if not song:
+                if ctx.voice_client:
+                    await ctx.voice_client.disconnect()
+                return
+            if await self._start_song(ctx, queue, song, ended_at, start_at):
+                return
+            start_at = 0.0
+
+        await ctx.send("Too many songs failed to play; add a song to try again.")
+        self._log_event(ctx, logging.WARNING, 'playback_gave_up', "Gave up after %d failed songs in guild %s",
+                        self.max_play_attempts, ctx.guild.id)
+
+    async def _start_song(self, ctx, queue, song, ended_at: float = None, start_at: float = 0.0) -> bool:
+        """
+        Start playing the queue head. Returns False if the song failed and was dropped,
+        True otherwise (playing, cancelled, or nothing more to do).
+        """
+        # Claim the head now so concurrent adds don't start a second playback while it resolves
+        self.current_song[ctx.guild.id] = song.entry_id
+        self.playback_ctx[ctx.guild.id] = ctx
         
         # Connect to voice if needed
         if not ctx.voice_client:
@@ -219,53 +309,165 @@ class Music(commands.Cog):
                 channel = ctx.author.voice.channel
                 await channel.connect()
             except Exception as e:
+                self._release_current(ctx.guild.id, song.entry_id)
                 await ctx.send("Failed to connect to voice channel.")
-                self.logger.error(f"Voice connection failed in guild {ctx.guild.id}: {e}")
-                return
+                self._log_event(ctx, logging.ERROR, 'voice_connect_failed', "Voice connection failed in guild %s: %s", ctx.guild.id, e)
+                return True
                 
         try:
-            # Get the actual streaming URL using yt-dlp
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'format': 'bestaudio/best',
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(song.url, download=False)
-                stream_url = info['url']
-            
-            # Create audio source
-            ffmpeg_opts = {
-                'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-                'options': '-vn'
-            }
-            source = discord.FFmpegPCMAudio(stream_url, **ffmpeg_opts)
+            video_id = video_id_from_url(song.url)
+            local_path = audio_cache.lookup(video_id)
+            if local_path:
+                # Play the cached file; no network needed
+                song.file_path = local_path
+                source = await create_audio_source(local_path, codec='opus', local=True, start=start_at)
+            else:
+                # Get the actual streaming URL using the extraction pool
+                stream = await extraction_service.resolve_stream(str(ctx.guild.id), song.url)
+                stream_url = stream['stream_url']
+                audio_cache.request(video_id, song.url)
+                
+                # Use the prefetched audio source if it is for this song, otherwise create one
+                source = None if start_at else prefetcher.take_warm(str(ctx.guild.id), song.entry_id, stream_url)
+                if source is None:
+                    source = await create_audio_source(stream_url, codec=stream.get('acodec'), start=start_at)
+
+            # Stopped (or disconnected) while resolving; don't leave the FFmpeg process behind
+            if self.current_song.get(ctx.guild.id) != song.entry_id or not ctx.voice_client:
+                source.cleanup()
+                self._release_current(ctx.guild.id, song.entry_id)
+                # A stop that landed while connecting had no voice client to disconnect
+                if not queue and ctx.voice_client and not ctx.voice_client.is_playing():
+                    await ctx.voice_client.disconnect()
+                return True
             
-            # Set current song and play with callback
-            self.current_song[ctx.guild.id] = song.id
-            ctx.voice_client.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(
-                self._after_song(ctx, song.id, e), self.bot.loop
+            # Play with callback; the end time is taken on the audio thread when the track stops.
+            # The position is tracked so a handoff can resume the song where it was
+            ctx.voice_client.play(TrackedSource(source, offset=start_at), after=lambda e: asyncio.run_coroutine_threadsafe(
+                self._after_song(ctx, song.entry_id, e, time.perf_counter()), self.bot.loop
             ))
+            gap = None
+            if ended_at is not None:
+                gap = time.perf_counter() - ended_at
+                track_gap.observe(gap)
+            self._schedule_prefetch(ctx.guild.id)
             
+            if start_at:
+                # Resumed after a handoff; listeners already heard this one announced
+                self._log_event(ctx, logging.INFO, 'song_resumed', "Resumed '%s' at %.1fs in guild %s",
+                                song.title, start_at, ctx.guild.id)
+                return True
             await ctx.send(f"Now playing: {song.title}")
-            self.logger.info(f"Playing '{song.title}' in guild {ctx.guild.id}")
+            self._log_event(ctx, logging.INFO, 'song_started', "Playing '%s' in guild %s", song.title, ctx.guild.id,
+                            duration_ms=gap * 1000 if gap is not None else None)
+            return True
             
+        except ExtractionCancelled:
+            self._release_current(ctx.guild.id, song.entry_id)
+            self._log_event(ctx, logging.INFO, 'resolve_cancelled', "Resolving '%s' cancelled in guild %s", song.title, ctx.guild.id)
+            return True
         except Exception as e:
+            self._release_current(ctx.guild.id, song.entry_id)
+            # A cached stream URL may have gone stale; resolve it fresh next time
+            extraction_service.invalidate_stream(song.url)
             await ctx.send("Failed to play song.")
-            self.logger.error(f"Playback failed for '{song.title}': {e}")
-            remove_song(song.id)
-            await self._play_next(ctx)
+            self._log_event(ctx, logging.ERROR, 'playback_failed', "Playback failed for '%s': %s", song.title, e)
+            queue.remove_entry(song.entry_id)
+            return False
             
-    async def _after_song(self, ctx, song_id, error):
+    async def begin_handoff(self) -> list:
+        """
+        Snapshot every playing guild (song, position, channels) and stop playback without
+        advancing the queues, for a replacement process to resume.
+        """
+        self.handing_off = True
+        states = []
+        for guild_id, entry_id in list(self.current_song.items()):
+            ctx = self.playback_ctx.get(guild_id)
+            client = ctx.voice_client if ctx else None
+            head = queue_store.get(str(guild_id)).peek()
+            if not client or not head or head.entry_id != entry_id:
+                continue
+            # A song still resolving has no source yet and restarts from the beginning
+            states.append({
+                'guild_id': guild_id,
+                'voice_channel_id': client.channel.id,
+                'text_channel_id': ctx.channel.id,
+                'url': head.url,
+                'position': round(getattr(client.source, 'position', 0.0), 2),
+                'paused': client.is_paused(),
+            })
+        for guild_id in self.playback_ctx:
+            extraction_service.cancel(str(guild_id))
+        await asyncio.gather(*(ctx.voice_client.disconnect() for ctx in self.playback_ctx.values() if ctx.voice_client),
+                             return_exceptions=True)
+        self.current_song.clear()
+        self.playback_ctx.clear()
+        return states
+
+    async def resume_handoff(self, states: list) -> int:
+        """
+        Resume the songs a previous process was playing, from their saved positions.
+        Returns the number of guilds resumed.
+        """
+        semaphore = asyncio.Semaphore(max(1, int(os.getenv('HANDOFF_RESUME_CONCURRENCY', 5))))
+
+        async def resume(state) -> bool:
+            guild = self.bot.get_guild(int(state['guild_id']))
+            voice_channel = guild.get_channel(state['voice_channel_id']) if guild else None
+            text_channel = guild.get_channel(state['text_channel_id']) if guild else None
+            head = queue_store.get(str(state['guild_id'])).peek()
+            if not voice_channel or not text_channel or not head or guild.id in self.current_song:
+                return False
+            # Only seek if the queue head is still the song that was playing
+            start_at = state['position'] if head.url == state['url'] else 0.0
+            ctx = _ResumeContext(self.bot, guild, voice_channel, text_channel)
+            async with semaphore:
+                await self._play_next(ctx, start_at=start_at)
+            if state['paused'] and ctx.voice_client and ctx.voice_client.is_playing():
+                ctx.voice_client.pause()
+            return guild.id in self.current_song
+
+        results = await asyncio.gather(*(resume(state) for state in states), return_exceptions=True)
+        for state, result in zip(states, results):
+            if isinstance(result, Exception):
+                self.logger.error("Failed to resume playback in guild %s: %s", state['guild_id'], result)
+        return sum(1 for result in results if result is True)
+
+    def _log_event(self, ctx, level, event, msg, *args, **fields):
+        """Log a music event tagged with the command's guild and channel."""
+        log_event(self.logger, level, event, msg, *args,
+                  guild_id=ctx.guild.id, channel_id=ctx.channel.id, **fields)
+
+    def _release_current(self, guild_id, entry_id):
+        """Clear the current song for a guild if it is still the given entry."""
+        if self.current_song.get(guild_id) == entry_id:
+            self.current_song.pop(guild_id, None)
+            self.playback_ctx.pop(guild_id, None)
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        """Cancel a member's pending searches when they leave voice."""
+        if member.bot or before.channel is None or after.channel is not None:
+            return
+        extraction_service.cancel(str(member.guild.id), user_id=str(member.id))
+
+    async def _after_song(self, ctx, entry_id, error, ended_at=None):
         """Callback after song finishes."""
         if error:
-            self.logger.error(f"Playback error: {error}")
+            self._log_event(ctx, logging.ERROR, 'playback_error', "Playback error: %s", error)
             
+        if self.handing_off:
+            # Stopped for a handoff; the song stays queued for the new process to resume
+            return
+
         # Clear current song tracking
-        self.current_song.pop(ctx.guild.id, None)
-        remove_song(song_id)
-        await self._play_next(ctx)
+        self._release_current(ctx.guild.id, entry_id)
+        queue_store.get(str(ctx.guild.id)).remove_entry(entry_id)
+        if ctx.guild.id in self.current_song:
+            # Another song already started (e.g. one added right after a stop)
+            return
+        await self._play_next(ctx, ended_at)
 
 async def setup(bot):
     await bot.add_cog(Music(bot))
\ No newline at end of file
@@ -0,0 +1,74 @@
+"""
+Async database access for Rudebot.
+Runs blocking SQLAlchemy work on executor threads so cogs never block the event loop.
+Writes go through a single writer thread; reads use a pool sized to the read connection pool.
+"""
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from data.session import get_db_settings
+from utils.metrics_util import registry
+
+_write_executor = None
+_read_executor = None
+
+# Time a call spends executing on a DB thread
+db_query_latency = registry.histogram('db_query_seconds', 'Time spent executing database calls')
+# Time a call waits for a DB thread before it starts
+db_queue_wait = registry.histogram('db_queue_wait_seconds', 'Time database calls wait for the executor')
+
+
+def _executors():
+    global _write_executor, _read_executor
+    if _write_executor is None:
+        # SQLite serializes writers anyway, so a single thread keeps ordering simple
+        _write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rudebot-db-write')
+        _read_executor = ThreadPoolExecutor(
+            max_workers=get_db_settings()['read_pool_size'],
+            thread_name_prefix='rudebot-db-read'
+        )
+    return _write_executor, _read_executor
+
+
+async def _run(executor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+
+    def call():
+        started = time.perf_counter()
+        db_queue_wait.observe(started - submitted)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            db_query_latency.observe(time.perf_counter() - started)
+
+    # Carry context variables onto the DB thread, as asyncio.to_thread does
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, context.run, call)
+
+
+async def run_write(func, *args, **kwargs):
+    """
+    Run a blocking function that writes to the database on the writer thread.
+    """
+    return await _run(_executors()[0], func, *args, **kwargs)
+
+
+async def run_read(func, *args, **kwargs):
+    """
+    Run a blocking read-only database function on the read pool.
+    """
+    return await _run(_executors()[1], func, *args, **kwargs)
+
+
+def shutdown_db_executor():
+    """
+    Wait for pending database calls to finish and stop the executor threads.
+    """
+    global _write_executor, _read_executor
+    for executor in (_write_executor, _read_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _write_executor = None
+    _read_executor = None
@@ -1,15 +1,9 @@
 """
-Initialize the database with tables.
-Updated for new data directory structure.
+Initialize or upgrade the database schema.
+Thin wrapper around the migration runner so existing scripts keep working.
 """
-import os
-from sqlalchemy import create_engine
-from models import Base
-
-# Database path (updated for new data directory structure)
-DB_PATH = os.path.join(os.path.dirname(__file__), 'rudebot.sqlite3')
-engine = create_engine(f'sqlite:///{DB_PATH}')
+from migrations import migrate
 
 if __name__ == '__main__':
-    Base.metadata.create_all(engine)
-    print('Database initialized.') 
\ No newline at end of file
+    version = migrate(verbose=True)
+    print(f'Database initialized (schema version {version}).')
@@ -0,0 +1,149 @@
+"""
+Lightweight schema migration runner for Rudebot.
+Tracks the applied schema version in SQLite's user_version pragma and applies
+pending migrations in order, each in its own transaction. Safe to run on every start.
+Uses only the sqlite3 module so it can run before the rest of the bot is importable.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+
+# Database path (updated for new data directory structure)
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rudebot.sqlite3')
+
+
+# Response columns that make up its content; two rows with the same content are the same response
+RESPONSE_CONTENT_COLUMNS = ('category', 'trigger', 'text', 'gif_url', 'emote', 'action')
+
+
+def response_content_key(category, trigger, text=None, gif_url=None, emote=None, action=None) -> str:
+    """
+    Stable identity of a response: a hash of its content, treating empty strings and NULL alike
+    (the response catalog does too). Imports upsert on this key.
+    """
+    values = [category, trigger, text, gif_url, emote, action]
+    payload = json.dumps([value or '' for value in values], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _column_names(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _initial_schema(cursor):
+    """Tables as originally created by init_db.py."""
+    # Individual statements: executescript() would commit the surrounding transaction
+    statements = [
+        """CREATE TABLE IF NOT EXISTS command_types (
+            id INTEGER NOT NULL PRIMARY KEY,
+            command_type VARCHAR(100) NOT NULL UNIQUE
+        )""",
+        """CREATE TABLE IF NOT EXISTS action_types (
+            id INTEGER NOT NULL PRIMARY KEY,
+            action_type VARCHAR(100) NOT NULL UNIQUE,
+            description TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS responses (
+            id INTEGER NOT NULL PRIMARY KEY,
+            category VARCHAR(32) NOT NULL,
+            "trigger" VARCHAR(100) NOT NULL,
+            text TEXT,
+            gif_url TEXT,
+            emote VARCHAR(100),
+            action VARCHAR(100)
+        )""",
+        """CREATE TABLE IF NOT EXISTS song_queue (
+            id INTEGER NOT NULL PRIMARY KEY,
+            guild_id VARCHAR(32) NOT NULL,
+            user_id VARCHAR(32) NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            url VARCHAR(512) NOT NULL,
+            file_path VARCHAR(512),
+            added_at INTEGER NOT NULL
+        )""",
+    ]
+    for statement in statements:
+        cursor.execute(statement)
+
+
+def _queue_position_and_indexes(cursor):
+    """Explicit queue ordering plus indexes for queue and response lookups."""
+    if 'position' not in _column_names(cursor, 'song_queue'):
+        cursor.execute("ALTER TABLE song_queue ADD COLUMN position INTEGER NOT NULL DEFAULT 0")
+    # Number existing rows per guild in their old added_at order, breaking ties by id
+    cursor.execute("""
+        UPDATE song_queue SET position = (
+            SELECT COUNT(*) FROM song_queue AS earlier
+            WHERE earlier.guild_id = song_queue.guild_id
+              AND (earlier.added_at < song_queue.added_at
+                   OR (earlier.added_at = song_queue.added_at AND earlier.id < song_queue.id))
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_song_queue_guild_added ON song_queue (guild_id, added_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_song_queue_guild_position ON song_queue (guild_id, position)")
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_responses_category_trigger ON responses (category, "trigger")')
+
+
+def _response_content_key(cursor):
+    """responses.content_key: unique content hash, so bulk imports can upsert on it."""
+    if 'content_key' not in _column_names(cursor, 'responses'):
+        cursor.execute("ALTER TABLE responses ADD COLUMN content_key VARCHAR(40)")
+    cursor.execute('SELECT id, category, "trigger", text, gif_url, emote, action FROM responses ORDER BY id')
+    keys, duplicates = {}, []
+    for row_id, *content in cursor.fetchall():
+        key = response_content_key(*content)
+        if key in keys:
+            duplicates.append((row_id,))
+        else:
+            keys[key] = row_id
+    # Identical copies would break the unique index; keep the oldest
+    cursor.executemany("DELETE FROM responses WHERE id = ?", duplicates)
+    cursor.executemany("UPDATE responses SET content_key = ? WHERE id = ?", list(keys.items()))
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_responses_content_key ON responses (content_key)")
+
+
+# Ordered list of (version, description, function). Append only; never edit applied entries.
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "song_queue.position and lookup indexes", _queue_position_and_indexes),
+    (3, "responses.content_key", _response_content_key),
+]
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_path: str = DB_PATH, verbose: bool = False) -> int:
+    """
+    Apply all pending migrations to the database at db_path (created if missing).
+    Returns the resulting schema version.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        current = get_schema_version(conn)
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                apply(cursor)
+                cursor.execute(f"PRAGMA user_version = {version}")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            current = version
+            if verbose:
+                print(f"Applied migration {version}: {description}")
+        return current
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    version = migrate(verbose=True)
+    print(f'Database schema at version {version}.')
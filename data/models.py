@@ -3,9 +3,10 @@ SQLAlchemy ORM models for Rudebot.
 Includes unified Response model for all command and event responses.
 Updated for new data directory structure.
 """
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
+from data.migrations import RESPONSE_CONTENT_COLUMNS, response_content_key
 
 Base = declarative_base()
 
@@ -22,14 +23,24 @@ class ActionType(Base):
     description = Column(Text, nullable=True)
     # (Legacy) Used for normalization, not directly referenced by Response
 
+def _content_key_default(context):
+    """Fill responses.content_key from the inserted row's content."""
+    params = context.get_current_parameters()
+    return response_content_key(*(params.get(column) for column in RESPONSE_CONTENT_COLUMNS))
+
 class Response(Base):
     """
     Unified model for all bot responses (commands, events, etc.).
     category: 'command', 'event', etc.
     trigger: command name or event type (e.g., 'hello', 'join')
     text, gif_url, emote, action: response content
+    content_key: hash of the content above (data/migrations.py), unique per response
     """
     __tablename__ = 'responses'
+    __table_args__ = (
+        Index('ix_responses_category_trigger', 'category', 'trigger'),
+        Index('ux_responses_content_key', 'content_key', unique=True),
+    )
     id = Column(Integer, primary_key=True)
     category = Column(String(32), nullable=False)  # e.g., 'command', 'event'
     trigger = Column(String(100), nullable=False)  # e.g., command name or event type
@@ -37,16 +48,24 @@ class Response(Base):
     gif_url = Column(Text, nullable=True)
     emote = Column(String(100), nullable=True)
     action = Column(String(100), nullable=True)
+    content_key = Column(String(40), nullable=True, default=_content_key_default)
 
 class SongQueue(Base):
     """
     Model for storing the music queue and playback for each guild.
+    position gives the explicit play order within a guild (0 = head of the queue).
+    Schema changes ship through data/migrations.py.
     """
     __tablename__ = 'song_queue'
+    __table_args__ = (
+        Index('ix_song_queue_guild_added', 'guild_id', 'added_at'),
+        Index('ix_song_queue_guild_position', 'guild_id', 'position'),
+    )
     id = Column(Integer, primary_key=True)
     guild_id = Column(String(32), nullable=False)
     user_id = Column(String(32), nullable=False)
     title = Column(String(255), nullable=False)
     url = Column(String(512), nullable=False)
     file_path = Column(String(512), nullable=True)  # Path to downloaded audio file
-    added_at = Column(Integer, nullable=False)  # Unix timestamp
\ No newline at end of file
+    added_at = Column(Integer, nullable=False)  # Unix timestamp
+    position = Column(Integer, nullable=False, default=0)  # Order within the guild queue
\ No newline at end of file
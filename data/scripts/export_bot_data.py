@@ -1,30 +1,86 @@
-import sqlite3
+"""
+Export bot data (responses, command types, action types) for import_bot_data.py.
+Rows are streamed from the database, so large tables are never held in memory.
+Writes NDJSON (one {"table": ..., <columns>} object per line) for .ndjson/.jsonl paths
+or when --ndjson is given, otherwise JSON with one row per line.
+
+Usage (from the project root):
+    python data/scripts/export_bot_data.py                  # data/bot_data.json
+    python data/scripts/export_bot_data.py dump.ndjson
+    python data/scripts/export_bot_data.py --ndjson - | gzip > dump.ndjson.gz
+"""
+import argparse
 import json
+import sqlite3
+import sys
 
 # Database and export paths (updated for new data directory structure)
 DB_PATH = 'data/rudebot.sqlite3'
 EXPORT_PATH = 'data/bot_data.json'
 
-def export_all():
+TABLES = ('responses', 'command_types', 'action_types')
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+# Internal columns that import_bot_data.py derives itself
+SKIPPED_COLUMNS = {'content_key'}
+
+
+def iter_rows(conn, table):
+    """Yield the rows of a table as dicts, reading from the cursor as it goes."""
+    cursor = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+    columns = [desc[0] for desc in cursor.description]
+    for row in cursor:
+        yield {column: value for column, value in zip(columns, row) if column not in SKIPPED_COLUMNS}
+
+
+def write_ndjson(conn, out):
+    counts = {}
+    for table in TABLES:
+        counts[table] = 0
+        for row in iter_rows(conn, table):
+            out.write(json.dumps({'table': table, **row}, ensure_ascii=False) + '\n')
+            counts[table] += 1
+    return counts
+
+
+def write_json(conn, out):
+    counts = {}
+    out.write('{')
+    for index, table in enumerate(TABLES):
+        counts[table] = 0
+        out.write(f'{"," if index else ""}\n  {json.dumps(table)}: [')
+        for row in iter_rows(conn, table):
+            out.write(f'{"," if counts[table] else ""}\n    {json.dumps(row, ensure_ascii=False)}')
+            counts[table] += 1
+        out.write('\n  ]' if counts[table] else ']')
+    out.write('\n}\n')
+    return counts
+
+
+def export_all(path=EXPORT_PATH, ndjson=None):
+    if ndjson is None:
+        ndjson = path.endswith(NDJSON_EXTENSIONS)
+    writer = write_ndjson if ndjson else write_json
     conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    try:
+        if path == '-':
+            counts = writer(conn, sys.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                counts = writer(conn, f)
+    finally:
+        conn.close()
+    summary = ', '.join(f"{count} {table}" for table, count in counts.items())
+    # Keep stdout clean when the export itself goes there
+    print(f"Exported bot data to {path} ({summary})", file=sys.stderr if path == '-' else sys.stdout)
 
-    def export_table(table):
-        cursor.execute(f"SELECT * FROM {table}")
-        columns = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-        return [dict(zip(columns, row)) for row in rows]
 
-    data = {
-        'responses': export_table('responses'),
-        'command_types': export_table('command_types'),
-        'action_types': export_table('action_types'),
-    }
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export bot data as JSON or NDJSON.')
+    parser.add_argument('path', nargs='?', default=EXPORT_PATH, help=f'Output file, - for stdout (default: {EXPORT_PATH})')
+    parser.add_argument('--ndjson', action='store_true', default=None, help='Write NDJSON whatever the file extension')
+    args = parser.parse_args(argv)
+    export_all(args.path, ndjson=args.ndjson)
 
-    with open(EXPORT_PATH, 'w') as f:
-        json.dump(data, f, indent=2)
-    print(f"Exported bot data to {EXPORT_PATH}")
-    conn.close()
 
 if __name__ == '__main__':
-    export_all() 
\ No newline at end of file
+    main()
@@ -1,81 +1,208 @@
-import sqlite3
+"""
+Bulk import of bot data (responses, command types, action types) into the database.
+Reads the JSON written by export_bot_data.py ({"responses": [...], ...}) or NDJSON
+(one {"table": ..., <columns>} object per line; used for .ndjson/.jsonl files).
+
+Responses are identified by their content (responses.content_key), so every distinct
+response is kept, including several for the same category and trigger. All rows are
+upserted with executemany in a single transaction. Afterwards the running bot is told to
+rebuild its response catalog (control socket, falling back to the stamp file).
+
+Usage (from the project root):
+    python data/scripts/import_bot_data.py                   # data/bot_data.json
+    python data/scripts/import_bot_data.py dump.ndjson --prune
+    python data/scripts/import_bot_data.py --diff            # show changes, write nothing
+"""
+import argparse
+import glob
 import json
 import os
+import sqlite3
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'scripts')]
+
+from data.migrations import RESPONSE_CONTENT_COLUMNS, migrate, response_content_key
+from rudebotctl import default_socket_path, request
 
 # Database and import paths (updated for new data directory structure)
 DB_PATH = 'data/rudebot.sqlite3'
 IMPORT_PATH = 'data/bot_data.json'
+# Touching this file tells a running bot to rebuild its response catalog
+RESPONSES_STAMP_PATH = 'data/.responses_version'
+
+TABLES = ('responses', 'command_types', 'action_types')
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+
+def read_rows(path):
+    """Rows of the input file grouped by table."""
+    rows = {table: [] for table in TABLES}
+    if path.endswith(NDJSON_EXTENSIONS):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                table = row.pop('table', None)
+                if table not in rows:
+                    raise ValueError(f"{path}:{line_number}: unknown table {table!r}")
+                rows[table].append(row)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for table in TABLES:
+            rows[table] = data.get(table, [])
+    return rows
+
+
+def plan_responses(cursor, responses):
+    """
+    Compare the input responses with the database by content key.
+    Returns (new rows keyed by content key, keys in both, database-only rows keyed by content key,
+    number of duplicate rows in the input).
+    """
+    incoming = {}
+    duplicates = 0
+    for resp in responses:
+        content = [resp.get(column) for column in RESPONSE_CONTENT_COLUMNS]
+        if not content[0] or not content[1]:
+            raise ValueError(f"Response without category or trigger: {resp}")
+        key = response_content_key(*content)
+        if key in incoming:
+            duplicates += 1
+        else:
+            incoming[key] = content
+    cursor.execute('SELECT content_key, category, "trigger", text, gif_url, emote, action FROM responses')
+    existing = {key: content for key, *content in cursor.fetchall()}
+    added = {key: content for key, content in incoming.items() if key not in existing}
+    unchanged = incoming.keys() & existing.keys()
+    removed = {key: content for key, content in existing.items() if key not in incoming}
+    return added, unchanged, removed, duplicates
+
+
+def apply_import(cursor, rows, added, removed, prune):
+    """Write the planned changes. Returns (command types added, action types added)."""
+    cursor.executemany(
+        'INSERT INTO responses (category, "trigger", text, gif_url, emote, action, content_key) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (content_key) DO NOTHING',
+        [(*content, key) for key, content in added.items()]
+    )
+    if prune:
+        cursor.executemany("DELETE FROM responses WHERE content_key = ?", [(key,) for key in removed])
+
+    command_types = _count_new(cursor, 'command_types', 'command_type', rows['command_types'])
+    cursor.executemany(
+        "INSERT INTO command_types (command_type) VALUES (?) ON CONFLICT (command_type) DO NOTHING",
+        [(ct['command_type'],) for ct in rows['command_types']]
+    )
+    action_types = _count_new(cursor, 'action_types', 'action_type', rows['action_types'])
+    # Descriptions may have been edited in the file
+    cursor.executemany(
+        "INSERT INTO action_types (action_type, description) VALUES (?, ?) "
+        "ON CONFLICT (action_type) DO UPDATE SET description = excluded.description",
+        [(at['action_type'], at.get('description')) for at in rows['action_types']]
+    )
+    return command_types, action_types
 
-def import_all():
-    if not os.path.exists(IMPORT_PATH):
-        print(f"File not found: {IMPORT_PATH}")
+
+def _count_new(cursor, table, column, rows):
+    """Number of distinct values in rows that are not in the table yet."""
+    cursor.execute(f"SELECT {column} FROM {table}")
+    known = {row[0] for row in cursor.fetchall()}
+    return len({row[column] for row in rows} - known)
+
+
+def notify_bot():
+    """
+    Tell running bots to rebuild their response catalog. The stamp file is touched first so a
+    catalog reloaded over the control socket does not reload again when it sees the stamp.
+    """
+    with open(RESPONSES_STAMP_PATH, 'w') as f:
+        f.write(str(time.time()))
+    # The main process and any shard workers (<socket>.<worker>)
+    notified = 0
+    for path in sorted(glob.glob(glob.escape(default_socket_path()) + '*')):
+        try:
+            reply = request(path, 'reload-responses', [], timeout=30)
+        except (OSError, ValueError):
+            continue
+        if reply.get('ok'):
+            notified += 1
+    if notified:
+        print(f"Reloaded the response catalog in {notified} running bot process(es)")
+
+
+def _describe(content):
+    category, trigger, text, gif_url, emote, action = content
+    extras = ', '.join(f"{name}={value}" for name, value in
+                       (('gif', gif_url), ('emote', emote), ('action', action)) if value)
+    return f"{category}/{trigger}: {text or ''}" + (f" ({extras})" if extras else '')
+
+
+def import_all(path=IMPORT_PATH, prune=False, dry_run=False, diff=False):
+    if not os.path.exists(path):
+        print(f"File not found: {path}")
         return
-    
-    with open(IMPORT_PATH, 'r') as f:
-        data = json.load(f)
-    
-    conn = sqlite3.connect(DB_PATH)
+
+    started = time.perf_counter()
+    rows = read_rows(path)
+    # The import runs before the bot starts (start.sh), so bring the schema up to date first
+    migrate(db_path=DB_PATH)
+
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
     cursor = conn.cursor()
-    
-    # Track what was actually imported vs what already existed
-    imported_counts = {'command_types': 0, 'action_types': 0, 'responses': 0}
-    existing_counts = {'command_types': 0, 'action_types': 0, 'responses': 0}
-    
-    # Import command_types
-    for ct in data.get('command_types', []):
-        cursor.execute("SELECT 1 FROM command_types WHERE command_type = ?", (ct['command_type'],))
-        if not cursor.fetchone():
-            cursor.execute("INSERT INTO command_types (command_type) VALUES (?)", (ct['command_type'],))
-            imported_counts['command_types'] += 1
-        else:
-            existing_counts['command_types'] += 1
-    
-    # Import action_types
-    for at in data.get('action_types', []):
-        cursor.execute("SELECT 1 FROM action_types WHERE action_type = ?", (at['action_type'],))
-        if not cursor.fetchone():
-            cursor.execute("INSERT INTO action_types (action_type, description) VALUES (?, ?)", (at['action_type'], at.get('description')))
-            imported_counts['action_types'] += 1
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        added, unchanged, removed, duplicates = plan_responses(cursor, rows['responses'])
+        if diff:
+            for content in added.values():
+                print(f"+ {_describe(content)}")
+            for content in removed.values():
+                print(f"{'-' if prune else '?'} {_describe(content)}")
+        if dry_run or diff:
+            cursor.execute("ROLLBACK")
+            command_types = action_types = None
         else:
-            existing_counts['action_types'] += 1
-    
-    # Import responses - use category + trigger as unique identifier
-    for resp in data.get('responses', []):
-        # Check if a response with this category and trigger already exists
-        cursor.execute("SELECT id FROM responses WHERE category = ? AND trigger = ?", (
-            resp.get('category'), resp.get('trigger')))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Update existing response with new data
-            cursor.execute("""
-                UPDATE responses 
-                SET text = ?, gif_url = ?, emote = ?, action = ?
-                WHERE id = ?
-            """, (
-                resp.get('text'), resp.get('gif_url'), resp.get('emote'), resp.get('action'), existing[0]
-            ))
-            existing_counts['responses'] += 1
-        else:
-            # Insert new response
-            cursor.execute("""
-                INSERT INTO responses (category, trigger, text, gif_url, emote, action) 
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                resp.get('category'), resp.get('trigger'), resp.get('text'), 
-                resp.get('gif_url'), resp.get('emote'), resp.get('action')
-            ))
-            imported_counts['responses'] += 1
-    
-    conn.commit()
-    
+            command_types, action_types = apply_import(cursor, rows, added, removed, prune)
+            cursor.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
     # Print detailed import summary
-    print("Database import summary:")
-    print(f"  Command types: {imported_counts['command_types']} imported, {existing_counts['command_types']} already existed")
-    print(f"  Action types: {imported_counts['action_types']} imported, {existing_counts['action_types']} already existed")
-    print(f"  Responses: {imported_counts['responses']} imported, {existing_counts['responses']} updated")
-    
-    conn.close()
+    prefix = "Dry run, nothing written" if command_types is None else "Database import summary"
+    print(f"{prefix} ({path}, {time.perf_counter() - started:.2f}s):")
+    print(f"  Responses: {len(added)} new, {len(unchanged)} unchanged, {duplicates} duplicates in file, "
+          f"{len(removed)} {'removed' if prune else 'only in database'}")
+    if command_types is not None:
+        print(f"  Command types: {command_types} imported, {len(rows['command_types']) - command_types} already existed")
+        print(f"  Action types: {action_types} imported, {len(rows['action_types']) - action_types} already existed")
+        if added or (prune and removed):
+            notify_bot()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import bot data (JSON or NDJSON) into the database.')
+    parser.add_argument('path', nargs='?', default=IMPORT_PATH, help=f'Input file (default: {IMPORT_PATH})')
+    parser.add_argument('--prune', action='store_true', help='Delete responses that are not in the input file')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+    parser.add_argument('--diff', action='store_true',
+                        help='List the responses that would be added (+) and removed (-, or ? without --prune); '
+                             'implies --dry-run')
+    args = parser.parse_args(argv)
+    try:
+        import_all(args.path, prune=args.prune, dry_run=args.dry_run, diff=args.diff)
+    except (ValueError, KeyError, sqlite3.Error) as e:
+        print(f"Import failed, nothing written: {e!r}", file=sys.stderr)
+        return 1
+    return 0
+
 
 if __name__ == '__main__':
-    import_all() 
\ No newline at end of file
+    sys.exit(main())
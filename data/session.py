@@ -1,22 +1,128 @@
-from sqlalchemy import create_engine
+"""
+Database engine and session management for Rudebot.
+Configures SQLite for a bot workload: WAL journaling, one writer connection and a small read pool.
+All settings can be overridden through environment variables (see env.template).
+"""
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 
 # Database path (updated for new data directory structure)
 DB_PATH = 'data/rudebot.sqlite3'
-engine = create_engine(
-    f'sqlite:///{DB_PATH}',
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    pool_recycle=3600
-)
-Session = sessionmaker(bind=engine)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_db_settings() -> dict:
+    """
+    Read the SQLite profile from the environment.
+    """
+    return {
+        'journal_mode': os.getenv('DB_JOURNAL_MODE', 'WAL').upper(),
+        'synchronous': os.getenv('DB_SYNCHRONOUS', 'NORMAL').upper(),
+        'cache_size_kb': _env_int('DB_CACHE_SIZE_KB', 8192),
+        'mmap_size_mb': _env_int('DB_MMAP_SIZE_MB', 64),
+        'busy_timeout_ms': _env_int('DB_BUSY_TIMEOUT_MS', 5000),
+        'read_pool_size': max(1, _env_int('DB_READ_POOL_SIZE', 4)),
+    }
+
+
+def _apply_pragmas(engine, settings: dict, read_only: bool):
+    """
+    Set per-connection pragmas every time the pool opens a new SQLite connection.
+    """
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # Journal mode is persistent in the file; only the writer needs to set it
+            cursor.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{settings['cache_size_kb']}")
+        cursor.execute(f"PRAGMA mmap_size={settings['mmap_size_mb'] * 1024 * 1024}")
+        cursor.execute(f"PRAGMA busy_timeout={settings['busy_timeout_ms']}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _build_engine(settings: dict, pool_size: int, read_only: bool):
+    engine = create_engine(
+        f'sqlite:///{DB_PATH}',
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=30,
+        connect_args={
+            'check_same_thread': False,
+            'timeout': settings['busy_timeout_ms'] / 1000,
+        }
+    )
+    _apply_pragmas(engine, settings, read_only)
+    return engine
+
+
+_write_engine = None
+_read_engine = None
+_WriteSession = sessionmaker()
+_ReadSession = sessionmaker()
+
+
+def _ensure_engines():
+    """
+    Build the engines on first use so .env values loaded at startup are honoured.
+    """
+    global _write_engine, _read_engine
+    if _write_engine is None:
+        settings = get_db_settings()
+        # SQLite allows a single writer; more writer connections only contend on the file lock
+        _write_engine = _build_engine(settings, pool_size=1, read_only=False)
+        # WAL lets readers run alongside the writer without blocking
+        _read_engine = _build_engine(settings, pool_size=settings['read_pool_size'], read_only=True)
+        _WriteSession.configure(bind=_write_engine)
+        _ReadSession.configure(bind=_read_engine)
+
+
+def get_write_engine():
+    """Return the single-connection writer engine."""
+    _ensure_engines()
+    return _write_engine
+
+
+def get_read_engine():
+    """Return the read-only pooled engine."""
+    _ensure_engines()
+    return _read_engine
+
 
 @contextmanager
 def get_session():
-    session = Session()
+    """
+    Session bound to the writer connection. Use for anything that modifies data.
+    """
+    _ensure_engines()
+    session = _WriteSession()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@contextmanager
+def get_read_session():
+    """
+    Session bound to the read pool. Use for queries that never write.
+    """
+    _ensure_engines()
+    session = _ReadSession()
     try:
         yield session
     finally:
-        session.close() 
\ No newline at end of file
+        session.close()
@@ -2,69 +2,263 @@
 Main entry point for Rudebot Discord bot.
 Handles bot setup, cog loading, and startup/shutdown lifecycle.
 """
+import sys
+
+# Imported before everything else so --profile-startup can time the imports below
+from utils.startup_profiler import PROCESS_START, profiler
+if '--profile-startup' in sys.argv:
+    profiler.enable()
+
 import discord
 from discord.ext import commands
 
+import argparse
+import ast
 import asyncio
 import logging
 import os
+import signal
+import time
 
 from dotenv import load_dotenv
-from utils.logging_util import setup_logging
+from utils.logging_util import setup_logging, shutdown_logging
+from utils.intents_util import build_intents, cache_options, get_cache_profile
 from services.console_service import ConsoleService
+from services.control_service import ControlServer, get_control_settings
+from services.handoff_service import handoff
+from services.response_service import response_catalog
+from data.async_session import shutdown_db_executor
+from data.migrations import migrate
+from services.extraction_service import extraction_service
+from services.audio_cache_service import audio_cache
+from services.queue_service import queue_store
+from services.shard_service import ShardSupervisor, health_reporter, shard_for_guild
+from services.metrics_service import MetricsServer, get_metrics_settings, instrument_bot
+from services.watchdog_service import loop_watchdog
+
+profiler.mark('imports', PROCESS_START)
 
-# Set up centralized logging for the project
+# Set up centralized logging for the project (LOG_* settings may come from .env)
+load_dotenv()
 setup_logging()
 logger = logging.getLogger("main")
 
+def _defines_async_setup(path):
+    """True if the module at path defines a top-level `async def setup`."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    return any(isinstance(node, ast.AsyncFunctionDef) and node.name == 'setup' for node in tree.body)
+
 def discover_cogs(base_dir='cogs'):
     """
     Discover all valid cog modules in the cogs directory (no subdirectories).
-    Only loads files that contain an async setup function.
+    Only loads files that define a top-level async setup function (checked by parsing, not importing).
     """
     cogs = []
-    for file in os.listdir(base_dir):
+    for file in sorted(os.listdir(base_dir)):
         if file.endswith('.py') and file != '__init__.py' and not file.startswith('_'):
             module = file[:-3]
             abs_path = os.path.join(base_dir, file)
-            with open(abs_path, 'r', encoding='utf-8') as f:
-                if 'async def setup(' not in f.read():
+            try:
+                if not _defines_async_setup(abs_path):
                     continue
+            except SyntaxError as e:
+                logger.error(f"Skipping cog {module}: {e}")
+                continue
             cogs.append(f'cogs.{module}')
     return cogs
 
-async def main():
+async def warm_caches():
+    """
+    Load the response catalog and the extraction caches on worker threads,
+    in parallel with each other, cog loading and the gateway login.
+    """
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        asyncio.to_thread(response_catalog.load),
+        asyncio.to_thread(extraction_service.warm),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"Failed to warm caches: {result}", exc_info=result)
+    profiler.mark('warm_caches', started)
+
+async def report_startup(bot, connect_started):
+    """Log the --profile-startup report once the gateway is ready."""
+    await bot.wait_until_ready()
+    profiler.mark('gateway_ready', connect_started)
+    profiler.disable_imports()
+    logger.info(profiler.report())
+
+def parse_args(argv=None):
+    """
+    Command line options. Without options the bot runs according to SHARD_MODE:
+    none (single connection), auto (AutoShardedBot in-process) or process (supervisor).
+    """
+    parser = argparse.ArgumentParser(description="Rudebot Discord bot")
+    parser.add_argument('--supervise', action='store_true',
+                        help='Run the shard supervisor (one worker process per shard range)')
+    parser.add_argument('--shard-ids', help='Comma-separated shard ids this process owns')
+    parser.add_argument('--shard-count', type=int, help='Total number of shards')
+    parser.add_argument('--worker-name', help='Name used for this worker\'s health reports')
+    parser.add_argument('--no-console', action='store_true', help='Do not read console commands from stdin')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Log an import-time and startup phase breakdown once the bot is ready')
+    parser.add_argument('--handoff-from', metavar='DIR',
+                        help='Take over from a running bot that started this process (graceful restart)')
+    return parser.parse_args(argv)
+
+def handoff_argv(argv):
+    """Command line for a graceful restart replacement: these options without --handoff-from."""
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == '--handoff-from':
+            skip = True
+        elif not arg.startswith('--handoff-from='):
+            result.append(arg)
+    return result
+
+async def take_over(bot, directory, servers):
+    """
+    Take over from the bot that started this process, then start the control socket and
+    metrics endpoint it held (they are released when it exits).
+    """
+    try:
+        taken_over = await handoff.receive(bot, directory)
+    except Exception as e:
+        logger.error(f"Handoff failed: {e}", exc_info=True)
+        taken_over = False
+    if not taken_over:
+        # The old process is still running the bot; don't answer alongside it
+        await bot.close()
+        return
+    for server in servers:
+        try:
+            await server.start()
+        except OSError as e:
+            logger.error(f"Failed to start {type(server).__name__} after handoff: {e}")
+
+def build_bot(intents, shard_ids=None, shard_count=None, **options):
+    """
+    Create the bot: sharded when shard options are given or SHARD_MODE=auto, otherwise a plain Bot.
+    Extra options (member cache flags, chunking) are passed through to discord.py.
+    """
+    if shard_ids is not None or os.getenv('SHARD_MODE', 'none').lower() == 'auto':
+        if shard_count is None and os.getenv('SHARD_COUNT'):
+            shard_count = int(os.getenv('SHARD_COUNT'))
+        # With no shard_count discord.py uses Discord's recommended count
+        return commands.AutoShardedBot(
+            command_prefix="!", intents=intents, shard_ids=shard_ids, shard_count=shard_count, **options
+        )
+    return commands.Bot(command_prefix="!", intents=intents, **options)
+
+async def supervise():
+    """
+    Run SHARD_PROCESSES worker processes covering SHARD_COUNT shards and restart them on failure.
+    """
+    shard_count = int(os.getenv('SHARD_COUNT') or 1)
+    processes = int(os.getenv('SHARD_PROCESSES') or shard_count)
+    supervisor = ShardSupervisor(shard_count, processes)
+    logger.info(f"Supervisor starting {len(supervisor.workers)} workers for {shard_count} shards.")
+    await supervisor.run()
+    logger.info("Supervisor stopped.")
+
+async def main(args=None):
     """
     Main async entry point for the bot.
     Loads environment, sets up bot, loads cogs, and starts the bot.
+    Returns True if the bot was stopped by a restart command.
     """
+    args = args or parse_args([])
+
     # Load environment variables (including DISCORD_TOKEN)
     load_dotenv()
     token = os.getenv('DISCORD_TOKEN')
 
-    # Set Discord bot intents
-    intents = discord.Intents.default()
-    intents.presences = True
-    intents.message_content = True
-    intents.voice_states = True
-    intents.members = True
+    if args.supervise or (os.getenv('SHARD_MODE', 'none').lower() == 'process' and not args.shard_ids):
+        await supervise()
+        return
+
+    # Set Discord bot intents and member caching from the cache profile
+    cache_profile = get_cache_profile()
+    intents = build_intents(cache_profile)
+    logger.info(f"Using '{cache_profile}' cache profile")
+
+    # Initialize the bot (sharded when this process owns a shard range)
+    shard_ids = [int(i) for i in args.shard_ids.split(',')] if args.shard_ids else None
+    bot = build_bot(intents, shard_ids=shard_ids, shard_count=args.shard_count, **cache_options(cache_profile))
+    if shard_ids is not None:
+        # Music state stays shard-local: only restore queues for guilds on our shards
+        owned = set(shard_ids)
+        queue_store.guild_filter = lambda guild_id: shard_for_guild(guild_id, args.shard_count) in owned
+    if args.worker_name:
+        # Each worker sweeps files missing from its own cache index, so workers can't share one
+        audio_cache.directory = os.path.join(audio_cache.directory, args.worker_name)
+        logger.info(f"Running shards {shard_ids} of {args.shard_count}")
+    else:
+        # Graceful restarts start a replacement with the same options
+        handoff.argv = handoff_argv(sys.argv)
+    if args.handoff_from:
+        # Connect alongside the running bot without acting on anything until it hands over
+        handoff.accepting = False
 
-    # Initialize the bot
-    bot = commands.Bot(command_prefix="!", intents=intents)
+    @bot.event
+    async def on_message(message):
+        # Commands are gated off while this process waits to take over, or once it has handed over
+        if handoff.accepting:
+            await bot.process_commands(message)
 
-    # Initialize console service
+    # Close the bot cleanly on SIGTERM (stop script, supervisor)
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.ensure_future(bot.close()))
+    except NotImplementedError:
+        pass
+
+    # Bring the database schema up to date (only a version check when current); cogs restore
+    # queues from it. The response catalog and extraction caches then warm in the background
+    # so commands and events never query the DB.
+    with profiler.phase('migrate'):
+        try:
+            migrate()
+        except Exception as e:
+            logger.error(f"Failed to prepare database: {e}", exc_info=True)
+    warm_task = asyncio.create_task(warm_caches())
+
+    # Initialize console service; the control socket serves the same commands to scripts
+    # and operators (each shard worker gets its own socket)
     console = ConsoleService(bot)
+    control_path = get_control_settings()['path']
+    if control_path and args.worker_name:
+        control_path = f"{control_path}.{args.worker_name}"
+    control_server = ControlServer(console, control_path)
 
-    # Load all cogs from the cogs directory
+    # Command timing and state gauges; the HTTP endpoint only runs when METRICS_PORT is set
+    instrument_bot(bot)
+    metrics_settings = get_metrics_settings()
+    metrics_server = MetricsServer(metrics_settings['host'], metrics_settings['port'])
+
+    # Load all cogs from the cogs directory; cogs are independent, so their setup
+    # (and cog_load work such as restoring queues) runs concurrently
     loaded_cogs = {}
-    for cog_name in discover_cogs():
-        try:
-            await bot.load_extension(cog_name)
+    with profiler.phase('discover_cogs'):
+        cog_names = discover_cogs()
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(bot.load_extension(cog_name) for cog_name in cog_names), return_exceptions=True
+    )
+    profiler.mark('load_cogs', started)
+    for cog_name, result in zip(cog_names, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to load cog: {cog_name} - {result}", exc_info=result)
+            loaded_cogs[cog_name] = f'Failed: {result}'
+        else:
             logger.info(f"Loaded cog: {cog_name}")
             loaded_cogs[cog_name] = 'Loaded'
-        except Exception as e:
-            logger.error(f"Failed to load cog: {cog_name} - {e}", exc_info=True)
-            loaded_cogs[cog_name] = f'Failed: {e}'
 
     # Log a summary of all loaded cogs
     logger.info("Cog load summary:")
@@ -74,17 +268,45 @@ async def main():
     logger.info("Rudebot is starting up.")
     
     # Start console interface
-    console.start()
+    if not args.no_console:
+        console.start()
+
+    # Workers publish per-shard health for the supervisor's status command
+    if args.worker_name:
+        asyncio.create_task(health_reporter(bot, args.worker_name))
     
     try:
-        await bot.start(token)
+        loop_watchdog.start()
+        if args.handoff_from:
+            # The bot being replaced still holds the socket and port
+            asyncio.create_task(take_over(bot, args.handoff_from, [control_server, metrics_server]))
+        else:
+            await metrics_server.start()
+            await control_server.start()
+        with profiler.phase('login'):
+            await bot.login(token)
+        if args.profile_startup:
+            asyncio.create_task(report_startup(bot, time.perf_counter()))
+        await bot.connect()
     except Exception as e:
         logger.error(f"Bot encountered an exception: {e}", exc_info=True)
         raise
     finally:
+        warm_task.cancel()
         console.stop()
+        await control_server.stop()
+        loop_watchdog.stop()
+        await metrics_server.stop()
+        extraction_service.shutdown()
+        audio_cache.shutdown()
+        shutdown_db_executor()
         logger.info("Rudebot is shutting down.")
+    return console.restart_requested
 
 if __name__ == "__main__":
     # Run the main async entry point
-    asyncio.run(main())
\ No newline at end of file
+    if asyncio.run(main(parse_args())):
+        # Restart in place: the PID stays the same, so scripts and the supervisor keep tracking it
+        logger.info("Restarting Rudebot...")
+        shutdown_logging()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
\ No newline at end of file
@@ -1,5 +1,8 @@
 #!/usr/bin/env bash
 # Script to restart Rudebot with clean stop/start cycle
+# Usage: restart.sh [--graceful]
+#   --graceful  start a new process and hand over to it once it is ready (no downtime,
+#               music resumes where it was); falls back to stop/start if that fails
 
 cd "$(dirname "$0")/.."
 
@@ -17,25 +20,26 @@ print_warning() {
     echo -e "${YELLOW}[WARN]${NC} $1"
 }
 
-print_status "Restarting Rudebot..."
-
-# Check for restart flag from console command
-if [ -f ".restart_requested" ]; then
-    print_status "Console restart detected, removing flag..."
-    rm -f .restart_requested
+if [ "$1" = "--graceful" ]; then
+    print_status "Gracefully restarting Rudebot..."
+    if python3 scripts/rudebotctl.py restart graceful --wait --wait-timeout 120; then
+        print_status "Rudebot handed over to the new process."
+        exit 0
+    fi
+    print_warning "Graceful restart failed, falling back to stop/start"
 fi
 
-# Stop Rudebot if it's running
+print_status "Restarting Rudebot..."
+
+# Stop Rudebot if it's running; stop.sh returns once the process has exited
 if [ -f "scripts/stop.sh" ]; then
     print_status "Stopping Rudebot..."
     ./scripts/stop.sh
-    sleep 2
 else
-    print_warning "Stop script not found, attempting to kill processes..."
-    pkill -f "python.*main.py" || true
-    sleep 2
+    print_warning "Stop script not found, asking the bot to stop..."
+    python3 scripts/rudebotctl.py stop --wait || pkill -f "python.*main.py" || true
 fi
 
 # Start Rudebot
 print_status "Starting Rudebot..."
-./scripts/start.sh 
\ No newline at end of file
+./scripts/start.sh 
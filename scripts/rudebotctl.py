@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Command line client for Rudebot's control socket (services/control_service.py).
+Only uses the standard library, so it runs with or without the virtual environment.
+
+Usage:
+    scripts/rudebotctl.py status            # human-readable output
+    scripts/rudebotctl.py --json status     # the JSON reply, for scripts
+    scripts/rudebotctl.py reload music
+    scripts/rudebotctl.py stop --wait       # return once the bot process has exited
+    scripts/rudebotctl.py restart graceful --wait   # return once the replacement has taken over
+
+Exit status: 0 on success, 1 if the command failed, 2 if the bot is not reachable,
+3 if --wait timed out.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SOCKET_PATH = '.rudebot.sock'
+
+
+def _socket_from_env_file() -> str:
+    """CONTROL_SOCKET from the project's .env, if set there."""
+    try:
+        with open(os.path.join(PROJECT_ROOT, '.env')) as f:
+            for line in f:
+                key, _, value = line.strip().partition('=')
+                if key == 'CONTROL_SOCKET':
+                    return value.strip().strip('"\'')
+    except OSError:
+        pass
+    return ''
+
+
+def default_socket_path() -> str:
+    path = os.getenv('CONTROL_SOCKET') or _socket_from_env_file() or DEFAULT_SOCKET_PATH
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def request(path: str, command: str, args, timeout: float) -> dict:
+    """Send one JSON request and return the decoded reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps({'id': 1, 'command': command, 'args': list(args)}) + '\n').encode('utf-8'))
+        buffer = b''
+        while not buffer.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('connection closed before a reply was received')
+            buffer += chunk
+    return json.loads(buffer)
+
+
+def wait_for_exit(pid: int, timeout: float) -> bool:
+    """Poll until the process is gone. Returns False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Send a console command to a running Rudebot.')
+    parser.add_argument('--socket', default=None, help='Control socket path (default: CONTROL_SOCKET or .rudebot.sock)')
+    parser.add_argument('--json', action='store_true', help='Print the raw JSON reply')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds to wait for a reply')
+    parser.add_argument('--wait', action='store_true', help='With stop or restart graceful: wait until the bot process has exited')
+    parser.add_argument('--wait-timeout', type=float, default=30.0, help='Seconds --wait waits for the process to exit')
+    parser.add_argument('command', help="Console command, e.g. status, guilds, cogs, reload, stop, metrics, help")
+    parser.add_argument('args', nargs='*')
+    args = parser.parse_args(argv)
+    path = args.socket or default_socket_path()
+
+    try:
+        reply = request(path, args.command, args.args, args.timeout)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Rudebot is not running (no control socket at {path})", file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"Control socket error: {e}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(reply, indent=2))
+    elif reply.get('output'):
+        print(reply['output'])
+    if not reply.get('ok'):
+        return 1
+
+    pid = (reply.get('data') or {}).get('pid') if isinstance(reply.get('data'), dict) else None
+    # A graceful restart's old process exits once it has handed over to the new one
+    exits = args.command in ('stop', 'quit', 'exit') or (args.command == 'restart' and args.args[:1] == ['graceful'])
+    if args.wait and exits and pid:
+        if not wait_for_exit(pid, args.wait_timeout):
+            print(f"Rudebot (PID {pid}) is still running after {args.wait_timeout:.0f}s", file=sys.stderr)
+            return 3
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
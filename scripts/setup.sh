@@ -50,13 +50,8 @@ pip install -r requirements.txt
 mkdir -p logs
 mkdir -p data/dj_audio
 
-# Initialize database if it doesn't exist
-if [ ! -f "data/rudebot.sqlite3" ]; then
-    print_status "Initializing database..."
-    python data/init_db.py
-    print_status "Database initialized."
-else
-    print_status "Database already exists."
-fi
+# Create the database or upgrade an existing one in place
+print_status "Applying database migrations..."
+python data/init_db.py
 
 print_status "Setup complete!" 
\ No newline at end of file
@@ -23,8 +23,8 @@ print_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
-# Check if Rudebot is already running
-if pgrep -f "python.*main.py" > /dev/null; then
+# Check if Rudebot (or its shard supervisor) is already running
+if [ -f ".bot_pid" ] && kill -0 "$(cat .bot_pid)" 2>/dev/null; then
     print_error "Rudebot is already running."
     exit 1
 fi
@@ -62,9 +62,10 @@ fi
 
 print_status "Starting Rudebot bot with console interface..."
 print_status "Console commands: help, stop, restart, status, guilds, reload <cog>"
+print_status "From another terminal: scripts/rudebotctl.py <command> (e.g. status, stop)"
 
 # Create process tracking
 echo $$ > .bot_pid
 
-# Start bot with console interface
+# Start bot with console interface (runs the shard supervisor when SHARD_MODE=process)
 exec python main.py 
\ No newline at end of file
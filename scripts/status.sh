@@ -27,17 +27,27 @@ print_header() {
     echo -e "${BLUE}[STATUS]${NC} $1"
 }
 
-# Check if Rudebot is running
-pids=$(pgrep -f "python.*main.py")
+print_header "Rudebot Status"
 
-if [ -z "$pids" ]; then
-    print_error "Rudebot is not running."
-    exit 1
+# Structured status straight from the bot over its control socket (instant, no process scraping)
+if python3 scripts/rudebotctl.py status 2>/dev/null; then
+    pids=$(python3 scripts/rudebotctl.py --json status | python3 -c "import json, sys; print(json.load(sys.stdin)['data']['pid'])")
+else
+    # No control socket: shard supervisor mode (each worker has .rudebot.sock.<worker>) or not running
+    for sock in .rudebot.sock.*; do
+        [ -S "$sock" ] || continue
+        echo
+        print_header "Worker ${sock#.rudebot.sock.}:"
+        python3 scripts/rudebotctl.py --socket "$sock" status || true
+    done
+    pids=$(cat .bot_pid 2>/dev/null || pgrep -f "python.*main.py")
+    if [ -z "$pids" ] || ! kill -0 $pids 2>/dev/null; then
+        print_error "Rudebot is not running."
+        exit 1
+    fi
+    print_status "Rudebot is running with PID(s): $pids (control socket unavailable)"
 fi
 
-print_header "Rudebot Status"
-print_status "Rudebot is running with PID(s): $pids"
-
 # Show process details
 echo
 print_header "Process Details:"
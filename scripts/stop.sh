@@ -1,5 +1,5 @@
 #!/usr/bin/env bash
-# Smart stop script that uses console interface when available, falls back to force kill
+# Smart stop script that uses the control socket when available, falls back to signals
 set -e
 
 cd "$(dirname "$0")/.."
@@ -22,7 +22,14 @@ print_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
-# Check if bot is running
+# Ask the bot to shut down over its control socket; returns as soon as the process has exited
+if python3 scripts/rudebotctl.py stop --wait --wait-timeout 15 >/dev/null 2>&1; then
+    rm -f .bot_pid
+    print_status "Rudebot stopped successfully."
+    exit 0
+fi
+
+# No control socket (not running, shard supervisor, or unresponsive): fall back to signals
 BOT_PID=""
 if [ -f ".bot_pid" ]; then
     BOT_PID=$(cat .bot_pid)
@@ -41,33 +48,28 @@ fi
 if [ -z "$BOT_PID" ]; then
     print_warning "Rudebot is not running."
     # Clean up any leftover files
-    rm -f .bot_pid .restart_requested .console_running
+    rm -f .bot_pid
     exit 0
 fi
 
 print_status "Stopping Rudebot (PID: $BOT_PID)..."
 
-# Console interface should handle graceful shutdown automatically
-# Just send SIGTERM and let the console service handle cleanup
+# SIGTERM closes the bot cleanly (the supervisor stops its workers the same way)
 print_status "Sending graceful shutdown signal..."
-kill -TERM "$BOT_PID" 2>/dev/null || true
+kill -TERM $BOT_PID 2>/dev/null || true
 
-# Wait for graceful shutdown
-sleep 3
+# Poll for exit rather than sleeping a fixed time; force kill after 10 seconds
+for _ in $(seq 100); do
+    kill -0 $BOT_PID 2>/dev/null || break
+    sleep 0.1
+done
 
-# Check if still running
-if kill -0 "$BOT_PID" 2>/dev/null; then
-    print_warning "Graceful shutdown taking longer, waiting..."
-    sleep 2
-    
-    if kill -0 "$BOT_PID" 2>/dev/null; then
-        print_warning "Process still running, using SIGKILL..."
-        kill -KILL "$BOT_PID" 2>/dev/null || true
-        sleep 1
-    fi
+if kill -0 $BOT_PID 2>/dev/null; then
+    print_warning "Process still running, using SIGKILL..."
+    kill -KILL $BOT_PID 2>/dev/null || true
 fi
 
 # Clean up tracking files
-rm -f .bot_pid .restart_requested .console_running
+rm -f .bot_pid
 
-print_status "Rudebot stopped successfully." 
\ No newline at end of file
+print_status "Rudebot stopped successfully."
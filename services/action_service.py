@@ -3,9 +3,90 @@ Action service for Rudebot.
 Handles bot actions like kick and scatter operations.
 Separates business logic from Discord-specific cog implementation.
 """
+import asyncio
+import os
 import random
+import time
 import discord
 import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from utils.metrics_util import registry
+
+scatter_move_time = registry.histogram('scatter_move_seconds', 'Latency of each member move during scatter')
+scatter_moves = registry.counter('scatter_moves_total', 'Scatter member moves by outcome', ('outcome',))
+
+
+@dataclass
+class ScatterResult:
+    """Outcome of a scatter: moved and failed member counts, per-move latencies and wall time."""
+    moved: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    def summary(self) -> str:
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+        worst = latencies[-1] * 1000 if latencies else 0.0
+        return (f"moved={self.moved} failed={self.failed} skipped={self.skipped} "
+                f"elapsed={self.elapsed * 1000:.0f}ms move_p50={p50:.0f}ms move_max={worst:.0f}ms")
+
+
+async def scatter_members(guild: discord.Guild, source: discord.VoiceChannel,
+                          concurrency: Optional[int] = None) -> ScatterResult:
+    """
+    Move every movable member of source into the guild's other voice channels, spread evenly.
+    Moves run concurrently, at most concurrency at a time (SCATTER_CONCURRENCY), so a scatter
+    costs about one round trip per batch rather than one per member; discord.py handles any
+    429 retries for the member route.
+    """
+    concurrency = concurrency or int(os.getenv('SCATTER_CONCURRENCY', 5))
+    result = ScatterResult()
+    targets = [vc for vc in guild.voice_channels if vc != source]
+    if not targets:
+        return result
+
+    # Role hierarchy is checked against the bot's top role once
+    bot_member = guild.me
+    bot_position = bot_member.top_role.position
+    members = []
+    for member in source.members:
+        if member == bot_member:
+            continue
+        if member.top_role.position <= bot_position:
+            members.append(member)
+        else:
+            result.skipped += 1
+
+    # Round-robin over shuffled channels gives each channel an even share
+    random.shuffle(members)
+    random.shuffle(targets)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def move(member, target):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await member.move_to(target)
+            except discord.HTTPException as e:
+                result.failed += 1
+                result.errors.append(f"{member}: {e}")
+                scatter_moves.inc(outcome='failed')
+                return
+            latency = time.perf_counter() - started
+            result.moved += 1
+            result.latencies.append(latency)
+            scatter_move_time.observe(latency)
+            scatter_moves.inc(outcome='moved')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(move(member, targets[i % len(targets)]) for i, member in enumerate(members)))
+    result.elapsed = time.perf_counter() - started
+    return result
 
 
 async def handle_action(action: str, ctx: discord.ext.commands.Context, logger: logging.Logger = None):
@@ -22,20 +103,11 @@ async def handle_action(action: str, ctx: discord.ext.commands.Context, logger:
                 if logger:
                     logger.info(f"Kicked {ctx.author} from voice channel in guild {ctx.guild.id}")
         case "scatter":
-            # Move all users in the current voice channel to random other channels
+            # Move all users in the current voice channel to the other voice channels
             current_vc = ctx.author.voice.channel if ctx.author.voice else None
             if current_vc:
-                other_vcs = [vc for vc in ctx.guild.voice_channels if vc != current_vc]
-                if other_vcs:
-                    members = current_vc.members
-                    if members:
-                        bot_member = ctx.guild.me
-                        bot_top_role = bot_member.top_role
-                        for member in members:
-                            if member == bot_member:
-                                continue
-                            if member.top_role.position <= bot_top_role.position:
-                                target_vc = random.choice(other_vcs)
-                                await member.move_to(target_vc)
-                                if logger:
-                                    logger.info(f"Scattered {member} to channel {target_vc.id} in guild {ctx.guild.id}")
\ No newline at end of file
+                result = await scatter_members(ctx.guild, current_vc)
+                if logger:
+                    logger.info("Scattered channel %s in guild %s: %s", current_vc.id, ctx.guild.id, result.summary())
+                    for error in result.errors:
+                        logger.warning("Scatter move failed in guild %s: %s", ctx.guild.id, error)
@@ -0,0 +1,216 @@
+"""
+Audio cache service for Rudebot.
+Optional on-disk cache of downloaded tracks under data/dj_audio/, keyed by video id.
+Tracks are downloaded in the background (as Opus where possible), checked against a
+stored SHA-256, and evicted least-recently-used once the size budget is exceeded.
+Separates business logic from Discord-specific cog implementation.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from utils.path_util import get_data_file
+
+INDEX_FILE = 'index.json'
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_audio(url: str, video_id: str, directory: str) -> dict:
+    """
+    Download the audio of a video into directory as <video_id>.<ext>, preferring an Opus stream
+    (no transcode needed) and converting to Opus otherwise. Returns file name, size and checksum.
+    """
+    opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'format': 'bestaudio[acodec=opus]/bestaudio/best',
+        'outtmpl': os.path.join(directory, f'{video_id}.%(ext)s'),
+        'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'opus'}],
+        'noplaylist': True,
+    }
+    import yt_dlp  # deferred: slow to import and only needed once a download runs
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.extract_info(url, download=True)
+    path = os.path.join(directory, f'{video_id}.opus')
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Download did not produce {path}")
+    return {
+        'file': os.path.basename(path),
+        'size': os.path.getsize(path),
+        'sha256': file_checksum(path),
+    }
+
+
+class AudioCache:
+    """
+    Index of cached audio files with a size budget and background fill.
+    Enabled with AUDIO_CACHE_ENABLED; sized with AUDIO_CACHE_MAX_MB and AUDIO_CACHE_WORKERS.
+    The index is only touched from the event loop; downloads and hashing run on worker threads.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("music")
+        self.enabled = False
+        self.directory = get_data_file('dj_audio')
+        self.max_bytes = 0
+        self._entries: Dict[str, dict] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._started = False
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self):
+        """Read settings, load the index and verify every cached file (first call only)."""
+        if self._started:
+            return
+        self._started = True
+        self.enabled = os.getenv('AUDIO_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+        if not self.enabled:
+            return
+        self.max_bytes = int(float(os.getenv('AUDIO_CACHE_MAX_MB', 1024)) * 1024 * 1024)
+        workers = max(1, int(os.getenv('AUDIO_CACHE_WORKERS', 1)))
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rudebot-audio')
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries = await asyncio.to_thread(self._load_and_verify)
+        self.logger.info(f"Audio cache ready: {len(self._entries)} tracks, "
+                         f"{self.total_bytes() / 1024 / 1024:.1f}MB of {self.max_bytes / 1024 / 1024:.0f}MB")
+
+    def _load_and_verify(self) -> Dict[str, dict]:
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        valid = {}
+        for video_id, entry in entries.items():
+            file_path = os.path.join(self.directory, entry['file'])
+            try:
+                if os.path.getsize(file_path) == entry['size'] and file_checksum(file_path) == entry['sha256']:
+                    valid[video_id] = entry
+                    continue
+            except OSError:
+                pass
+            self.logger.warning(f"Dropping invalid cached audio for {video_id}")
+            self._remove_file(file_path)
+        # Remove leftovers from interrupted downloads that never made it into the index
+        # (subdirectories are shard workers' own caches)
+        known = {entry['file'] for entry in valid.values()} | {INDEX_FILE}
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name not in known and not os.path.isdir(path):
+                self._remove_file(path)
+        return valid
+
+    def total_bytes(self) -> int:
+        return sum(entry['size'] for entry in self._entries.values())
+
+    def lookup(self, video_id: str) -> Optional[str]:
+        """
+        Return the local file for a video if it is cached and intact, marking it recently used.
+        """
+        if not self.enabled or not video_id:
+            return None
+        entry = self._entries.get(video_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        path = os.path.join(self.directory, entry['file'])
+        # Cheap size check here; full checksums are verified at startup and after download
+        try:
+            if os.path.getsize(path) != entry['size']:
+                raise OSError("size mismatch")
+        except OSError:
+            self._entries.pop(video_id, None)
+            self.misses += 1
+            return None
+        entry['last_used'] = time.time()
+        self.hits += 1
+        return path
+
+    def has(self, video_id: str) -> bool:
+        """Whether a video is cached, without counting a lookup or marking it used."""
+        return self.enabled and video_id in self._entries
+
+    def request(self, video_id: str, url: str):
+        """Queue a background download of a video if it is not cached or already pending."""
+        if not self.enabled or not video_id or video_id in self._entries or video_id in self._pending:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, download_audio, url, video_id, self.directory)
+        self._pending[video_id] = future
+        future.add_done_callback(lambda done: self._on_downloaded(video_id, done))
+
+    def _on_downloaded(self, video_id: str, future: asyncio.Future):
+        self._pending.pop(video_id, None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error:
+            self.logger.warning(f"Audio cache download failed for {video_id}: {error}")
+            return
+        entry = future.result()
+        entry['last_used'] = time.time()
+        self._entries[video_id] = entry
+        self.logger.info(f"Cached audio for {video_id} ({entry['size'] / 1024 / 1024:.1f}MB)")
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        """Delete least recently used files until the cache fits its budget."""
+        total = self.total_bytes()
+        for video_id, entry in sorted(self._entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            self._entries.pop(video_id)
+            total -= entry['size']
+            self._executor.submit(self._remove_file, os.path.join(self.directory, entry['file']))
+            self.logger.info(f"Evicted cached audio for {video_id}")
+
+    def _save_index(self):
+        snapshot = json.dumps(self._entries)
+        self._executor.submit(self._write_index, snapshot)
+
+    def _write_index(self, snapshot: str):
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> str:
+        """One-line summary for the console."""
+        if not self.enabled:
+            return "disabled"
+        return (f"{len(self._entries)} tracks, {self.total_bytes() / 1024 / 1024:.1f}MB, "
+                f"{len(self._pending)} downloading, {self.hits} hits, {self.misses} misses")
+
+    def shutdown(self):
+        """Write the index and stop the download pool."""
+        if self._executor is not None:
+            self._write_index(json.dumps(self._entries))
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared cache so state survives cog reloads
+audio_cache = AudioCache()
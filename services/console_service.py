@@ -2,12 +2,45 @@
 Console service for Rudebot.
 Provides interactive console commands for bot management.
 Separates console logic from main bot functionality.
+Commands return their output rather than printing it, so the same commands serve stdin
+and the control socket (see services/control_service.py).
 """
 import asyncio
+import math
+import os
 import threading
 import logging
-import sys
-from typing import Optional
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+
+@dataclass
+class CommandResult:
+    """
+    Output of a console command: whether it succeeded, text for people and
+    optional structured data for the control socket's JSON replies.
+    """
+    ok: bool
+    text: str
+    data: Any = None
+
+
+HELP_TEXT = """
+Available Console Commands:
+  help, h          - Show this help message
+  stop, quit, exit - Gracefully stop the bot
+  restart          - Restart the bot process in place
+  restart graceful - Start a new process and hand over to it once ready, resuming playback
+  status, info     - Show bot status and statistics
+  guilds           - List connected guilds
+  cogs, list       - List all loaded cogs
+  reload <cog>     - Reload a specific cog
+  reload-responses - Rebuild the in-memory response catalog from the database
+  watchdog         - Show event loop lag and the last blocking stack
+  watchdog <ms>    - Change the loop stall threshold
+  metrics [prefix] - Show metrics in Prometheus text format, optionally filtered by name prefix
+""".strip()
 
 
 class ConsoleService:
@@ -15,201 +48,290 @@ class ConsoleService:
     Handles console input and command processing for the bot.
     Runs in a separate thread to avoid blocking the main event loop.
     """
-    
+
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger("console")
         self.running = False
         self.console_thread = None
-        
+        # Set by the restart command; main.py re-executes the process once the bot has closed
+        self.restart_requested = False
+        self._stop_task: Optional[asyncio.Task] = None
+
     def start(self):
         """Start the console listener in a separate thread."""
         if self.running:
             return
-            
+
         self.running = True
-        
-        # Create console tracking file
-        try:
-            with open('.console_running', 'w') as f:
-                f.write('true')
-        except Exception as e:
-            self.logger.error(f"Could not create console tracking file: {e}")
-            
         self.console_thread = threading.Thread(target=self._console_loop, daemon=True)
         self.console_thread.start()
         self.logger.info("Console interface started. Type 'help' for available commands.")
-        
+
     def stop(self):
         """Stop the console listener."""
         self.running = False
-        
-        # Clean up tracking file
-        try:
-            import os
-            if os.path.exists('.console_running'):
-                os.remove('.console_running')
-        except Exception as e:
-            self.logger.error(f"Could not remove console tracking file: {e}")
-        
+
     def _console_loop(self):
         """Main console input loop running in separate thread."""
         while self.running:
             try:
-                command = input().strip().lower()
+                command = input().strip()
                 if command:
                     # Schedule command execution in the main event loop
                     asyncio.run_coroutine_threadsafe(
-                        self._handle_command(command), 
+                        self._handle_command(command),
                         self.bot.loop
                     )
             except (EOFError, KeyboardInterrupt):
                 # Handle Ctrl+C or EOF gracefully
                 asyncio.run_coroutine_threadsafe(
-                    self._handle_command("stop"), 
+                    self._handle_command("stop"),
                     self.bot.loop
                 )
                 break
             except Exception as e:
                 self.logger.error(f"Console error: {e}")
-                
+
     async def _handle_command(self, command: str):
-        """Process console commands."""
-        parts = command.split()
-        cmd = parts[0] if parts else ""
-        
+        """Run a command typed on stdin and log its output."""
+        result = await self.execute(command)
+        if result.text:
+            self.logger.log(logging.INFO if result.ok else logging.WARNING, result.text)
+
+    async def execute(self, command: str) -> CommandResult:
+        """
+        Run a console command and return its output. Never raises; failures are
+        reported as a result with ok=False.
+        """
+        parts = command.strip().split()
+        cmd = parts[0].lower() if parts else ""
+        args = parts[1:]
+        try:
+            return await self._dispatch(cmd, args, command)
+        except Exception as e:
+            self.logger.error(f"Console command '{command}' failed: {e}", exc_info=True)
+            return CommandResult(False, f"Command failed: {e}")
+
+    async def _dispatch(self, cmd: str, args: List[str], command: str) -> CommandResult:
         match cmd:
             case "help" | "h":
-                self._show_help()
-                
+                return CommandResult(True, HELP_TEXT)
+
             case "stop" | "quit" | "exit":
                 self.logger.info("Stopping bot via console command...")
-                await self._stop_bot()
-                
+                return self._stop_bot()
+
             case "restart":
+                if args and args[0].lower() == "graceful":
+                    self.logger.info("Graceful restart via console command...")
+                    return self._graceful_restart()
                 self.logger.info("Restarting bot via console command...")
-                await self._restart_bot()
-                
+                return self._restart_bot()
+
             case "status" | "info":
-                await self._show_status()
-                
+                return self._show_status()
+
             case "guilds":
-                await self._show_guilds()
-                
+                return self._show_guilds()
+
             case "reload":
-                if len(parts) > 1:
-                    await self._reload_cog(parts[1])
-                else:
-                    self.logger.info("Usage: reload <cog_name>")
-                    loaded_cogs = list(self.bot.extensions.keys())
-                    if loaded_cogs:
-                        cog_list = ', '.join([cog.replace('cogs.', '') for cog in loaded_cogs])
-                        self.logger.info(f"Available cogs: {cog_list}")
-                        
+                if args:
+                    return await self._reload_cog(args[0].lower())
+                return CommandResult(False, f"Usage: reload <cog_name>\n{self._available_cogs()}")
+
             case "cogs" | "list":
-                await self._list_cogs()
-                    
+                return self._list_cogs()
+
+            case "reload-responses":
+                return await self._reload_responses()
+
+            case "watchdog":
+                return self._watchdog(args)
+
+            case "metrics":
+                return self._show_metrics(args[0] if args else None)
+
             case "":
-                pass  # Empty command, ignore
-                
+                return CommandResult(True, "")
+
             case _:
-                self.logger.warning(f"Unknown command: {command}. Type 'help' for available commands.")
-                
-    def _show_help(self):
-        """Display available console commands."""
-        help_text = """
-Available Console Commands:
-  help, h          - Show this help message
-  stop, quit, exit - Gracefully stop the bot
-  restart          - Restart the bot (requires external script)
-  status, info     - Show bot status and statistics
-  guilds           - List connected guilds
-  cogs, list       - List all loaded cogs
-  reload <cog>     - Reload a specific cog
-        """.strip()
-        
-        print(help_text)
-        
-    async def _stop_bot(self):
-        """Gracefully stop the bot."""
+                return CommandResult(False, f"Unknown command: {command}. Type 'help' for available commands.")
+
+    def _stop_bot(self) -> CommandResult:
+        """Gracefully stop the bot. Closing runs in the background so the caller gets a reply first."""
         self.stop()  # Stop console listener
-        await self.bot.close()
-        
-    async def _restart_bot(self):
-        """Restart the bot (requires external script to handle restart)."""
-        self.logger.info("Bot restart requested. Shutting down...")
-        # Create a restart flag file that external scripts can detect
-        try:
-            with open('.restart_requested', 'w') as f:
-                f.write('restart')
-        except Exception as e:
-            self.logger.error(f"Could not create restart flag: {e}")
-        
-        await self._stop_bot()
-        
-    async def _show_status(self):
-        """Display bot status information."""
-        guild_count = len(self.bot.guilds)
-        user_count = sum(guild.member_count for guild in self.bot.guilds)
-        
-        status_info = f"""
+        if self._stop_task is None:
+            self._stop_task = asyncio.create_task(self.bot.close())
+        return CommandResult(True, "Stopping bot...", {'pid': os.getpid()})
+
+    def _restart_bot(self) -> CommandResult:
+        """Stop the bot and have main.py start it again in the same process (same PID)."""
+        self.restart_requested = True
+        result = self._stop_bot()
+        return CommandResult(True, "Restarting bot...", result.data)
+
+    def _graceful_restart(self) -> CommandResult:
+        """
+        Hand over to a new process (see services/handoff_service.py). Runs in the background;
+        the data holds this process's PID, which exits once the handover is done.
+        """
+        from services.handoff_service import handoff
+        if handoff.argv is None:
+            return CommandResult(False, "Graceful restart is not available for this process.")
+        if handoff.in_progress:
+            return CommandResult(False, "A graceful restart is already in progress.")
+        asyncio.create_task(handoff.hand_over(self.bot))
+        return CommandResult(True, "Starting replacement process; handing over once it is ready...",
+                             {'pid': os.getpid()})
+
+    def status_data(self) -> dict:
+        """Bot status and statistics as plain data."""
+        from data.async_session import db_query_latency, db_queue_wait
+        from services.extraction_service import extraction_service
+        from services.prefetch_service import track_gap
+        from services.shard_service import shard_health
+        from utils.metrics_util import loop_lag
+        from utils.startup_profiler import PROCESS_START
+        from services.audio_cache_service import audio_cache
+        latency = self.bot.latency
+        return {
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.perf_counter() - PROCESS_START, 1),
+            'connected': not self.bot.is_closed(),
+            'ready': self.bot.is_ready(),
+            'latency_ms': round(latency * 1000, 1) if math.isfinite(latency) else None,
+            'guilds': len(self.bot.guilds),
+            'users': sum(guild.member_count or 0 for guild in self.bot.guilds),
+            'cogs': len(self.bot.cogs),
+            'db_query': db_query_latency.snapshot(),
+            'db_wait': db_queue_wait.snapshot(),
+            'extractions': {'running': extraction_service.running, 'queued': extraction_service.queue_depth},
+            'extraction_time': extraction_service.extraction_time.snapshot(),
+            'track_gap': track_gap.snapshot(),
+            'loop_lag': loop_lag.snapshot(),
+            'audio_cache': audio_cache.stats(),
+            'search_cache': extraction_service.search_cache.stats() if extraction_service.search_cache else 'unused',
+            'stream_cache': extraction_service.stream_cache.stats() if extraction_service.stream_cache else 'unused',
+            'shards': shard_health(self.bot),
+        }
+
+    def _show_status(self) -> CommandResult:
+        """Bot status information."""
+        from data.async_session import db_query_latency, db_queue_wait
+        from services.extraction_service import extraction_service
+        from services.prefetch_service import track_gap
+        from utils.metrics_util import loop_lag
+        data = self.status_data()
+        latency = f"{data['latency_ms']:.1f}ms" if data['latency_ms'] is not None else "n/a"
+
+        lines = [f"""
 Bot Status:
-  Connected: {not self.bot.is_closed()}
-  Latency: {self.bot.latency * 1000:.1f}ms
-  Guilds: {guild_count}
-  Users: {user_count}
-  Loaded Cogs: {len(self.bot.cogs)}
-        """.strip()
-        
-        self.logger.info(status_info)
-        
-    async def _show_guilds(self):
-        """Display connected guilds."""
-        if not self.bot.guilds:
-            self.logger.info("Not connected to any guilds.")
-            return
-            
-        self.logger.info("Connected Guilds:")
-        for guild in self.bot.guilds:
-            self.logger.info(f"  {guild.name} (ID: {guild.id}, Members: {guild.member_count})")
-            
-    async def _reload_cog(self, cog_name: str):
+  PID: {data['pid']} (up {data['uptime_seconds']:.0f}s)
+  Connected: {data['connected']}
+  Latency: {latency}
+  Guilds: {data['guilds']}
+  Users: {data['users']}
+  Loaded Cogs: {data['cogs']}
+  DB Query: {db_query_latency.summary()}
+  DB Wait: {db_queue_wait.summary()}
+  Extractions: {data['extractions']['running']} running, {data['extractions']['queued']} queued
+  Extraction Time: {extraction_service.extraction_time.summary()}
+  Track Gap: {track_gap.summary()}
+  Loop Lag: {loop_lag.summary()}
+  Audio Cache: {data['audio_cache']}
+  Search Cache: {data['search_cache']}
+  Stream Cache: {data['stream_cache']}
+        """.strip()]
+
+        # Per-shard health (one entry for an unsharded bot)
+        for shard in data['shards']:
+            if shard['closed']:
+                state = 'closed'
+            else:
+                state = f"{shard['latency_ms']}ms" if shard['latency_ms'] is not None else 'connecting'
+            lines.append(f"  Shard {shard['shard_id']}: {state}")
+        return CommandResult(True, "\n".join(lines), data)
+
+    def _show_guilds(self) -> CommandResult:
+        """Connected guilds."""
+        guilds = [{'id': guild.id, 'name': guild.name, 'members': guild.member_count} for guild in self.bot.guilds]
+        if not guilds:
+            return CommandResult(True, "Not connected to any guilds.", guilds)
+
+        lines = ["Connected Guilds:"]
+        for guild in guilds:
+            lines.append(f"  {guild['name']} (ID: {guild['id']}, Members: {guild['members']})")
+        return CommandResult(True, "\n".join(lines), guilds)
+
+    def _available_cogs(self) -> str:
+        loaded_cogs = list(self.bot.extensions.keys())
+        if not loaded_cogs:
+            return "No cogs loaded."
+        return f"Available cogs: {', '.join(cog.replace('cogs.', '') for cog in loaded_cogs)}"
+
+    async def _reload_cog(self, cog_name: str) -> CommandResult:
         """Reload a specific cog."""
-        try:
-            # If user provided short name, try to find matching cog
-            if not cog_name.startswith("cogs."):
-                # Check if it's a partial match
-                loaded_cogs = list(self.bot.extensions.keys())
-                matches = [cog for cog in loaded_cogs if cog_name in cog]
-                
-                if len(matches) == 1:
-                    full_cog_name = matches[0]
-                elif len(matches) > 1:
-                    self.logger.error(f"Ambiguous cog name '{cog_name}'. Matches: {', '.join(matches)}")
-                    return
-                else:
-                    full_cog_name = f"cogs.{cog_name}"
+        # If user provided short name, try to find matching cog
+        if not cog_name.startswith("cogs."):
+            # Check if it's a partial match
+            loaded_cogs = list(self.bot.extensions.keys())
+            matches = [cog for cog in loaded_cogs if cog_name in cog]
+
+            if len(matches) == 1:
+                full_cog_name = matches[0]
+            elif len(matches) > 1:
+                return CommandResult(False, f"Ambiguous cog name '{cog_name}'. Matches: {', '.join(matches)}")
             else:
-                full_cog_name = cog_name
-                
+                full_cog_name = f"cogs.{cog_name}"
+        else:
+            full_cog_name = cog_name
+
+        try:
             await self.bot.reload_extension(full_cog_name)
-            self.logger.info(f"Successfully reloaded cog: {full_cog_name}")
         except Exception as e:
             self.logger.error(f"Failed to reload cog '{cog_name}': {e}")
             # Show available cogs for reference
-            loaded_cogs = list(self.bot.extensions.keys())
-            if loaded_cogs:
-                cog_list = ', '.join([cog.replace('cogs.', '') for cog in loaded_cogs])
-                self.logger.info(f"Available cogs: {cog_list}")
-                
-    async def _list_cogs(self):
-        """Display all loaded cogs."""
+            return CommandResult(False, f"Failed to reload cog '{cog_name}': {e}\n{self._available_cogs()}")
+        return CommandResult(True, f"Successfully reloaded cog: {full_cog_name}", {'cog': full_cog_name})
+
+    async def _reload_responses(self) -> CommandResult:
+        """Rebuild the response catalog from the database."""
+        from services.response_service import response_catalog
+        try:
+            count = await asyncio.to_thread(response_catalog.reload)
+        except Exception as e:
+            return CommandResult(False, f"Failed to reload responses: {e}")
+        return CommandResult(True, f"Reloaded response catalog ({count} responses)", {'responses': count})
+
+    def _watchdog(self, args) -> CommandResult:
+        """Watchdog status, after optionally setting its stall threshold in milliseconds."""
+        from services.watchdog_service import loop_watchdog
+        if args:
+            try:
+                loop_watchdog.threshold = float(args[0]) / 1000
+            except ValueError:
+                return CommandResult(False, "Usage: watchdog [threshold_ms]")
+        return CommandResult(True, loop_watchdog.status(), {'threshold_ms': loop_watchdog.threshold * 1000})
+
+    def _show_metrics(self, prefix: Optional[str] = None) -> CommandResult:
+        """The metrics registry, optionally only metrics whose name starts with prefix."""
+        from utils.metrics_util import registry
+        lines = registry.render_prometheus().splitlines()
+        if prefix:
+            # Comment lines are '# HELP <name> ...' / '# TYPE <name> ...'; samples start with the name
+            lines = [line for line in lines
+                     if (line.split()[2] if line.startswith('#') else line).startswith(prefix)]
+        return CommandResult(True, "Metrics:\n" + "\n".join(lines))
+
+    def _list_cogs(self) -> CommandResult:
+        """All loaded cogs."""
         loaded_cogs = list(self.bot.extensions.keys())
         if not loaded_cogs:
-            self.logger.info("No cogs loaded.")
-            return
-            
-        self.logger.info("Loaded Cogs:")
+            return CommandResult(True, "No cogs loaded.", [])
+
+        lines = ["Loaded Cogs:"]
         for cog in loaded_cogs:
             cog_name = cog.replace('cogs.', '')
-            self.logger.info(f"  {cog_name} ({cog})")
\ No newline at end of file
+            lines.append(f"  {cog_name} ({cog})")
+        return CommandResult(True, "\n".join(lines), loaded_cogs)
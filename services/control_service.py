@@ -0,0 +1,121 @@
+"""
+Control service for Rudebot.
+Serves the console commands on a local Unix-domain socket so scripts and any number of
+operators can query and manage the running bot without owning its stdin.
+Separates process control from main bot functionality.
+
+Protocol: one request per line.
+  - Plain text, e.g. "status" or "reload music": the reply is the command output followed by
+    an empty line (handy with `nc -U`).
+  - A JSON object, e.g. {"command": "reload", "args": ["music"], "id": 1}: the reply is one JSON
+    line, {"id": 1, "ok": true, "output": "...", "data": {...}}.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+from services.console_service import ConsoleService
+
+DEFAULT_SOCKET_PATH = '.rudebot.sock'
+
+
+def get_control_settings() -> dict:
+    """
+    Read the control socket settings from the environment (empty CONTROL_SOCKET disables it).
+    """
+    return {'path': os.getenv('CONTROL_SOCKET', DEFAULT_SOCKET_PATH).strip()}
+
+
+class ControlServer:
+    """
+    asyncio Unix socket server that runs console commands for each connected client.
+    The socket file is created owner-only (0600) since it can stop and reload the bot.
+    """
+
+    def __init__(self, console: ConsoleService, path: str):
+        self.console = console
+        self.path = path
+        self.logger = logging.getLogger("console")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    async def start(self):
+        """Bind the socket, replacing a stale socket file left by a crashed process."""
+        if not self.path:
+            return
+        if os.path.exists(self.path):
+            if await self._in_use():
+                self.logger.error(f"Control socket {self.path} is in use by another process; not starting")
+                return
+            os.unlink(self.path)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        finally:
+            os.umask(old_umask)
+        self.logger.info(f"Control socket listening on {self.path}")
+
+    async def stop(self):
+        """Close the socket, disconnect clients and remove the socket file."""
+        if self._server is None:
+            return
+        self._server.close()
+        # Closing each connection ends its handler's read loop (cancelling the handler
+        # tasks instead makes asyncio log them as errors)
+        for writer in list(self._clients):
+            writer.close()
+        await asyncio.gather(*self._clients.values(), return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def _in_use(self) -> bool:
+        try:
+            _, writer = await asyncio.open_unix_connection(self.path)
+        except OSError:
+            return False
+        writer.close()
+        return True
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self._reply(line.decode('utf-8', 'replace').strip())
+                if reply:
+                    writer.write(reply.encode('utf-8'))
+                    await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            # ValueError: request line longer than the stream limit
+            self.logger.warning(f"Control client error: {e}")
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _reply(self, line: str) -> Optional[str]:
+        if not line:
+            return None
+        if not line.startswith('{'):
+            self.logger.info(f"Control command: {line}")
+            result = await self.console.execute(line)
+            return f"{result.text.rstrip()}\n\n"
+
+        request = {}
+        try:
+            request = json.loads(line)
+            command = " ".join([str(request['command'])] + [str(arg) for arg in request.get('args', [])])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return json.dumps({'id': request.get('id') if isinstance(request, dict) else None,
+                               'ok': False, 'output': f"Bad request: {e}", 'data': None}) + "\n"
+        self.logger.info(f"Control command: {command}")
+        result = await self.console.execute(command)
+        return json.dumps({'id': request.get('id'), 'ok': result.ok, 'output': result.text, 'data': result.data},
+                          default=str) + "\n"
@@ -0,0 +1,353 @@
+"""
+Extraction service for Rudebot.
+Runs yt-dlp searches and stream resolution in a bounded worker pool so they never block
+the event loop. Limits concurrent extractions per guild, supports cancellation, and
+records queue depth and extraction time. Results are cached in two tiers:
+query -> video and video id -> signed stream URL (until the URL's own expiry).
+Separates business logic from Discord-specific cog implementation.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Set
+from urllib.parse import parse_qs, urlparse
+from utils.cache_util import TTLCache
+from utils.metrics_util import registry
+from utils.path_util import get_data_file
+
+# Resolved stream URLs are refreshed this long before their signed expiry
+STREAM_EXPIRY_MARGIN = 300
+# Used when a stream URL carries no expire parameter
+DEFAULT_STREAM_TTL = 1800
+
+SEARCH_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'default_search': 'ytsearch',
+    'extract_flat': False,
+    'format': 'bestaudio/best',
+}
+
+STREAM_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'format': 'bestaudio/best',
+}
+
+
+class ExtractionCancelled(Exception):
+    """Raised to the caller when its extraction was cancelled (user left, !dj stop)."""
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a search query: trimmed, lowercased, single-spaced."""
+    return " ".join(query.lower().split())
+
+
+def video_id_from_url(url: str) -> str:
+    """Extract the YouTube video id from a watch URL, falling back to the URL itself."""
+    parsed = urlparse(url)
+    video_id = parse_qs(parsed.query).get('v')
+    if video_id:
+        return video_id[0]
+    if parsed.netloc.endswith('youtu.be') and parsed.path.strip('/'):
+        return parsed.path.strip('/')
+    return url
+
+
+def stream_expires_at(stream_url: str) -> float:
+    """
+    Wall-clock time after which a stream URL should be re-resolved, taken from the
+    signed URL's expire parameter (query string or /expire/<ts>/ path segment).
+    """
+    parsed = urlparse(stream_url)
+    expire = parse_qs(parsed.query).get('expire')
+    if expire:
+        expire = expire[0]
+    else:
+        match = re.search(r'/expire/(\d+)', parsed.path)
+        expire = match.group(1) if match else None
+    try:
+        return float(expire) - STREAM_EXPIRY_MARGIN
+    except (TypeError, ValueError):
+        return time.time() + DEFAULT_STREAM_TTL
+
+
+# Worker functions live at module level so they can run in a process pool.
+# yt_dlp is imported inside them: it is slow to import, so the first import happens on a
+# worker at first music use instead of at bot startup.
+
+def search_video(query: str) -> dict:
+    """
+    Search YouTube (or resolve a URL) and return the title and watch URL of the first result,
+    along with its stream URL so the first play needs no second extraction.
+    """
+    import yt_dlp
+    with yt_dlp.YoutubeDL(SEARCH_OPTS) as ydl:
+        info = ydl.extract_info(query, download=False)
+        if 'entries' in info:
+            info = info['entries'][0]
+    title = info.get('title', 'Unknown')
+    video_id = info.get('id')
+    url = f"https://www.youtube.com/watch?v={video_id}" if video_id else info.get('webpage_url')
+    if not url:
+        raise Exception("Could not get video URL")
+    return {
+        'title': title,
+        'url': url,
+        'video_id': video_id,
+        'stream_url': info.get('url'),
+        'acodec': info.get('acodec'),
+    }
+
+
+def resolve_stream(url: str) -> dict:
+    """
+    Resolve a watch URL to a direct audio stream URL.
+    """
+    import yt_dlp
+    with yt_dlp.YoutubeDL(STREAM_OPTS) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return {'stream_url': info['url'], 'video_id': info.get('id'), 'acodec': info.get('acodec')}
+
+
+@dataclass(eq=False)
+class _PendingExtraction:
+    guild_id: str
+    user_id: Optional[str]
+    task: asyncio.Task
+    cancelled_by_request: bool = False
+
+
+class ExtractionService:
+    """
+    Bounded yt-dlp worker pool shared by every guild.
+    Pool kind and sizes come from YTDLP_POOL, YTDLP_WORKERS and YTDLP_GUILD_CONCURRENCY.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("music")
+        self._executor: Optional[Executor] = None
+        self._guild_limit = 1
+        # Held only by extractions that are running or waiting, so idle guilds drop out
+        self._guild_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+        self._pending: Dict[str, Set[_PendingExtraction]] = defaultdict(set)
+        self.waiting = 0
+        self.running = 0
+        self.extraction_time = registry.histogram('ytdlp_extraction_seconds', 'Time spent in yt-dlp extraction')
+        self.wait_time = registry.histogram('ytdlp_wait_seconds', 'Time extractions wait for a worker slot')
+        self.search_cache: Optional[TTLCache] = None
+        self.stream_cache: Optional[TTLCache] = None
+        self._persist_cache = False
+        # Guards publishing the caches: warm() builds them on a thread while the loop may need them
+        self._cache_lock = threading.Lock()
+        # In-flight extractions keyed by cache key, shared by concurrent callers
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _new_caches(self):
+        search_cache = TTLCache(
+            'search',
+            max_entries=int(os.getenv('YTDLP_SEARCH_CACHE_SIZE', 2000)),
+            default_ttl=float(os.getenv('YTDLP_SEARCH_CACHE_TTL', 6 * 3600))
+        )
+        stream_cache = TTLCache(
+            'stream',
+            max_entries=int(os.getenv('YTDLP_STREAM_CACHE_SIZE', 500)),
+            default_ttl=DEFAULT_STREAM_TTL
+        )
+        return search_cache, stream_cache
+
+    def _publish_caches(self, search_cache, stream_cache) -> bool:
+        """Install caches unless another thread already has. Returns True if these were installed."""
+        with self._cache_lock:
+            if self.search_cache is not None:
+                return False
+            # Publish only fully loaded caches
+            self.stream_cache = stream_cache
+            self.search_cache = search_cache
+            return True
+
+    def _ensure_caches(self):
+        """
+        Make sure the caches exist. On the event loop this never touches the disk: if warm() has not
+        finished loading the persisted caches yet, lookups start with empty ones.
+        """
+        if self.search_cache is None:
+            self._persist_cache = os.getenv('YTDLP_CACHE_PERSIST', 'false').lower() in ('1', 'true', 'yes')
+            self._publish_caches(*self._new_caches())
+
+    def warm(self):
+        """Build the caches ahead of first use, loading them from disk if persisted (runs in a thread at startup)."""
+        if self.search_cache is not None:
+            return
+        self._persist_cache = os.getenv('YTDLP_CACHE_PERSIST', 'false').lower() in ('1', 'true', 'yes')
+        search_cache, stream_cache = self._new_caches()
+        searches = streams = 0
+        if self._persist_cache:
+            searches = search_cache.load(get_data_file('ytdlp_search_cache.json'))
+            streams = stream_cache.load(get_data_file('ytdlp_stream_cache.json'))
+        if not self._publish_caches(search_cache, stream_cache):
+            # The caches are only used from the loop, so loaded entries can't be merged in from here
+            self.logger.warning(f"Extraction cache was in use before it finished loading; "
+                                f"skipped {searches} searches and {streams} streams from disk")
+        elif self._persist_cache:
+            self.logger.info(f"Loaded extraction cache from disk ({searches} searches, {streams} streams)")
+
+    def save_caches(self):
+        """Write the caches to data/ when YTDLP_CACHE_PERSIST is enabled."""
+        if not self._persist_cache or self.search_cache is None:
+            return
+        try:
+            self.search_cache.save(get_data_file('ytdlp_search_cache.json'))
+            self.stream_cache.save(get_data_file('ytdlp_stream_cache.json'))
+        except OSError as e:
+            self.logger.error(f"Failed to save extraction cache: {e}")
+
+    def _cache_stream(self, video_id: Optional[str], info: dict):
+        if video_id and info.get('stream_url'):
+            self.stream_cache.set(
+                video_id,
+                {'stream_url': info['stream_url'], 'video_id': video_id, 'acodec': info.get('acodec')},
+                expires_at=stream_expires_at(info['stream_url'])
+            )
+
+    def _ensure_executor(self) -> Executor:
+        if self._executor is None:
+            workers = max(1, int(os.getenv('YTDLP_WORKERS', 4)))
+            self._guild_limit = max(1, int(os.getenv('YTDLP_GUILD_CONCURRENCY', 2)))
+            if os.getenv('YTDLP_POOL', 'thread').lower() == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rudebot-ytdlp')
+            self.logger.info(f"Extraction pool started ({type(self._executor).__name__}, {workers} workers, "
+                             f"{self._guild_limit} per guild)")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Extractions waiting for a guild slot or a worker."""
+        return self.waiting
+
+    async def search(self, guild_id: str, query: str, user_id: Optional[str] = None) -> dict:
+        """Search for a song. Returns a dict with title, url and video_id."""
+        self._ensure_caches()
+        key = normalize_query(query)
+        cached = self.search_cache.get(key)
+        if cached is not None:
+            return cached
+        info = await self._submit(guild_id, user_id, search_video, query, inflight_key=f"search:{key}")
+        result = {'title': info['title'], 'url': info['url'], 'video_id': info['video_id']}
+        self.search_cache.set(key, result)
+        self._cache_stream(info['video_id'], info)
+        return result
+
+    async def resolve_stream(self, guild_id: str, url: str, user_id: Optional[str] = None) -> dict:
+        """Resolve a watch URL to a stream. Returns a dict with stream_url, video_id and acodec."""
+        self._ensure_caches()
+        video_id = video_id_from_url(url)
+        cached = self.stream_cache.get(video_id)
+        if cached is not None:
+            return cached
+        info = await self._submit(guild_id, user_id, resolve_stream, url, inflight_key=f"stream:{video_id}")
+        self._cache_stream(video_id, info)
+        return info
+
+    def invalidate_stream(self, url: str):
+        """Forget the cached stream for a watch URL (e.g. after a playback failure)."""
+        self._ensure_caches()
+        self.stream_cache.pop(video_id_from_url(url))
+
+    def cancel(self, guild_id: str, user_id: Optional[str] = None) -> int:
+        """
+        Cancel pending extractions for a guild, or only those started by one user.
+        Work already running in a worker finishes in the background and is discarded.
+        Returns the number of extractions cancelled.
+        """
+        cancelled = 0
+        for pending in list(self._pending.get(guild_id, ())):
+            if user_id is not None and pending.user_id != user_id:
+                continue
+            if not pending.task.done():
+                pending.cancelled_by_request = True
+                pending.task.cancel()
+                cancelled += 1
+        if cancelled:
+            self.logger.info(f"Cancelled {cancelled} extractions in guild {guild_id}")
+        return cancelled
+
+    async def _submit(self, guild_id: str, user_id: Optional[str], func, arg, inflight_key: str = None) -> dict:
+        task = asyncio.ensure_future(self._extract(guild_id, func, arg, inflight_key))
+        pending = _PendingExtraction(guild_id, user_id, task)
+        self._pending[guild_id].add(pending)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if pending.cancelled_by_request:
+                raise ExtractionCancelled(f"Extraction cancelled in guild {guild_id}")
+            raise
+        finally:
+            self._pending[guild_id].discard(pending)
+            if not self._pending[guild_id]:
+                del self._pending[guild_id]
+
+    async def _extract(self, guild_id: str, func, arg, inflight_key: Optional[str]) -> dict:
+        """
+        Run an extraction, or join an identical one already in flight (possibly for another guild).
+        """
+        if inflight_key is None:
+            return await self._run(guild_id, func, arg)
+        shared = self._inflight.get(inflight_key)
+        if shared is not None and not shared.done():
+            try:
+                return await asyncio.shield(shared)
+            except asyncio.CancelledError:
+                if not shared.cancelled():
+                    raise
+                # The caller that owned the shared extraction was cancelled; run it ourselves
+        work = asyncio.ensure_future(self._run(guild_id, func, arg))
+        self._inflight[inflight_key] = work
+        work.add_done_callback(
+            lambda done: self._inflight.pop(inflight_key, None) if self._inflight.get(inflight_key) is done else None
+        )
+        return await work
+
+    async def _run(self, guild_id: str, func, arg) -> dict:
+        executor = self._ensure_executor()
+        semaphore = self._guild_semaphores.get(guild_id)
+        if semaphore is None:
+            semaphore = self._guild_semaphores[guild_id] = asyncio.Semaphore(self._guild_limit)
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            started = time.perf_counter()
+            self.wait_time.observe(started - queued)
+            self.running += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, func, arg)
+            finally:
+                self.running -= 1
+                self.extraction_time.observe(time.perf_counter() - started)
+        finally:
+            semaphore.release()
+
+    def shutdown(self):
+        """Save the caches and stop the worker pool without waiting for running extractions."""
+        self.save_caches()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared service so the pool survives cog reloads
+extraction_service = ExtractionService()
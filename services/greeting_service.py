@@ -0,0 +1,122 @@
+"""
+Greeting service for Rudebot.
+Coalesces voice-join greetings so a burst of joins produces one message per text channel,
+and keeps greeting traffic under per-guild and per-channel rate limits.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from utils.metrics_util import registry
+from utils.rate_limit_util import BucketMap
+
+# Counted per join, so sent + dropped + failed adds up to the joins seen (less any still pending)
+greetings_total = registry.counter('greetings_total', 'Voice joins by greeting outcome', ('outcome',))
+
+
+@dataclass
+class PendingGreeting:
+    """Joins waiting to be greeted in one text channel."""
+    guild_id: int
+    channel: object
+    joins: int
+    first_at: float
+    handle: Optional[asyncio.TimerHandle] = None
+
+
+class GreetingScheduler:
+    """
+    Batches joins per text channel for GREETING_WINDOW seconds, then sends one greeting
+    if both the guild and channel token buckets allow it. While rate limited, new joins
+    merge into the waiting batch; batches that cannot be sent within GREETING_MAX_WAIT are
+    dropped, and at most GREETING_MAX_PENDING channels may be waiting at once.
+    """
+
+    def __init__(self, send: Callable[[object, int], Awaitable[None]]):
+        self.send = send
+        self.logger = logging.getLogger("events")
+        self.window = float(os.getenv('GREETING_WINDOW', 3.0))
+        self.max_wait = float(os.getenv('GREETING_MAX_WAIT', 60))
+        self.max_pending = int(os.getenv('GREETING_MAX_PENDING', 100))
+        self.guild_buckets = BucketMap(
+            float(os.getenv('GREETING_GUILD_PER_MIN', 12)) / 60, float(os.getenv('GREETING_GUILD_BURST', 3))
+        )
+        self.channel_buckets = BucketMap(
+            float(os.getenv('GREETING_CHANNEL_PER_MIN', 6)) / 60, float(os.getenv('GREETING_CHANNEL_BURST', 2))
+        )
+        self._pending: Dict[int, PendingGreeting] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def offer(self, guild_id: int, channel) -> bool:
+        """
+        Register a join to be greeted in channel. Returns False if the join was dropped
+        because too many channels already have greetings waiting.
+        """
+        pending = self._pending.get(channel.id)
+        if pending:
+            pending.joins += 1
+            return True
+        if len(self._pending) >= self.max_pending:
+            greetings_total.inc(outcome='dropped')
+            return False
+        pending = PendingGreeting(guild_id, channel, 1, time.monotonic())
+        self._pending[channel.id] = pending
+        self._arm(pending, self.window)
+        return True
+
+    def _arm(self, pending: PendingGreeting, delay: float):
+        loop = asyncio.get_running_loop()
+        pending.handle = loop.call_later(delay, self._start_flush, pending.channel.id)
+
+    def _start_flush(self, channel_id: int):
+        task = asyncio.ensure_future(self._flush(channel_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, channel_id: int):
+        pending = self._pending.get(channel_id)
+        if not pending:
+            return
+        now = time.monotonic()
+        guild_bucket = self.guild_buckets.get(pending.guild_id)
+        channel_bucket = self.channel_buckets.get(channel_id)
+        wait = max(guild_bucket.wait_time(now=now), channel_bucket.wait_time(now=now))
+        if wait > 0:
+            if now - pending.first_at + wait > self.max_wait:
+                del self._pending[channel_id]
+                greetings_total.inc(pending.joins, outcome='dropped')
+                self.logger.info("Dropped greeting for %d joins in channel %s (rate limited)",
+                                 pending.joins, channel_id)
+            else:
+                # Keep merging joins into this batch until the buckets refill
+                self._arm(pending, wait)
+            return
+        guild_bucket.try_take(now=now)
+        channel_bucket.try_take(now=now)
+        # Later joins start a new batch while this one is being sent
+        del self._pending[channel_id]
+        try:
+            await self.send(pending.channel, pending.joins)
+            greetings_total.inc(pending.joins, outcome='sent')
+        except Exception as e:
+            greetings_total.inc(pending.joins, outcome='failed')
+            self.logger.error("Failed to send greeting in channel %s: %s", channel_id, e, exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            'pending_channels': len(self._pending),
+            'pending_joins': sum(p.joins for p in self._pending.values()),
+            'sending': len(self._tasks),
+        }
+
+    def close(self):
+        """Cancel waiting batches and in-flight sends."""
+        for pending in self._pending.values():
+            if pending.handle:
+                pending.handle.cancel()
+        self._pending.clear()
+        for task in list(self._tasks):
+            task.cancel()
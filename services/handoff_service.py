@@ -0,0 +1,214 @@
+"""
+Handoff service for Rudebot.
+Zero-downtime restarts: the running process starts its replacement, waits until the new one is
+connected and ready, then hands over per-guild playback state (current song, position, voice and
+text channel; queues go through the database) so music resumes where it stopped.
+Separates process handoff from main bot functionality.
+
+Sequence (files live in HANDOFF_DIR/<old pid>/):
+  1. old: start `main.py ... --handoff-from <dir> --no-console`
+  2. new: load cogs, log in and connect with commands gated off; write `ready` once the gateway is ready
+  3. old: stop accepting commands, snapshot and stop playback, flush queues, write `state.json`, close
+  4. new: reload queues, accept commands, resume playback from the saved positions, and once
+     the old process has exited take over its control socket and metrics port
+If the new process exits or is not ready within HANDOFF_READY_TIMEOUT, or step 3 fails, the old one
+terminates it and keeps running; a new process that gets no state within HANDOFF_STATE_TIMEOUT exits.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+HANDOFF_DIR = '.handoff'
+PID_FILE = '.bot_pid'
+
+
+def get_handoff_settings() -> dict:
+    """
+    Read the handoff timeouts from the environment.
+    """
+    return {
+        'ready_timeout': float(os.getenv('HANDOFF_READY_TIMEOUT', 90)),
+        'state_timeout': float(os.getenv('HANDOFF_STATE_TIMEOUT', 30)),
+    }
+
+
+def _write_json(path: str, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+class Handoff:
+    """
+    Handoff state for this process: whether it accepts commands and events, and the
+    two halves of a handoff (hand_over in the old process, receive in the new one).
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("main")
+        # False while this process waits to take over, and once it has handed over
+        self.accepting = True
+        # Command line to start a replacement with; None where handoff is unsupported (shard workers)
+        self.argv: Optional[List[str]] = None
+        self.in_progress = False
+
+    async def hand_over(self, bot) -> bool:
+        """
+        Start a replacement process and hand over to it once it is ready.
+        Returns True if the bot was handed over (and closed), False if this process keeps running.
+        """
+        if self.argv is None:
+            self.logger.error("Graceful restart is not available for this process")
+            return False
+        if self.in_progress:
+            self.logger.warning("A graceful restart is already in progress")
+            return False
+        self.in_progress = True
+        settings = get_handoff_settings()
+        directory = os.path.join(HANDOFF_DIR, str(os.getpid()))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        try:
+            # Plain Popen: an asyncio subprocess transport would kill the child when it is closed
+            process = subprocess.Popen(
+                [sys.executable, *self.argv, '--handoff-from', directory, '--no-console'],
+                stdin=subprocess.DEVNULL,
+                # Keep running after this process (and its terminal) goes away
+                start_new_session=True
+            )
+            self.logger.info(f"Graceful restart: started replacement process {process.pid}, waiting for it to be ready")
+
+            started = time.monotonic()
+            ready_path = os.path.join(directory, 'ready')
+            while not os.path.exists(ready_path):
+                if process.poll() is not None:
+                    self.logger.error(f"Graceful restart aborted: replacement exited with code {process.returncode}")
+                    return False
+                if time.monotonic() - started > settings['ready_timeout']:
+                    self.logger.error(f"Graceful restart aborted: replacement not ready after "
+                                      f"{settings['ready_timeout']:.0f}s")
+                    process.terminate()
+                    return False
+                await asyncio.sleep(0.1)
+            self.logger.info(f"Replacement ready after {time.monotonic() - started:.1f}s; handing over")
+
+            # From here on the new process owns the bot
+            self.accepting = False
+            music = bot.get_cog('Music')
+            guilds = []
+            try:
+                if music:
+                    guilds = await music.begin_handoff()
+                from services.queue_service import queue_store
+                await queue_store.flush()
+                _write_json(os.path.join(directory, 'state.json'),
+                            {'pid': os.getpid(), 'created_at': time.time(), 'guilds': guilds})
+            except Exception as e:
+                self.logger.error(f"Graceful restart failed while handing over: {e}", exc_info=True)
+                await self._abort_handover(process, music, guilds)
+                return False
+            self._update_pid_file(process.pid)
+            self.logger.info(f"Handed over {len(guilds)} playing guilds to process {process.pid}")
+        except Exception as e:
+            self.logger.error(f"Graceful restart failed: {e}", exc_info=True)
+            self.accepting = True
+            return False
+        finally:
+            self.in_progress = False
+        await bot.close()
+        return True
+
+    async def _abort_handover(self, process, music, guilds):
+        """
+        Stop the replacement before it takes over (it exits when it gets no state) and pick
+        playback back up in this process.
+        """
+        process.terminate()
+        self.accepting = True
+        if music:
+            music.handing_off = False
+            if guilds:
+                resumed = await music.resume_handoff(guilds)
+                self.logger.info(f"Resumed {resumed} of {len(guilds)} guilds after the failed handoff")
+
+    def _update_pid_file(self, new_pid: int):
+        """Point the scripts' PID file at the replacement if it tracked this process."""
+        try:
+            with open(PID_FILE) as f:
+                tracked = f.read().strip()
+        except OSError:
+            return
+        if tracked == str(os.getpid()):
+            with open(PID_FILE, 'w') as f:
+                f.write(str(new_pid))
+
+    async def receive(self, bot, directory: str) -> bool:
+        """
+        Take over from the process that started this one: signal readiness, wait for its
+        state, then start accepting commands and resume playback.
+        Returns False without taking over if no state arrives (the old process kept running).
+        """
+        self.accepting = False
+        settings = get_handoff_settings()
+        await bot.wait_until_ready()
+        with open(os.path.join(directory, 'ready'), 'w') as f:
+            f.write(str(os.getpid()))
+
+        state_path = os.path.join(directory, 'state.json')
+        started = time.monotonic()
+        state = None
+        while time.monotonic() - started < settings['state_timeout']:
+            if os.path.exists(state_path):
+                with open(state_path) as f:
+                    state = json.load(f)
+                break
+            await asyncio.sleep(0.05)
+        if state is None:
+            self.logger.error(f"No handoff state received within {settings['state_timeout']:.0f}s; "
+                              f"not taking over")
+            return False
+
+        # Queues changed in the old process since this one restored them at startup
+        from services.queue_service import queue_store
+        try:
+            await queue_store.restore(replace=True)
+        except Exception as e:
+            # The old process has gone; carry on with the queues restored at startup
+            self.logger.error(f"Failed to reload queues after handoff: {e}", exc_info=True)
+        self.accepting = True
+        shutil.rmtree(directory, ignore_errors=True)
+
+        guilds = state['guilds']
+        music = bot.get_cog('Music')
+        if music and guilds:
+            resumed = await music.resume_handoff(guilds)
+            self.logger.info(f"Took over from process {state['pid']}: resumed {resumed} of {len(guilds)} guilds "
+                             f"{time.time() - state['created_at']:.1f}s after handoff")
+        else:
+            self.logger.info(f"Took over from process {state['pid']}")
+        await self._wait_for_exit(state['pid'], settings['state_timeout'])
+        return True
+
+    async def _wait_for_exit(self, pid: int, timeout: float):
+        """Wait for the old process to finish closing (it releases the control socket and metrics port)."""
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return
+            except PermissionError:
+                pass
+            await asyncio.sleep(0.1)
+        self.logger.warning(f"Process {pid} still running {timeout:.0f}s after handing over")
+
+
+# Shared handoff state for the bot process
+handoff = Handoff()
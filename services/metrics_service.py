@@ -0,0 +1,137 @@
+"""
+Metrics service for Rudebot.
+Registers bot-level metrics (command latency, voice connections, queue lengths, gateway
+latency) and serves the metrics registry over an optional local HTTP endpoint.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Optional
+
+from utils.metrics_util import registry
+
+command_latency = registry.histogram('discord_command_seconds', 'Time spent running each command', ('command',))
+commands_total = registry.counter('discord_commands_total', 'Commands invoked by outcome', ('command', 'status'))
+
+
+def get_metrics_settings() -> dict:
+    """Read metrics settings from the environment. METRICS_PORT unset or 0 disables the endpoint."""
+    return {
+        'host': os.getenv('METRICS_HOST', '127.0.0.1'),
+        'port': int(os.getenv('METRICS_PORT', 0) or 0),
+    }
+
+
+def instrument_bot(bot):
+    """
+    Time every command and register gauges computed from the bot's state at collection time.
+    """
+    from services.extraction_service import extraction_service
+    from services.queue_service import queue_store
+    from services.shard_service import shard_health
+
+    async def on_command(ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    def _finish(ctx, status):
+        started = getattr(ctx, 'metrics_started', None)
+        if started is None or ctx.command is None:
+            return
+        name = ctx.command.qualified_name
+        command_latency.observe(time.perf_counter() - started, command=name)
+        commands_total.inc(command=name, status=status)
+
+    async def on_command_completion(ctx):
+        _finish(ctx, 'ok')
+
+    async def on_command_error(ctx, error):
+        _finish(ctx, 'error')
+        # Any on_command_error listener replaces discord.py's default handler, which logs
+        # the exception; keep doing that unless the command or cog handles its own errors
+        if ctx.command and ctx.command.has_error_handler():
+            return
+        if ctx.cog and ctx.cog.has_error_handler():
+            return
+        logging.getLogger("main").error('Ignoring exception in command %s', ctx.command, exc_info=error)
+
+    bot.add_listener(on_command, 'on_command')
+    bot.add_listener(on_command_completion, 'on_command_completion')
+    bot.add_listener(on_command_error, 'on_command_error')
+
+    registry.gauge('discord_gateway_latency_seconds', 'Heartbeat latency per shard', ('shard',)).set_function(
+        lambda: {
+            (shard['shard_id'],): (shard['latency_ms'] / 1000 if shard['latency_ms'] is not None else float('nan'))
+            for shard in shard_health(bot)
+        }
+    )
+    registry.gauge('discord_guilds', 'Connected guilds').set_function(lambda: len(bot.guilds))
+    registry.gauge('discord_voice_connections', 'Active voice connections').set_function(
+        lambda: len(bot.voice_clients)
+    )
+    registry.gauge('music_queued_songs', 'Songs waiting in all guild queues').set_function(
+        lambda: sum(queue_store.lengths().values())
+    )
+    registry.gauge('music_active_queues', 'Guilds with a non-empty queue').set_function(
+        lambda: len(queue_store.lengths())
+    )
+    registry.gauge('music_queue_max_length', 'Longest guild queue').set_function(
+        lambda: max(queue_store.lengths().values(), default=0)
+    )
+    registry.gauge('ytdlp_running', 'Extractions currently running').set_function(
+        lambda: extraction_service.running
+    )
+    registry.gauge('ytdlp_queue_depth', 'Extractions waiting for a worker').set_function(
+        lambda: extraction_service.queue_depth
+    )
+
+
+class MetricsServer:
+    """
+    Minimal asyncio HTTP server answering GET /metrics with the Prometheus text format.
+    Binds to localhost by default; intended for a local scraper or curl.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.logger = logging.getLogger("metrics")
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Start the HTTP endpoint when a port is configured."""
+        if self.port and self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.logger.info("Metrics endpoint listening on http://%s:%s/metrics", self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain headers
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, content_type = '200 OK', 'text/plain; version=0.0.4; charset=utf-8'
+                body = registry.render_prometheus().encode()
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain', b'not found\n'
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            self.logger.error("Metrics request failed: %s", e)
+        finally:
+            writer.close()
@@ -4,34 +4,37 @@ Handles music queue management for streaming playback.
 Separates business logic from Discord-specific cog implementation.
 """
 import time
-from typing import List
+from typing import Dict, List
+from sqlalchemy import func
 from data.models import SongQueue
-from data.session import get_session
+from data.session import get_session, get_read_session
+from data.async_session import run_read, run_write
 
 
 def get_total_song_count(guild_id: str) -> int:
     """
     Get the total number of songs stored for a guild (queue + played).
     """
-    with get_session() as session:
+    with get_read_session() as session:
         return session.query(SongQueue).filter_by(guild_id=guild_id).count()
 
 
-
-
 def add_song(guild_id: str, user_id: str, title: str, url: str) -> dict:
     """
     Add a song to the queue for a guild.
     Returns a dict with song info.
     """
     with get_session() as session:
+        # Append after the current tail; writes are serialized so this cannot race
+        last_position = session.query(func.max(SongQueue.position)).filter_by(guild_id=guild_id).scalar()
         song = SongQueue(
             guild_id=guild_id,
             user_id=user_id,
             title=title,
             url=url,
             file_path=None,
-            added_at=int(time.time())
+            added_at=int(time.time()),
+            position=0 if last_position is None else last_position + 1
         )
         session.add(song)
         session.commit()
@@ -55,9 +58,66 @@ def get_queue(guild_id: str) -> List[SongQueue]:
     """
     Get the current queue for a guild (not played yet).
     """
+    with get_read_session() as session:
+        return session.query(SongQueue).filter_by(guild_id=guild_id).order_by(SongQueue.position, SongQueue.id).all()
+
+
+def load_all_queues() -> Dict[str, List[SongQueue]]:
+    """
+    Load every persisted queue, grouped by guild and in play order.
+    """
+    with get_read_session() as session:
+        rows = session.query(SongQueue).order_by(
+            SongQueue.guild_id, SongQueue.position, SongQueue.id
+        ).all()
+    queues: Dict[str, List[SongQueue]] = {}
+    for row in rows:
+        queues.setdefault(row.guild_id, []).append(row)
+    return queues
+
+
+def replace_guild_queues(queues: Dict[str, List[dict]]) -> None:
+    """
+    Replace the stored queue of each guild with the given rows, in a single transaction.
+    Rows are dicts of SongQueue columns; positions are assigned from list order.
+    """
     with get_session() as session:
-        return session.query(SongQueue).filter_by(guild_id=guild_id).order_by(SongQueue.added_at).all()
+        for guild_id, rows in queues.items():
+            session.query(SongQueue).filter_by(guild_id=guild_id).delete(synchronize_session=False)
+            if rows:
+                session.bulk_insert_mappings(SongQueue, [
+                    dict(row, position=position) for position, row in enumerate(rows)
+                ])
+        session.commit()
+
+
+# Awaitable counterparts for use from cogs; reads use the read pool, writes the writer thread.
+
+async def get_total_song_count_async(guild_id: str) -> int:
+    """Awaitable version of get_total_song_count."""
+    return await run_read(get_total_song_count, guild_id)
+
+
+async def add_song_async(guild_id: str, user_id: str, title: str, url: str) -> dict:
+    """Awaitable version of add_song."""
+    return await run_write(add_song, guild_id, user_id, title, url)
+
+
+async def remove_song_async(song_id: int) -> bool:
+    """Awaitable version of remove_song."""
+    return await run_write(remove_song, song_id)
+
+
+async def get_queue_async(guild_id: str) -> List[SongQueue]:
+    """Awaitable version of get_queue."""
+    return await run_read(get_queue, guild_id)
 
 
+async def load_all_queues_async() -> Dict[str, List[SongQueue]]:
+    """Awaitable version of load_all_queues."""
+    return await run_read(load_all_queues)
 
 
+async def replace_guild_queues_async(queues: Dict[str, List[dict]]) -> None:
+    """Awaitable version of replace_guild_queues."""
+    return await run_write(replace_guild_queues, queues)
@@ -0,0 +1,98 @@
+"""
+Playback service for Rudebot.
+Builds the discord.py audio source for a track according to MUSIC_PLAYBACK_MODE:
+  pcm  - FFmpeg decodes to PCM and discord.py encodes Opus in-process (original behaviour)
+  opus - FFmpeg outputs Opus; Opus input is copied as-is, anything else is encoded by FFmpeg
+  auto - like opus, probing the codec with ffprobe when it is not known, and falling
+         back to PCM only if an Opus source cannot be created
+"""
+import logging
+import os
+from typing import Optional
+import discord
+
+PLAYBACK_MODES = ('pcm', 'opus', 'auto')
+
+# Remote streams reconnect on drops; local files do not need it
+STREAM_BEFORE_OPTIONS = '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5'
+FFMPEG_OPTIONS = '-vn'
+
+logger = logging.getLogger("music")
+
+
+def get_playback_mode() -> str:
+    """Configured playback mode (defaults to auto)."""
+    mode = os.getenv('MUSIC_PLAYBACK_MODE', 'auto').lower()
+    if mode not in PLAYBACK_MODES:
+        logger.warning(f"Unknown MUSIC_PLAYBACK_MODE '{mode}', using auto")
+        mode = 'auto'
+    return mode
+
+
+def is_opus(codec: Optional[str]) -> bool:
+    return codec in ('opus', 'libopus')
+
+
+class TrackedSource(discord.AudioSource):
+    """
+    Wraps an audio source and counts the 20ms frames read from it, which gives the playback
+    position (the player only reads while playing, so pauses are not counted).
+    """
+
+    def __init__(self, original: discord.AudioSource, offset: float = 0.0):
+        self.original = original
+        self.offset = offset
+        self.frames = 0
+
+    @property
+    def position(self) -> float:
+        """Seconds into the track, including the offset playback started at."""
+        return self.offset + self.frames * discord.opus.Encoder.FRAME_LENGTH / 1000
+
+    def read(self) -> bytes:
+        data = self.original.read()
+        if data:
+            self.frames += 1
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self):
+        self.original.cleanup()
+
+
+async def create_audio_source(source: str, codec: Optional[str] = None, local: bool = False,
+                              mode: Optional[str] = None, start: float = 0.0) -> discord.AudioSource:
+    """
+    Create an audio source for a stream URL or local file.
+    codec is the audio codec when already known (yt-dlp's acodec, or 'opus' for cached files).
+    start seeks that many seconds into the track (FFmpeg input seeking).
+    """
+    mode = mode or get_playback_mode()
+    before_options = None if local else STREAM_BEFORE_OPTIONS
+    if start > 0:
+        before_options = f"{before_options or ''} -ss {start:.2f}".strip()
+
+    if mode == 'pcm':
+        return discord.FFmpegPCMAudio(source, before_options=before_options, options=FFMPEG_OPTIONS)
+
+    if mode == 'auto' and codec is None:
+        try:
+            codec, _ = await discord.FFmpegOpusAudio.probe(source, method='fallback')
+        except Exception as e:
+            logger.warning(f"Codec probe failed, letting FFmpeg encode Opus: {e}")
+
+    try:
+        # codec='opus' makes FFmpeg copy the stream instead of re-encoding it
+        return discord.FFmpegOpusAudio(
+            source,
+            codec='opus' if is_opus(codec) else None,
+            before_options=before_options,
+            options=FFMPEG_OPTIONS
+        )
+    except Exception as e:
+        if mode == 'opus':
+            raise
+        logger.warning(f"Opus source unavailable, falling back to PCM: {e}")
+        return discord.FFmpegPCMAudio(source, before_options=before_options, options=FFMPEG_OPTIONS)
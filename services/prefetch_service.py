@@ -0,0 +1,128 @@
+"""
+Prefetch service for Rudebot.
+Resolves the stream URLs of the next songs in a guild's queue while the current one plays,
+and can optionally start FFmpeg for the very next song ahead of time, so the gap between
+tracks is close to zero.
+Separates business logic from Discord-specific cog implementation.
+"""
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+from services.extraction_service import extraction_service, ExtractionCancelled, video_id_from_url
+from services.audio_cache_service import audio_cache
+from services.queue_service import GuildQueue
+from utils.metrics_util import registry
+
+# Time from the end of one track to audio starting for the next
+track_gap = registry.histogram('music_track_gap_seconds', 'Silence between consecutive tracks')
+
+
+@dataclass
+class _WarmSource:
+    entry_id: int
+    stream_url: str
+    source: Any
+    created_at: float
+
+
+class Prefetcher:
+    """
+    Lookahead stage for the music queue.
+    MUSIC_PREFETCH_DEPTH songs after the playing one are resolved in the background;
+    with MUSIC_PREFETCH_WARM_FFMPEG enabled the next song's audio source is built early too.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("music")
+        self.depth = max(0, int(os.getenv('MUSIC_PREFETCH_DEPTH', 2)))
+        self.warm_ffmpeg = os.getenv('MUSIC_PREFETCH_WARM_FFMPEG', 'false').lower() in ('1', 'true', 'yes')
+        # Warm sources older than this are discarded; the upstream connection may have gone idle
+        self.warm_max_age = float(os.getenv('MUSIC_PREFETCH_WARM_MAX_AGE', 900))
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._warm: Dict[str, _WarmSource] = {}
+
+    def schedule(self, guild_id: str, queue: GuildQueue,
+                 source_factory: Optional[Callable[..., Awaitable[Any]]] = None):
+        """
+        (Re)start prefetching for a guild after the queue changed or a new track started.
+        Songs at indexes 1..depth are resolved; index 0 is the one playing.
+        """
+        if self.depth == 0:
+            return
+        upcoming = queue.snapshot()[1:1 + self.depth]
+        previous = self._tasks.pop(guild_id, None)
+        if previous and not previous.done():
+            previous.cancel()
+        if not upcoming:
+            self._drop_warm(guild_id)
+            return
+        self._tasks[guild_id] = asyncio.create_task(self._prefetch(guild_id, upcoming, source_factory))
+
+    async def _prefetch(self, guild_id: str, songs, source_factory):
+        for index, song in enumerate(songs):
+            if audio_cache.has(video_id_from_url(song.url)):
+                # Plays from disk; nothing to resolve
+                continue
+            try:
+                # Shielded so a reschedule does not throw away a resolve that is nearly done
+                stream = await asyncio.shield(extraction_service.resolve_stream(guild_id, song.url))
+            except (ExtractionCancelled, asyncio.CancelledError):
+                return
+            except Exception as e:
+                # Leave it to _play_next to report the failure when the song comes up
+                self.logger.warning(f"Prefetch failed for '{song.title}' in guild {guild_id}: {e}")
+                continue
+            if index == 0 and self.warm_ffmpeg and source_factory:
+                await self._warm_source(guild_id, song.entry_id, stream, source_factory)
+
+    async def _warm_source(self, guild_id: str, entry_id: int, stream: dict, source_factory):
+        stream_url = stream['stream_url']
+        warm = self._warm.get(guild_id)
+        if warm and warm.entry_id == entry_id and warm.stream_url == stream_url:
+            return
+        try:
+            source = await source_factory(stream_url, codec=stream.get('acodec'))
+        except Exception as e:
+            self.logger.warning(f"Could not warm audio source in guild {guild_id}: {e}")
+            return
+        self._drop_warm(guild_id)
+        self._warm[guild_id] = _WarmSource(entry_id, stream_url, source, time.monotonic())
+
+    def take_warm(self, guild_id: str, entry_id: int, stream_url: str):
+        """
+        Return the pre-built audio source for this song if one is ready and still valid.
+        Any warm source that does not match (reordered queue, re-resolved URL) is discarded.
+        """
+        warm = self._warm.pop(guild_id, None)
+        if warm is None:
+            return None
+        if (warm.entry_id == entry_id and warm.stream_url == stream_url
+                and time.monotonic() - warm.created_at < self.warm_max_age):
+            return warm.source
+        self._cleanup(warm)
+        return None
+
+    def discard(self, guild_id: str):
+        """Cancel prefetching and release any warm source for a guild (e.g. on !dj stop)."""
+        task = self._tasks.pop(guild_id, None)
+        if task and not task.done():
+            task.cancel()
+        self._drop_warm(guild_id)
+
+    def _drop_warm(self, guild_id: str):
+        warm = self._warm.pop(guild_id, None)
+        if warm:
+            self._cleanup(warm)
+
+    def _cleanup(self, warm: _WarmSource):
+        try:
+            warm.source.cleanup()
+        except Exception as e:
+            self.logger.warning(f"Failed to clean up warm audio source: {e}")
+
+
+# Shared prefetcher so lookahead state survives cog reloads
+prefetcher = Prefetcher()
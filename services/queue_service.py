@@ -0,0 +1,251 @@
+"""
+Queue service for Rudebot.
+Holds the authoritative music queue for each guild in memory and persists it
+to the song_queue table in the background (write-behind), in batches.
+Separates business logic from Discord-specific cog implementation.
+"""
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+from services.music_service import load_all_queues_async, replace_guild_queues_async
+
+# Entry ids are process-local handles for queued songs; the DB row id is not known until flush
+_entry_ids = itertools.count(1)
+
+
+@dataclass(slots=True)
+class QueuedSong:
+    """
+    A single song in a guild queue.
+    """
+    entry_id: int
+    guild_id: str
+    user_id: str
+    title: str
+    url: str
+    added_at: int
+    file_path: Optional[str] = None
+
+    def to_row(self) -> dict:
+        """Column values for the song_queue table (position is assigned on flush)."""
+        return {
+            'guild_id': self.guild_id,
+            'user_id': self.user_id,
+            'title': self.title,
+            'url': self.url,
+            'file_path': self.file_path,
+            'added_at': self.added_at,
+        }
+
+
+class GuildQueue:
+    """
+    Ordered queue for one guild. Index 0 is the song that is playing (or plays next).
+    push/pop are O(1); indexed removal, move and shuffle are O(n) on a small deque.
+    Every mutation notifies on_change so the store can persist it later.
+    """
+
+    def __init__(self, guild_id: str, songs=(), on_change: Optional[Callable[[str], None]] = None):
+        self.guild_id = guild_id
+        self._songs = deque(songs)
+        self._on_change = on_change
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def __iter__(self) -> Iterator[QueuedSong]:
+        return iter(self._songs)
+
+    def __getitem__(self, index: int) -> QueuedSong:
+        return self._songs[index]
+
+    def _changed(self):
+        if self._on_change:
+            self._on_change(self.guild_id)
+
+    def push(self, song: QueuedSong):
+        """Append a song to the end of the queue."""
+        self._songs.append(song)
+        self._changed()
+
+    def pop(self) -> Optional[QueuedSong]:
+        """Remove and return the head of the queue, or None if empty."""
+        if not self._songs:
+            return None
+        song = self._songs.popleft()
+        self._changed()
+        return song
+
+    def peek(self) -> Optional[QueuedSong]:
+        """Return the head of the queue without removing it."""
+        return self._songs[0] if self._songs else None
+
+    def remove_at(self, index: int) -> QueuedSong:
+        """Remove and return the song at a 0-based index. Raises IndexError if out of range."""
+        if index < 0 or index >= len(self._songs):
+            raise IndexError(index)
+        song = self._songs[index]
+        del self._songs[index]
+        self._changed()
+        return song
+
+    def remove_entry(self, entry_id: int) -> Optional[QueuedSong]:
+        """Remove the song with the given entry id. Returns it, or None if not queued."""
+        for index, song in enumerate(self._songs):
+            if song.entry_id == entry_id:
+                del self._songs[index]
+                self._changed()
+                return song
+        return None
+
+    def move(self, source: int, destination: int):
+        """Move the song at 0-based index source to index destination."""
+        if not (0 <= source < len(self._songs)) or not (0 <= destination < len(self._songs)):
+            raise IndexError((source, destination))
+        song = self._songs[source]
+        del self._songs[source]
+        self._songs.insert(destination, song)
+        self._changed()
+
+    def shuffle(self, start: int = 0):
+        """Shuffle songs from index start onwards (use start=1 to keep the playing song)."""
+        head = list(itertools.islice(self._songs, 0, start))
+        tail = list(itertools.islice(self._songs, start, None))
+        random.shuffle(tail)
+        self._songs = deque(head + tail)
+        self._changed()
+
+    def clear(self):
+        """Remove every song."""
+        self._songs.clear()
+        self._changed()
+
+    def snapshot(self) -> List[QueuedSong]:
+        """Copy of the queue contents in order."""
+        return list(self._songs)
+
+
+class QueueStore:
+    """
+    Owns every GuildQueue and persists changed queues in periodic batches.
+    Each flush rewrites the dirty guilds in a single transaction on the DB writer thread.
+    """
+
+    def __init__(self, flush_interval: float = 2.0):
+        self.logger = logging.getLogger("music")
+        self.flush_interval = flush_interval
+        self._queues: Dict[str, GuildQueue] = {}
+        self._dirty = set()
+        self._restored = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # Optional predicate limiting restore() to guilds this process owns (sharding)
+        self.guild_filter: Optional[Callable[[str], bool]] = None
+
+    def lengths(self) -> Dict[str, int]:
+        """Return the number of queued songs per guild with a non-empty queue."""
+        return {guild_id: len(queue) for guild_id, queue in self._queues.items() if len(queue)}
+
+    def get(self, guild_id: str) -> GuildQueue:
+        """Return the queue for a guild, creating an empty one if needed."""
+        queue = self._queues.get(guild_id)
+        if queue is None:
+            queue = GuildQueue(guild_id, on_change=self._mark_dirty)
+            self._queues[guild_id] = queue
+        return queue
+
+    def new_song(self, guild_id: str, user_id: str, title: str, url: str) -> QueuedSong:
+        """Build a QueuedSong with a fresh entry id."""
+        return QueuedSong(
+            entry_id=next(_entry_ids),
+            guild_id=guild_id,
+            user_id=user_id,
+            title=title,
+            url=url,
+            added_at=int(time.time())
+        )
+
+    def _mark_dirty(self, guild_id: str):
+        self._dirty.add(guild_id)
+
+    async def start(self):
+        """
+        Rebuild queues from the database (first call only) and start the background flusher.
+        """
+        if not self._restored:
+            await self.restore()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background flusher and write any pending changes."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def restore(self, replace: bool = False):
+        """
+        Load every persisted queue from the database into memory.
+        With replace, queues not in the database are dropped rather than kept.
+        """
+        rows_by_guild = await load_all_queues_async()
+        if self.guild_filter:
+            rows_by_guild = {
+                guild_id: rows for guild_id, rows in rows_by_guild.items() if self.guild_filter(guild_id)
+            }
+        if replace:
+            self._queues = {}
+            self._dirty = set()
+        for guild_id, rows in rows_by_guild.items():
+            songs = [
+                QueuedSong(
+                    entry_id=next(_entry_ids),
+                    guild_id=guild_id,
+                    user_id=row.user_id,
+                    title=row.title,
+                    url=row.url,
+                    added_at=row.added_at,
+                    file_path=row.file_path
+                )
+                for row in rows
+            ]
+            self._queues[guild_id] = GuildQueue(guild_id, songs, on_change=self._mark_dirty)
+        self._restored = True
+        total = sum(len(rows) for rows in rows_by_guild.values())
+        self.logger.info(f"Restored {total} queued songs across {len(rows_by_guild)} guilds")
+
+    async def flush(self):
+        """Persist every queue changed since the last flush in one transaction."""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            batch = {
+                guild_id: [song.to_row() for song in self.get(guild_id)]
+                for guild_id in dirty
+            }
+            try:
+                await replace_guild_queues_async(batch)
+            except Exception as e:
+                # Put the guilds back so the next flush retries them
+                self._dirty |= dirty
+                self.logger.error(f"Failed to persist queues for {len(dirty)} guilds: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+# Shared store so queues survive cog reloads
+queue_store = QueueStore()
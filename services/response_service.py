@@ -3,14 +3,24 @@ Response service for Rudebot.
 Handles response data fetching, formatting, and Discord message sending.
 Separates business logic from Discord-specific cog implementation.
 """
+import asyncio
 import discord
 import logging
-from typing import Optional, Union, List
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union, List
 from dataclasses import dataclass
 from data.models import Response
-from data.session import get_session
+from data.session import get_read_session
+from data.async_session import run_read
+from utils.cache_util import TTLCache
+from utils.logging_util import log_event
 import random
 
+# Touched by data/scripts/import_bot_data.py whenever responses change on disk
+RESPONSES_STAMP_PATH = 'data/.responses_version'
+
 
 @dataclass
 class BotResponse:
@@ -22,6 +32,157 @@ class BotResponse:
     action: Optional[str] = None
 
 
+@dataclass(frozen=True, slots=True)
+class ResponseRecord:
+    """
+    Compact, immutable copy of a Response row held by the ResponseCatalog.
+    """
+    text: Optional[str] = None
+    gif_url: Optional[str] = None
+    emote: Optional[str] = None
+    action: Optional[str] = None
+
+
+class ResponseCatalog:
+    """
+    In-memory index of every response keyed by (category, trigger).
+    Loaded once from the database so that commands and events never query SQLite.
+    Rebuilt on demand, or automatically when the import script touches the stamp file;
+    automatic rebuilds run on a worker thread while lookups keep using the current index.
+    """
+
+    def __init__(self, stamp_path: str = RESPONSES_STAMP_PATH, check_interval: float = 5.0):
+        self.logger = logging.getLogger("responses")
+        self._index: Dict[Tuple[str, str], Tuple[ResponseRecord, ...]] = {}
+        self._loaded = False
+        self._stale = False
+        self._reloading = False
+        self._lock = threading.Lock()
+        self._stamp_path = stamp_path
+        self._stamp_mtime = self._read_stamp()
+        self._check_interval = check_interval
+        self._next_check = 0.0
+
+    def load(self) -> int:
+        """
+        Load the catalog if it has not been loaded yet. Returns the number of records.
+        """
+        if self._loaded:
+            return self.size()
+        return self.reload()
+
+    def reload(self) -> int:
+        """
+        Rebuild the index from the database. Returns the number of records loaded.
+        """
+        with self._lock:
+            self._reloading = True
+        try:
+            return self._rebuild()
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def _rebuild(self) -> int:
+        stamp = self._read_stamp()
+        grouped: Dict[Tuple[str, str], List[ResponseRecord]] = {}
+        with get_read_session() as session:
+            rows = session.query(
+                Response.category, Response.trigger, Response.text,
+                Response.gif_url, Response.emote, Response.action
+            ).order_by(Response.id).all()
+        for category, trigger, text, gif_url, emote, action in rows:
+            record = ResponseRecord(
+                text=text or None,
+                gif_url=gif_url or None,
+                emote=emote or None,
+                action=action or None
+            )
+            grouped.setdefault((category, trigger), []).append(record)
+        index = {key: tuple(records) for key, records in grouped.items()}
+        with self._lock:
+            self._index = index
+            self._loaded = True
+            self._stale = False
+            self._stamp_mtime = stamp
+        self.logger.info("Response catalog loaded: %d responses across %d triggers", len(rows), len(index))
+        return len(rows)
+
+    def invalidate(self):
+        """
+        Mark the index stale so the next lookup starts a rebuild (the current index is served meanwhile).
+        """
+        with self._lock:
+            self._stale = True
+            self._next_check = 0.0
+
+    def size(self) -> int:
+        """
+        Total number of records currently held.
+        """
+        return sum(len(records) for records in self._index.values())
+
+    def get(self, category: str, trigger: str) -> Tuple[ResponseRecord, ...]:
+        """
+        Return every record for a category and trigger (empty tuple if none).
+        """
+        self._ensure_fresh()
+        return self._index.get((category, trigger), ())
+
+    def random(self, category: str, trigger: str) -> Optional[ResponseRecord]:
+        """
+        Return a random record for a category and trigger, or None.
+        """
+        records = self.get(category, trigger)
+        if not records:
+            return None
+        return random.choice(records)
+
+    def _ensure_fresh(self):
+        """
+        Start a rebuild if the catalog is not loaded yet or the stamp file changed since the last load.
+        The stamp is checked at most once per check_interval seconds. On the event loop the rebuild
+        runs on a worker thread and lookups keep using the current index (empty before the first
+        load); only one rebuild runs at a time.
+        """
+        now = time.monotonic()
+        if self._reloading or (self._loaded and now < self._next_check):
+            return
+        self._next_check = now + self._check_interval
+        if self._loaded and not self._stale and self._read_stamp() == self._stamp_mtime:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Scripts without an event loop can afford to wait for the query
+            self._reload_logged()
+            return
+        with self._lock:
+            self._reloading = True
+        try:
+            loop.run_in_executor(None, self._reload_logged)
+        except RuntimeError:
+            # Executor already shut down (bot closing)
+            with self._lock:
+                self._reloading = False
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception as e:
+            self.logger.error("Failed to load response catalog: %s", e, exc_info=True)
+
+    def _read_stamp(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self._stamp_path)
+        except OSError:
+            return None
+
+
+# Shared catalog used by all cogs
+response_catalog = ResponseCatalog()
+
+
 def format_response_text(user: Union[discord.Member, discord.User], text: str, emote: str) -> str:
     """
     Format a response message by combining a user mention, text, and emote.
@@ -34,13 +195,34 @@ def format_response_text(user: Union[discord.Member, discord.User], text: str, e
     return " ".join(parts).strip()
 
 
+# Prebuilt GIF embeds keyed by gif_url; embeds are never mutated after creation, so they are shared.
+# Created on first use so RESPONSE_EMBED_CACHE_SIZE is read after .env has been loaded
+_embed_cache: Optional[TTLCache] = None
+
+
+def get_gif_embed(gif_url: str) -> discord.Embed:
+    """
+    Return a cached embed showing gif_url, building it on first use.
+    """
+    global _embed_cache
+    if _embed_cache is None:
+        _embed_cache = TTLCache('gif_embeds', max_entries=int(os.getenv('RESPONSE_EMBED_CACHE_SIZE', 256)),
+                                default_ttl=86400)
+    embed = _embed_cache.get(gif_url)
+    if embed is None:
+        embed = discord.Embed()
+        embed.set_image(url=gif_url)
+        _embed_cache.set(gif_url, embed)
+    return embed
+
+
 async def send_response(
     target: Union[discord.abc.Messageable, discord.ext.commands.Context],
     response: BotResponse,
     logger: Optional[logging.Logger] = None
 ):
     """
-    Send a text and/or gif response to a Discord context or channel, and log the action.
+    Send a text and/or gif response to a Discord context or channel as a single message, and log the action.
     """
     user = getattr(target, 'author', None) or getattr(target, 'user', None)
     channel_id = getattr(target, 'channel', getattr(target, 'id', None))
@@ -50,18 +232,20 @@ async def send_response(
     if not guild_id and hasattr(target, 'guild'):
         guild_id = target.guild.id
 
-    if response.text:
-        await target.send(response.text)
-        if logger:
-            logger.info(f"Sent response to {user} in channel {channel_id} (guild {guild_id}): {response.text}")
-    if response.gif_url:
-        embed = discord.Embed()
-        embed.set_image(url=response.gif_url)
-        await target.send(embed=embed)
-        if logger:
-            logger.info(f"Sent gif to {user} in channel {channel_id} (guild {guild_id}): {response.gif_url}")
-    if response.action and logger:
-        logger.info(f"Performed action '{response.action}' for {user} in channel {channel_id} (guild {guild_id})")
+    if response.text or response.gif_url:
+        await target.send(content=response.text,
+                          embed=get_gif_embed(response.gif_url) if response.gif_url else None)
+    if not logger:
+        return
+    if response.text or response.gif_url:
+        log_event(logger, logging.INFO, 'response_sent', "Sent response to %s in channel %s (guild %s): %s%s",
+                  user, channel_id, guild_id, response.text or '',
+                  f" [gif {response.gif_url}]" if response.gif_url else '',
+                  guild_id=guild_id, channel_id=channel_id, user_id=getattr(user, 'id', None))
+    if response.action:
+        log_event(logger, logging.INFO, 'response_action', "Performed action '%s' for %s in channel %s (guild %s)",
+                  response.action, user, channel_id, guild_id,
+                  guild_id=guild_id, channel_id=channel_id, user_id=getattr(user, 'id', None))
 
 
 def get_responses(category: str, trigger: str) -> List[Response]:
@@ -69,17 +253,21 @@ def get_responses(category: str, trigger: str) -> List[Response]:
     Fetch all Response entries from the database for a given category and trigger.
     Returns a list of Response ORM objects.
     """
-    with get_session() as session:
+    with get_read_session() as session:
         responses = session.query(Response).filter_by(category=category, trigger=trigger).all()
         return responses
 
 
-def get_random_response(category: str, trigger: str) -> Optional[Response]:
+async def get_responses_async(category: str, trigger: str) -> List[Response]:
+    """
+    Awaitable version of get_responses that runs on the DB read pool.
+    """
+    return await run_read(get_responses, category, trigger)
+
+
+def get_random_response(category: str, trigger: str) -> Optional[ResponseRecord]:
     """
-    Fetch a random Response entry from the database for a given category and trigger.
-    Returns a single Response ORM object or None.
+    Pick a random response for a given category and trigger from the in-memory catalog.
+    Returns a single ResponseRecord or None.
     """
-    responses = get_responses(category, trigger)
-    if not responses:
-        return None
-    return random.choice(responses)
\ No newline at end of file
+    return response_catalog.random(category, trigger)
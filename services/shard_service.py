@@ -0,0 +1,245 @@
+"""
+Shard service for Rudebot.
+Shard assignment helpers, per-worker health files, and the supervisor that runs one
+worker process per shard range and restarts workers that exit unexpectedly.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import signal
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Directory where worker processes publish their per-shard health
+HEALTH_DIR = '.shards'
+
+
+def shard_for_guild(guild_id, shard_count: int) -> int:
+    """Shard that owns a guild (Discord's formula)."""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def shard_ranges(shard_count: int, processes: int) -> List[List[int]]:
+    """Split shard ids 0..shard_count-1 into contiguous, evenly sized ranges."""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+def shard_health(bot) -> List[dict]:
+    """Per-shard health for a (possibly sharded) bot."""
+    shards = getattr(bot, 'shards', None)
+    if shards:
+        return [
+            {'shard_id': shard_id, 'latency_ms': round(info.latency * 1000, 1), 'closed': info.is_closed()}
+            for shard_id, info in sorted(shards.items())
+        ]
+    return [{
+        'shard_id': bot.shard_id or 0,
+        'latency_ms': None if math.isnan(bot.latency) else round(bot.latency * 1000, 1),
+        'closed': bot.is_closed(),
+    }]
+
+
+def write_health(bot, worker_name: str):
+    """Publish this worker's shard health to HEALTH_DIR for the supervisor."""
+    os.makedirs(HEALTH_DIR, exist_ok=True)
+    data = {
+        'pid': os.getpid(),
+        'updated_at': time.time(),
+        'guilds': len(bot.guilds),
+        'shards': shard_health(bot),
+    }
+    path = os.path.join(HEALTH_DIR, f'{worker_name}.json')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+async def health_reporter(bot, worker_name: str, interval: float = 15.0):
+    """Background task that refreshes the worker's health file until cancelled."""
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        try:
+            write_health(bot, worker_name)
+        except OSError as e:
+            logging.getLogger("main").warning(f"Could not write shard health: {e}")
+        await asyncio.sleep(interval)
+
+
+@dataclass
+class Worker:
+    """A supervised worker process owning a range of shards."""
+    name: str
+    shard_ids: List[int]
+    process: Optional[asyncio.subprocess.Process] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = 1.0
+    stopping: bool = False
+    restart_requested: bool = False
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class ShardSupervisor:
+    """
+    Starts one worker process per shard range and restarts any worker that exits with an error,
+    with exponential backoff. A worker that exits cleanly (code 0) is not restarted.
+    """
+
+    def __init__(self, shard_count: int, processes: int, command: Optional[List[str]] = None,
+                 max_backoff: float = 60.0, stable_after: float = 60.0):
+        self.logger = logging.getLogger("supervisor")
+        self.shard_count = shard_count
+        # Command used to start a worker; shard arguments are appended
+        self.command = command or [sys.executable, 'main.py', '--no-console']
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.workers = [
+            Worker(name=f"worker-{index}", shard_ids=ids)
+            for index, ids in enumerate(shard_ranges(shard_count, processes))
+        ]
+        self._stopped = asyncio.Event()
+
+    def _worker_command(self, worker: Worker) -> List[str]:
+        return self.command + [
+            '--shard-ids', ','.join(str(i) for i in worker.shard_ids),
+            '--shard-count', str(self.shard_count),
+            '--worker-name', worker.name,
+        ]
+
+    async def _run_worker(self, worker: Worker):
+        while not worker.stopping:
+            worker.process = await asyncio.create_subprocess_exec(
+                *self._worker_command(worker), stdin=asyncio.subprocess.DEVNULL
+            )
+            worker.started_at = time.monotonic()
+            self.logger.info(f"Started {worker.name} (PID {worker.process.pid}) for shards {worker.shard_ids}")
+            code = await worker.process.wait()
+            if worker.stopping:
+                break
+            if worker.restart_requested:
+                worker.restart_requested = False
+                self.logger.info(f"{worker.name} stopped for restart")
+                continue
+            if code == 0:
+                self.logger.info(f"{worker.name} exited cleanly; not restarting")
+                break
+            if time.monotonic() - worker.started_at > self.stable_after:
+                worker.backoff = 1.0
+            self.logger.warning(f"{worker.name} exited with code {code}; restarting in {worker.backoff:.0f}s")
+            worker.restarts += 1
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=worker.backoff)
+                break
+            except asyncio.TimeoutError:
+                pass
+            worker.backoff = min(worker.backoff * 2, self.max_backoff)
+        worker.process = None
+
+    async def restart_worker(self, name: str) -> bool:
+        """Gracefully stop a worker and start it again immediately."""
+        for worker in self.workers:
+            if worker.name == name and worker.process and worker.process.returncode is None:
+                worker.backoff = 1.0
+                worker.restart_requested = True
+                worker.process.send_signal(signal.SIGTERM)
+                return True
+        return False
+
+    def _console_loop(self, loop):
+        """Read supervisor console commands from stdin (runs in a thread)."""
+        while not self._stopped.is_set():
+            try:
+                parts = input().strip().lower().split()
+            except (EOFError, KeyboardInterrupt):
+                asyncio.run_coroutine_threadsafe(self.stop(), loop)
+                break
+            if not parts:
+                continue
+            match parts[0]:
+                case "status" | "info":
+                    loop.call_soon_threadsafe(self._log_status)
+                case "restart" if len(parts) > 1:
+                    asyncio.run_coroutine_threadsafe(self.restart_worker(parts[1]), loop)
+                case "stop" | "quit" | "exit":
+                    asyncio.run_coroutine_threadsafe(self.stop(), loop)
+                    break
+                case _:
+                    self.logger.info("Supervisor commands: status, restart <worker>, stop")
+
+    def _log_status(self):
+        lines = [f"Supervisor: {len(self.workers)} workers, {self.shard_count} shards"]
+        for entry in self.status():
+            state = f"PID {entry['pid']}, up {entry['uptime_s']}s" if entry['running'] else "stopped"
+            lines.append(f"  {entry['name']} shards {entry['shard_ids']}: {state}, {entry['restarts']} restarts")
+            health = entry['health']
+            if health:
+                age = time.time() - health['updated_at']
+                lines.append(f"    {health['guilds']} guilds (reported {age:.0f}s ago)")
+                for shard in health['shards']:
+                    status = 'closed' if shard['closed'] else f"{shard['latency_ms']}ms"
+                    lines.append(f"    shard {shard['shard_id']}: {status}")
+        self.logger.info("\n".join(lines))
+
+    async def run(self, console: bool = True):
+        """Run every worker until stop() is called or all workers exit."""
+        loop = asyncio.get_running_loop()
+        if console:
+            threading.Thread(target=self._console_loop, args=(loop,), daemon=True).start()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, lambda: asyncio.ensure_future(self.stop()))
+            except NotImplementedError:
+                pass
+        for worker in self.workers:
+            worker.task = asyncio.create_task(self._run_worker(worker))
+        await asyncio.gather(*(worker.task for worker in self.workers))
+
+    async def stop(self, timeout: float = 15.0):
+        """Ask every worker to shut down gracefully, killing any that do not exit in time."""
+        self._stopped.set()
+        for worker in self.workers:
+            worker.stopping = True
+            if worker.process and worker.process.returncode is None:
+                worker.process.send_signal(signal.SIGTERM)
+        for worker in self.workers:
+            if worker.process and worker.process.returncode is None:
+                try:
+                    await asyncio.wait_for(worker.process.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    self.logger.warning(f"{worker.name} did not stop in time; killing")
+                    worker.process.kill()
+
+    def status(self) -> List[dict]:
+        """Process state plus the latest published shard health for every worker."""
+        report = []
+        for worker in self.workers:
+            running = worker.process is not None and worker.process.returncode is None
+            entry = {
+                'name': worker.name,
+                'shard_ids': worker.shard_ids,
+                'pid': worker.process.pid if running else None,
+                'running': running,
+                'uptime_s': round(time.monotonic() - worker.started_at) if running else 0,
+                'restarts': worker.restarts,
+                'health': None,
+            }
+            try:
+                with open(os.path.join(HEALTH_DIR, f'{worker.name}.json'), 'r') as f:
+                    entry['health'] = json.load(f)
+            except (OSError, ValueError):
+                pass
+            report.append(entry)
+        return report
@@ -0,0 +1,139 @@
+"""
+Event loop watchdog for Rudebot.
+A heartbeat scheduled on the event loop records loop lag, and a watcher thread notices when
+the heartbeat stops arriving. When the loop is held longer than the threshold, the watcher
+logs the loop thread's current stack so the blocking coroutine or callback can be found.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from utils.metrics_util import loop_lag, registry
+
+loop_stalls = registry.counter('event_loop_stalls_total', 'Times the event loop was blocked longer than the watchdog threshold')
+loop_stall_time = registry.histogram('event_loop_stall_seconds', 'How long each detected stall held the event loop')
+
+
+def get_watchdog_settings() -> dict:
+    """
+    Read the watchdog settings from the environment.
+    """
+    return {
+        'enabled': os.getenv('LOOP_WATCHDOG_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+        'interval': float(os.getenv('LOOP_LAG_INTERVAL', 0.5)),
+        'threshold': float(os.getenv('LOOP_WATCHDOG_THRESHOLD_MS', 250)) / 1000,
+    }
+
+
+class LoopWatchdog:
+    """
+    Cheap production alternative to asyncio debug mode's slow-callback warning.
+    The loop side costs one call_later per interval; stacks are only captured during a stall.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("watchdog")
+        # Defaults until start() reads the settings (the instance exists before .env is loaded)
+        self.enabled = True
+        self.interval = 0.5
+        self.threshold = 0.25
+        self.stall_count = 0
+        self.last_stall: Optional[dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start the heartbeat on the running loop and the watcher thread. Call from the loop thread."""
+        if self._thread is not None:
+            return
+        settings = get_watchdog_settings()
+        self.enabled = settings['enabled']
+        self.interval = settings['interval']
+        self.threshold = settings['threshold']
+        if not self.enabled:
+            return
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._handle = self._loop.call_later(self.interval, self._beat, self._last_beat)
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self.logger.info("Loop watchdog started (threshold %.0fms)", self.threshold * 1000)
+
+    def stop(self):
+        self._stop.set()
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _beat(self, scheduled_at: float):
+        """Runs on the loop: record how late this heartbeat fired and schedule the next one."""
+        now = time.monotonic()
+        loop_lag.observe(max(0.0, now - scheduled_at - self.interval))
+        self._last_beat = now
+        if not self._stop.is_set():
+            self._handle = self._loop.call_later(self.interval, self._beat, now)
+
+    def _watch(self):
+        """Runs on the watcher thread: detect missing heartbeats and report the blocking stack."""
+        stalled_since = None
+        # Recomputed every pass: the console can change the threshold while running
+        while not self._stop.wait(min(self.interval, self.threshold) / 2):
+            beat = self._last_beat
+            overdue = time.monotonic() - beat - self.interval
+            if overdue > self.threshold:
+                if stalled_since != beat:
+                    stalled_since = beat
+                    self._report_stall(overdue)
+            elif stalled_since is not None and beat != stalled_since:
+                # The loop is running again; the gap between beats is the stall length
+                duration = beat - stalled_since - self.interval
+                loop_stall_time.observe(duration)
+                if self.last_stall is not None:
+                    self.last_stall['duration'] = duration
+                self.logger.warning("Event loop unblocked after %.0fms", duration * 1000)
+                stalled_since = None
+
+    def _report_stall(self, overdue: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame)) if frame is not None else '<no frame>'
+        self.stall_count += 1
+        loop_stalls.inc()
+        self.last_stall = {'at': time.time(), 'overdue': overdue, 'duration': None, 'stack': stack}
+        self.logger.warning(
+            "Event loop blocked for over %.0fms (threshold %.0fms); loop thread stack:\n%s",
+            overdue * 1000, self.threshold * 1000, stack
+        )
+
+    def status(self) -> str:
+        """One-paragraph summary for the console."""
+        if not self.enabled:
+            return "Loop watchdog disabled (LOOP_WATCHDOG_ENABLED=false)"
+        lines = [
+            f"Loop watchdog: threshold {self.threshold * 1000:.0f}ms, interval {self.interval * 1000:.0f}ms",
+            f"  Loop lag: {loop_lag.summary()}",
+            f"  Stalls: {self.stall_count} ({loop_stall_time.summary()})",
+        ]
+        if self.last_stall:
+            when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_stall['at']))
+            duration = self.last_stall['duration']
+            length = f"{duration * 1000:.0f}ms" if duration is not None else "ongoing"
+            lines.append(f"  Last stall at {when} ({length}):\n{self.last_stall['stack']}")
+        return "\n".join(lines)
+
+
+# Shared watchdog for the bot process
+loop_watchdog = LoopWatchdog()
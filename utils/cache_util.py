@@ -0,0 +1,110 @@
+"""
+Caching utilities for Rudebot.
+LRU cache with per-entry expiry and optional JSON persistence.
+"""
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire at a wall-clock time.
+    Not thread-safe; use it from the event loop only.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1000, default_ttl: float = 3600.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key: Hashable, count: bool = True) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            if count:
+                self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            if count:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        """Store a value for ttl seconds (or until expires_at), evicting the least recently used."""
+        if expires_at is None:
+            expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove and return a value (None if missing)."""
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        self._entries.clear()
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry. Returns the number removed."""
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def stats(self) -> str:
+        """One-line summary of size and hit rate."""
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (f"{len(self._entries)}/{self.max_entries} entries, "
+                f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {self.evictions} evicted")
+
+    def save(self, path: str):
+        """Write unexpired entries (oldest first) to a JSON file. Keys must be strings."""
+        self.purge_expired()
+        data = [[key, value, expires_at] for key, (value, expires_at) in self._entries.items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'name': self.name, 'entries': data}, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """Load entries saved by save(); expired entries are skipped. Returns the number loaded."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.getLogger("cache").warning(f"Ignoring unreadable cache file {path}: {e}")
+            return 0
+        now = time.time()
+        loaded = 0
+        for key, value, expires_at in data.get('entries', []):
+            if expires_at > now:
+                self.set(key, value, expires_at=expires_at)
+                loaded += 1
+        return loaded
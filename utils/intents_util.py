@@ -0,0 +1,38 @@
+"""
+Gateway intents and member cache profiles for Rudebot.
+  full - presences and members intents, every member cached (original behaviour)
+  slim - no presences or members intents; only members in voice are cached and
+         guilds are not chunked at startup. Enough for voice greetings, music,
+         kick/scatter (move_to) and text commands.
+Selected with CACHE_PROFILE.
+"""
+import os
+import discord
+
+CACHE_PROFILES = ('full', 'slim')
+
+
+def get_cache_profile() -> str:
+    """Configured cache profile (defaults to full)."""
+    profile = os.getenv('CACHE_PROFILE', 'full').lower()
+    return profile if profile in CACHE_PROFILES else 'full'
+
+
+def build_intents(profile: str) -> discord.Intents:
+    """Intents for a cache profile."""
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.voice_states = True
+    full = profile == 'full'
+    intents.presences = full
+    intents.members = full
+    return intents
+
+
+def cache_options(profile: str) -> dict:
+    """Extra Bot/Client keyword arguments (member cache flags, chunking) for a cache profile."""
+    if profile == 'slim':
+        flags = discord.MemberCacheFlags.none()
+        flags.voice = True
+        return {'member_cache_flags': flags, 'chunk_guilds_at_startup': False}
+    return {}
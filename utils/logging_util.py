@@ -2,9 +2,318 @@
 Centralized logging configuration for Rudebot.
 Sets up both console and file logging for the entire project.
 Consolidated logging utilities for both global and cog-specific loggers.
+
+Records are put on a queue by the calling thread and written by a single background
+listener thread, so slow disks never add latency to the event loop. File writes are
+flushed in batches, files rotate by size or time (compressed with gzip), and levels
+can be set per logger. Settings come from LOG_* environment variables (see env.template).
+
+With LOG_FORMAT=json every record is written as one JSON object per line, carrying the
+structured fields passed through log_event(). High-volume events can be sampled and capped
+per second so logging cost stays bounded during bursts such as voice-join storms.
 """
+import atexit
+import copy
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional
+
+LOG_FORMAT = '[%(asctime)s] [%(levelname)s] %(name)s: %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Structured fields copied from LogRecord extras into JSON output
+STRUCTURED_FIELDS = ('event', 'guild_id', 'channel_id', 'user_id', 'duration_ms')
+
+# Route name used for records that reach the root logger (console + logs/rudebot.log)
+ROOT_ROUTE = 'root'
+
+_log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_listener: Optional["BatchingQueueListener"] = None
+_router: Optional["_RoutingHandler"] = None
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def get_log_settings() -> dict:
+    """Read logging settings from the environment."""
+    return {
+        'level': os.getenv('LOG_LEVEL', 'INFO').upper(),
+        'levels': _parse_levels(os.getenv('LOG_LEVELS', '')),
+        'rotate': os.getenv('LOG_ROTATE', 'size').lower(),
+        'max_bytes': int(float(os.getenv('LOG_MAX_MB', 10)) * 1024 * 1024),
+        'backup_count': int(os.getenv('LOG_BACKUP_COUNT', 5)),
+        'when': os.getenv('LOG_ROTATE_WHEN', 'midnight'),
+        'compress': _env_bool('LOG_COMPRESS', True),
+        'batch_size': max(1, int(os.getenv('LOG_BATCH_SIZE', 100))),
+        'flush_interval': float(os.getenv('LOG_FLUSH_INTERVAL', 1.0)),
+        'format': os.getenv('LOG_FORMAT', 'text').lower(),
+        'sample_rates': {
+            name: float(rate) for name, rate in _parse_levels(os.getenv('LOG_SAMPLE_RATES', '')).items()
+        },
+        'event_max_per_sec': int(os.getenv('LOG_EVENT_MAX_PER_SEC', 0)),
+    }
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    """Parse 'music=DEBUG,discord=WARNING' into a name -> value mapping."""
+    levels = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects, including any structured fields."""
+
+    def format(self, record):
+        data = {
+            'ts': self.formatTime(record, LOG_DATE_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def _formatter(settings: dict) -> logging.Formatter:
+    if settings['format'] == 'json':
+        return JsonFormatter()
+    return logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+
+class EventSampler:
+    """
+    Decide whether an event is logged: keep a random fraction per event type
+    (LOG_SAMPLE_RATES) and at most LOG_EVENT_MAX_PER_SEC per event type each second.
+    Dropped events are counted so the totals remain visible.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, max_per_sec: int = 0):
+        self.rates = rates or {}
+        self.max_per_sec = max_per_sec
+        self.dropped: Dict[str, int] = {}
+        self._window = 0
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rates: Dict[str, float], max_per_sec: int):
+        self.rates = rates
+        self.max_per_sec = max_per_sec
+
+    def keep(self, event: str) -> bool:
+        rate = self.rates.get(event, 1.0)
+        keep = rate >= 1.0 or random.random() < rate
+        if keep and self.max_per_sec:
+            with self._lock:
+                window = int(time.monotonic())
+                if window != self._window:
+                    self._window = window
+                    self._counts.clear()
+                count = self._counts.get(event, 0)
+                keep = count < self.max_per_sec
+                if keep:
+                    self._counts[event] = count + 1
+        if not keep:
+            with self._lock:
+                self.dropped[event] = self.dropped.get(event, 0) + 1
+        return keep
+
+
+sampler = EventSampler()
+
+
+def log_event(logger: logging.Logger, level: int, event: str, msg: str, *args,
+              duration_ms: Optional[float] = None, **fields):
+    """
+    Log a %-style message tagged with an event name and structured fields
+    (guild_id, channel_id, user_id, ...). The message is only formatted if the
+    level is enabled and the event survives sampling.
+    """
+    if not logger.isEnabledFor(level) or not sampler.keep(event):
+        return
+    extra = {'event': event, **fields}
+    if duration_ms is not None:
+        extra['duration_ms'] = round(duration_ms, 2)
+    logger.log(level, msg, *args, extra=extra, stacklevel=2)
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class _BatchingMixin:
+    """
+    Write records without flushing each one; flush every batch_size records,
+    on ERROR and above, or when the listener is idle for flush_interval.
+    """
+    batch_size = 100
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending = getattr(self, '_pending', 0) + 1
+            if self._pending >= self.batch_size or record.levelno >= logging.ERROR:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self._pending = 0
+        super().flush()
+
+
+class BatchingRotatingFileHandler(_BatchingMixin, logging.handlers.RotatingFileHandler):
+    """Size-rotated file handler with batched flushes."""
+
+
+class BatchingTimedRotatingFileHandler(_BatchingMixin, logging.handlers.TimedRotatingFileHandler):
+    """Time-rotated file handler with batched flushes."""
+
+
+class BatchingFileHandler(_BatchingMixin, logging.FileHandler):
+    """Non-rotating file handler with batched flushes."""
+
+    def shouldRollover(self, record):
+        return False
+
+    def doRollover(self):
+        pass
+
+
+def _file_handler(log_file: str, settings: dict) -> logging.Handler:
+    """Create the rotating, batching file handler configured by settings."""
+    if settings['rotate'] == 'time':
+        handler = BatchingTimedRotatingFileHandler(
+            log_file, when=settings['when'], backupCount=settings['backup_count'], delay=True
+        )
+    elif settings['rotate'] == 'size':
+        handler = BatchingRotatingFileHandler(
+            log_file, maxBytes=settings['max_bytes'], backupCount=settings['backup_count'], delay=True
+        )
+    else:
+        handler = BatchingFileHandler(log_file, delay=True)
+    handler.batch_size = settings['batch_size']
+    if settings['compress'] and settings['rotate'] in ('size', 'time'):
+        handler.namer = lambda name: name + '.gz'
+        handler.rotator = _gzip_rotator
+    # No handler level: logger levels (LOG_LEVEL / LOG_LEVELS) decide what is written
+    handler.setFormatter(_formatter(settings))
+    return handler
+
+
+class _RoutingHandler(logging.Handler):
+    """
+    Runs on the listener thread and hands each record to the handlers of its route.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.routes: Dict[str, List[logging.Handler]] = {}
+
+    def add_route(self, route: str, handler: logging.Handler):
+        self.routes.setdefault(route, []).append(handler)
+
+    def emit(self, record):
+        for handler in self.routes.get(getattr(record, 'log_route', ROOT_ROUTE), ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush(self):
+        for handlers in self.routes.values():
+            for handler in handlers:
+                handler.flush()
+
+    def close(self):
+        for handlers in self.routes.values():
+            for handler in handlers:
+                handler.close()
+        super().close()
+
+
+class RouteQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that tags records with a route. Only the message is interpolated on the
+    calling thread; all other formatting happens on the listener thread.
+    """
+
+    def __init__(self, log_queue, route: str):
+        super().__init__(log_queue)
+        self.route = route
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.log_route = self.route
+        return record
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes its handlers whenever the queue has been idle for flush_interval."""
+
+    def __init__(self, log_queue, *handlers, flush_interval: float = 1.0):
+        super().__init__(log_queue, *handlers)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+
+def _ensure_listener(settings: Optional[dict] = None) -> "_RoutingHandler":
+    """Start the background listener thread on first use."""
+    global _listener, _router
+    if _listener is None:
+        settings = settings or get_log_settings()
+        _router = _RoutingHandler()
+        _listener = BatchingQueueListener(_log_queue, _router, flush_interval=settings['flush_interval'])
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return _router
+
+
+def shutdown_logging():
+    """Stop the listener thread after writing every queued record, then close the files."""
+    global _listener, _router
+    if _listener is not None:
+        _listener.stop()
+        _router.flush()
+        _router.close()
+        _listener = None
+        _router = None
+
+
+def _apply_levels(settings: dict):
+    for name, level in settings['levels'].items():
+        logging.getLogger(name).setLevel(level)
 
 
 def setup_logging():
@@ -16,30 +325,37 @@ def setup_logging():
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
     log_file = os.path.join(log_dir, 'rudebot.log')
+    settings = get_log_settings()
+    sampler.configure(settings['sample_rates'], settings['event_max_per_sec'])
 
-    formatter = logging.Formatter(
-        '[%(asctime)s] [%(levelname)s] %(name)s: %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    formatter = _formatter(settings)
 
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
+    root_logger.setLevel(settings['level'])
 
     # Remove any existing handlers to avoid duplicate logs
     if root_logger.hasHandlers():
         root_logger.handlers.clear()
 
+    # Routes of loggers already set up by get_logger() keep their queue handlers, so
+    # recreate their files in the new router rather than dropping their records
+    previous_routes = [route for route in _router.routes if route != ROOT_ROUTE] if _router else []
+    shutdown_logging()
+    router = _ensure_listener(settings)
+    for route in previous_routes:
+        router.add_route(route, _file_handler(route, settings))
+
     # Console handler for real-time feedback
     ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
     ch.setFormatter(formatter)
-    root_logger.addHandler(ch)
+    router.add_route(ROOT_ROUTE, ch)
 
     # File handler for persistent logs
-    fh = logging.FileHandler(log_file)
-    fh.setLevel(logging.INFO)
-    fh.setFormatter(formatter)
-    root_logger.addHandler(fh)
+    router.add_route(ROOT_ROUTE, _file_handler(log_file, settings))
+
+    # Everything reaching the root logger goes through the queue
+    root_logger.addHandler(RouteQueueHandler(_log_queue, ROOT_ROUTE))
+    _apply_levels(settings)
 
 
 def get_logger(name, log_file):
@@ -51,14 +367,15 @@ def get_logger(name, log_file):
     log_dir = os.path.dirname(log_file)
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    if not any(isinstance(h, logging.FileHandler) and h.baseFilename == os.path.abspath(log_file)
-               for h in logger.handlers):
-        fh = logging.FileHandler(log_file)
-        fh.setLevel(logging.INFO)
-        formatter = logging.Formatter(
-            '[%(asctime)s] [%(levelname)s] %(name)s: %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        fh.setFormatter(formatter)
-        logger.addHandler(fh)
-    return logger 
\ No newline at end of file
+    route = os.path.abspath(log_file)
+    settings = get_log_settings()
+    router = _ensure_listener(settings)
+    # Checked on every call: the router is rebuilt when logging is set up again or restarted
+    if route not in router.routes:
+        router.add_route(route, _file_handler(log_file, settings))
+    if not any(isinstance(h, RouteQueueHandler) and h.route == route for h in logger.handlers):
+        logger.addHandler(RouteQueueHandler(_log_queue, route))
+        level = settings['levels'].get(name)
+        if level:
+            logger.setLevel(level)
+    return logger
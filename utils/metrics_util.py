@@ -0,0 +1,319 @@
+"""
+Lightweight metric primitives for Rudebot.
+Thread-safe histograms that can be observed from executor threads and read from the event loop.
+Counters, gauges and labeled histograms live in a process-wide registry that renders the
+Prometheus text exposition format.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Bucket upper bounds in seconds, tuned for DB calls and network extractions
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with count, sum, max and percentile estimates.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str = "", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record a single observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            if value > self._max:
+                self._max = value
+
+    def reset(self):
+        """Clear all observations."""
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._count = 0
+            self._sum = 0.0
+            self._max = 0.0
+
+    def bucket_counts(self) -> Tuple[List[Tuple[float, int]], int, float]:
+        """Return cumulative (upper bound, count) pairs plus the total count and sum."""
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+            total = self._sum
+        cumulative = []
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            seen += bucket_count
+            cumulative.append((bound, seen))
+        return cumulative, count, total
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def total(self) -> float:
+        return self._sum
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-th percentile (0-100) as the upper bound of the bucket containing it.
+        Returns None when nothing has been observed.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            count = self._count
+            maximum = self._max
+        if not count:
+            return None
+        rank = max(1, round(count * q / 100))
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], maximum)
+                return maximum
+        return maximum
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return a summary dict (count, sum, mean, p50, p99, max)."""
+        with self._lock:
+            count = self._count
+            total = self._sum
+            maximum = self._max
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count if count else 0.0,
+            'p50': self.percentile(50) or 0.0,
+            'p99': self.percentile(99) or 0.0,
+            'max': maximum,
+        }
+
+    def summary(self) -> str:
+        """Human readable one-line summary in milliseconds."""
+        snap = self.snapshot()
+        return (f"n={snap['count']} mean={snap['mean'] * 1000:.1f}ms "
+                f"p50={snap['p50'] * 1000:.1f}ms p99={snap['p99'] * 1000:.1f}ms "
+                f"max={snap['max'] * 1000:.1f}ms")
+
+
+LabelValues = Tuple[str, ...]
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: Dict[str, object]) -> LabelValues:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self.samples().items())]
+
+
+class Gauge(Counter):
+    """
+    Value that can go up and down. A gauge may instead be backed by a callback evaluated
+    at collection time, returning either a number or a mapping of label values to numbers.
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, description: str = "", labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._function: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Union[float, Dict[LabelValues, float]]]):
+        """Compute the gauge from function() whenever it is collected."""
+        self._function = function
+
+    def samples(self) -> Dict[LabelValues, float]:
+        if self._function is None:
+            return super().samples()
+        result = self._function()
+        if isinstance(result, dict):
+            return {tuple(str(v) for v in key): value for key, value in result.items()}
+        return {(): result}
+
+
+class LabeledHistogram:
+    """A family of Histograms, one per combination of label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str = "", labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[LabelValues, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels) -> Histogram:
+        key = _label_key(self.labelnames, labels)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, Histogram(self.name, self.description, self.buckets))
+        return child
+
+    def observe(self, value: float, **labels):
+        self.labels(**labels).observe(value)
+
+    def children(self) -> Dict[LabelValues, Histogram]:
+        with self._lock:
+            return dict(self._children)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in sorted(self.children().items()):
+            lines.extend(_render_histogram(self.name, self.labelnames, key, child))
+        return lines
+
+
+def _render_histogram(name: str, labelnames: Sequence[str], values: Sequence[str],
+                      histogram: Histogram) -> List[str]:
+    cumulative, count, total = histogram.bucket_counts()
+    lines = []
+    for bound, seen in cumulative + [(float('inf'), count)]:
+        le = 'le="%s"' % _format_value(bound)
+        lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {seen}")
+    lines.append(f"{name}_sum{_format_labels(labelnames, values)} {total!r}")
+    lines.append(f"{name}_count{_format_labels(labelnames, values)} {count}")
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of metrics. The factory methods return the existing metric
+    when the name is already registered, so cogs can be reloaded safely.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], object], kind: str):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            elif getattr(metric, 'kind', 'histogram') != kind:
+                raise ValueError(f"Metric {name} is already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, description: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, description, labelnames), 'counter')
+
+    def gauge(self, name: str, description: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, description, labelnames), 'gauge')
+
+    def histogram(self, name: str, description: str = "", labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Union[Histogram, LabeledHistogram]:
+        """Return a plain Histogram, or a LabeledHistogram when labelnames are given."""
+        if labelnames:
+            return self._get_or_create(
+                name, lambda: LabeledHistogram(name, description, labelnames, buckets), 'histogram'
+            )
+        return self._get_or_create(name, lambda: Histogram(name, description, buckets), 'histogram')
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def metrics(self) -> List[object]:
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics():
+            kind = getattr(metric, 'kind', 'histogram')
+            if metric.description:
+                lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            try:
+                if isinstance(metric, Histogram):
+                    lines.extend(_render_histogram(metric.name, (), (), metric))
+                else:
+                    lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# error collecting {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Observed by the loop watchdog heartbeat (services/watchdog_service.py)
+loop_lag = registry.histogram('event_loop_lag_seconds', 'Delay between a scheduled wakeup and the loop running it')
+
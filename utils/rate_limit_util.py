@@ -0,0 +1,78 @@
+"""
+Rate limiting primitives for Rudebot.
+Token buckets used to keep outgoing Discord traffic under per-guild and per-channel budgets.
+"""
+import time
+from typing import Dict, Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to capacity tokens, refilled at rate tokens per second.
+    Not thread-safe; use from the event loop.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_take(self, amount: float = 1, now: Optional[float] = None) -> bool:
+        """Take amount tokens if available. Returns False (taking nothing) otherwise."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1, now: Optional[float] = None) -> float:
+        """Seconds until amount tokens will be available (0 if available now)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (amount - self.tokens) / self.rate
+
+    def is_full(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class BucketMap:
+    """
+    Token buckets keyed by id (guild, channel), created on demand. Full buckets carry no
+    state, so they are pruned once the map grows past max_idle entries.
+    """
+
+    def __init__(self, rate: float, capacity: float, max_idle: int = 1000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_idle = max_idle
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def get(self, key: Hashable) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_idle:
+                self.prune()
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        return bucket
+
+    def prune(self):
+        now = time.monotonic()
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
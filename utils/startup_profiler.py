@@ -0,0 +1,106 @@
+"""
+Startup profiling for Rudebot (--profile-startup).
+Times named startup phases and, when enabled before the heavy imports, the import time of
+every module loaded from source. Only uses the standard library so it can be imported first.
+"""
+import importlib.abc
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Set when this module is first imported, i.e. at the top of main.py
+PROCESS_START = time.perf_counter()
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """
+    Meta path hook that wraps each module loader's exec_module to record cumulative
+    and self import time.
+    """
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Builtin and frozen importers are classes shared by every module; leave them alone
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec
+        exec_module = loader.exec_module
+        profiler = self.profiler
+
+        def timed_exec_module(module):
+            profiler._stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = profiler._stack.pop()
+                if profiler._stack:
+                    profiler._stack[-1] += elapsed
+                profiler.imports[fullname] = (elapsed, elapsed - children)
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+
+class StartupProfiler:
+    """Collects phase durations and module import times and formats a report."""
+
+    def __init__(self):
+        self.enabled = False
+        self.phases: List[Tuple[str, float, float]] = []
+        self.imports: Dict[str, Tuple[float, float]] = {}
+        self._stack: List[float] = []
+        self._finder: Optional[_TimingFinder] = None
+
+    def enable(self):
+        """Start recording imports. Call before importing the modules to be measured."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    def disable_imports(self):
+        """Stop timing imports (phases are still recorded)."""
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    def mark(self, name: str, started: float):
+        """Record a phase that began at started (perf_counter) and ends now."""
+        self.phases.append((name, started - PROCESS_START, time.perf_counter() - started))
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, started)
+
+    def report(self, top: int = 20) -> str:
+        lines = [f"Startup profile ({(time.perf_counter() - PROCESS_START) * 1000:.0f}ms since process start):",
+                 "  Phases (start offset, duration):"]
+        for name, offset, duration in self.phases:
+            lines.append(f"    {name:<24} +{offset * 1000:7.0f}ms {duration * 1000:8.1f}ms")
+        if self.imports:
+            lines.append(f"  Slowest imports of {len(self.imports)} (cumulative / self):")
+            slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+            for module, (cumulative, own) in slowest:
+                lines.append(f"    {module:<40} {cumulative * 1000:8.1f}ms {own * 1000:8.1f}ms")
+        return "\n".join(lines)
+
+
+# Shared profiler for the bot process
+profiler = StartupProfiler()